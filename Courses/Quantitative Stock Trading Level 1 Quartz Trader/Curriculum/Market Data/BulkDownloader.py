@@ -0,0 +1,162 @@
+'''
+This script contains a bulk downloader, to fetch the prices of a large universe of tickers (e.g. a screened stock list) into the price store.
+* The tickers are split into batches, and a few batches are downloaded at the same time.
+* A token bucket limits how many requests start per second, and failed batches are retried with exponential backoff.
+* Every batch is saved into the price store as soon as it arrives, so an interrupted run resumes with the tickers still missing.
+* The data source is a function (tickers, start, end) -> {ticker: prices}, e.g. YahooBatchSource or HttpCsvSource.
+'''
+
+import io
+import random
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import pandas as pd
+from PriceStore import PRICE_STORE
+
+#---------------------------------------Batch Sources---------------------------------------
+# Function to download the daily prices of several tickers from Yahoo Finance in one request, for the dates start <= date < end
+def YahooBatchSource(tickers, start, end):
+
+    import yfinance as yf # only needed when prices are downloaded
+
+    data = yf.download(tickers, start, end, group_by='ticker', auto_adjust=False, progress=False, threads=False)
+    if not isinstance(data.columns, pd.MultiIndex): # older yfinance versions do not label a single ticker's columns
+        data = pd.concat({tickers[0]: data}, axis=1)
+
+    prices = {}
+    for ticker in tickers:
+        if ticker in data.columns.get_level_values(0):
+            ticker_prices = data[ticker].dropna(how='all')
+            if len(ticker_prices): # failed tickers come back as empty columns
+                prices[ticker] = ticker_prices
+
+    return prices
+
+# Class to download the daily prices of several tickers as CSV from a web address, e.g. a data vendor or a local test server
+class HttpCsvSource:
+
+    def __init__(self, url, timeout=30):
+        self.url = url # address with {tickers}, {start} and {end} fields, e.g. 'http://host/prices?symbols={tickers}&from={start}&to={end}'
+        self.timeout = timeout # seconds to wait for a response
+
+    # Function to download a batch; the CSV has Date, Ticker and price field columns, and HTTP errors (e.g. 429, 503) are raised
+    def __call__(self, tickers, start, end):
+
+        url = self.url.format(tickers=quote(','.join(tickers)), start=pd.Timestamp(start).date(), end=pd.Timestamp(end).date())
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            table = pd.read_csv(io.BytesIO(response.read()), parse_dates=['Date'], float_precision='round_trip')
+
+        return {ticker: rows.drop(columns='Ticker').set_index('Date') for ticker, rows in table.groupby('Ticker')}
+
+#---------------------------------------Rate Limit---------------------------------------
+'''
+Token bucket: the bucket holds up to capacity tokens and refills at rate tokens per second; every request takes one token.
+
+* Bursts of up to capacity requests start at once, and over time requests start at no more than rate per second,
+  however many batches are downloaded at the same time.
+'''
+
+# Class to limit the number of requests per second across threads
+class TokenBucket:
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate # tokens added per second
+        self.capacity = capacity # most tokens the bucket holds
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    # Function to wait until a token is available, then take it
+    def acquire(self):
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+#---------------------------------------Bulk Downloader---------------------------------------
+'''
+Retry delay after the k-th failed attempt of a batch = min(backoff x 2^(k-1), max_backoff), scaled by a random 50-100%
+so batches that failed together do not retry together.
+
+* Tickers missing from a batch's result are retried with the batch; the ones still missing after the retries are reported as failed.
+* Tickers whose date range the price store already covers are skipped. A batch that returned a ticker's bars covers its whole
+  range, so an end date on a weekend or holiday (e.g. 2023-01-01) is not requested again on the next run.
+'''
+
+# Class to download the prices of many tickers into a price store in concurrent, rate-limited batches
+class BulkDownloader:
+
+    def __init__(self, store=None, source=YahooBatchSource, batch_size=50, max_workers=4, rate=2, burst=4,
+                 retries=4, backoff=1, max_backoff=60):
+        self.store = PRICE_STORE if store is None else store # price store that keeps every downloaded batch
+        self.source = source # function (tickers, start, end) -> {ticker: prices}
+        self.batch_size = batch_size # tickers per request
+        self.max_workers = max_workers # batches downloaded at the same time
+        self.bucket = TokenBucket(rate, burst) # requests started per second, and in a burst
+        self.retries = retries # attempts after the first one
+        self.backoff = backoff # seconds to wait after the first failed attempt
+        self.max_backoff = max_backoff # most seconds to wait between attempts
+        self.errors = {} # last error of each failed ticker
+
+    # Function to download the prices of the tickers that are not stored yet for start <= date < end, returning the failed tickers
+    def download(self, tickers, start, end):
+
+        if self.store.root is None:
+            raise ValueError('Set the price store root, e.g. PRICE_STORE.root, to keep the downloaded batches')
+
+        tickers = [t for t in dict.fromkeys(tickers) if self.store.missing(t, start, end)] # skip the tickers already stored
+        batches = [tickers[i:i + self.batch_size] for i in range(0, len(tickers), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(lambda batch: self._download_batch(batch, start, end), batches))
+
+        self.errors = {} # merged here, after the threads are done, in batch order
+        for batch_errors in results:
+            self.errors.update(batch_errors)
+
+        return list(self.errors)
+
+    # Function to download one batch with retries, saving each ticker into the store as it arrives, returning the failed tickers' errors
+    def _download_batch(self, batch, start, end):
+
+        errors = {} # last error of each ticker of the batch, kept by the batch's own thread
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                time.sleep(min(self.backoff * 2 ** (attempt - 1), self.max_backoff) * random.uniform(0.5, 1))
+            self.bucket.acquire()
+            try:
+                prices = self.source(batch, start, end)
+            except Exception as error: # e.g. a timeout or an HTTP 429/5xx error
+                for ticker in batch:
+                    errors[ticker] = error
+                continue
+
+            for ticker in batch:
+                if ticker in prices:
+                    self.store.append(ticker, prices[ticker], start, end) # checkpoint
+                    errors.pop(ticker, None)
+                else:
+                    errors[ticker] = LookupError('No prices for ' + ticker)
+            batch = [ticker for ticker in batch if ticker not in prices]
+            if not batch:
+                break
+
+        return {ticker: errors[ticker] for ticker in batch}
+
+# Shared downloader used by BulkDownload(); it saves into PRICE_STORE
+BULK_DOWNLOADER = BulkDownloader()
+
+# Function to download many tickers into the shared price store before LoadPrices(...) reads them, returning the failed tickers
+def BulkDownload(tickers, start, end):
+
+    return BULK_DOWNLOADER.download(tickers, start, end)
\ No newline at end of file
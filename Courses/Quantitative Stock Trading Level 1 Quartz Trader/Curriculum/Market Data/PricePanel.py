@@ -0,0 +1,161 @@
+'''
+This script contains a memory-mapped price panel, to work on the daily prices of thousands of tickers without loading them into memory.
+* Each price field is one fixed-width float array on disk, one row per ticker and one column per day of a shared date axis.
+* Opening a panel maps the arrays instead of reading them, so only the pages that are used are read, and processes that
+  open the same panel share those pages.
+* panel['Close'] and panel.prices(ticker) are tables over the mapped arrays (no copies), in the layouts the indicator
+  functions, CandlestickPatterns, ScanPatterns and the strategies already take.
+'''
+
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+from PriceStore import FIELDS, PRICE_STORE
+
+#---------------------------------------Panel Layout---------------------------------------
+'''
+<root>/panel.json : version of the panel
+<root>/<version>/Date.npy : shared date axis (days)
+<root>/<version>/Tickers.npy : ticker of each row (tickers)
+<root>/<version>/Bounds.npy : first and last day of each ticker, as [start, end) positions in the date axis (tickers, 2)
+<root>/<version>/Open.npy, High.npy, ... : prices of each field (tickers, days), NaN on the days a ticker has no price
+
+* One row per ticker keeps each ticker's prices contiguous, and the (days, tickers) table of a field is the transposed view.
+* A new version is written next to the current one, then panel.json is replaced to point at it,
+  so processes that have the previous version open keep reading it.
+'''
+
+#---------------------------------------Price Panel---------------------------------------
+# Class to read a memory-mapped price panel
+class PricePanel:
+
+    def __init__(self, root):
+        with open(os.path.join(root, 'panel.json')) as f:
+            version = json.load(f)['version']
+        self._open(os.path.join(root, version))
+
+    # Function to map the arrays of one version of the panel
+    def _open(self, folder):
+
+        self.folder = folder # folder of the mapped version
+        self.all_dates = pd.DatetimeIndex(np.load(os.path.join(folder, 'Date.npy')), name='Date')
+        self.tickers = pd.Index(np.load(os.path.join(folder, 'Tickers.npy')).tolist(), name='Ticker')
+        self.rows = {ticker: row for row, ticker in enumerate(self.tickers)} # row of each ticker
+        self.bounds = np.load(os.path.join(folder, 'Bounds.npy'))
+        self.fields = {field: np.load(os.path.join(folder, field + '.npy'), mmap_mode='r') for field in FIELDS} # read-only maps
+        self.window = [0, len(self.all_dates)] # [start, end) positions of the days in view
+
+    # Pickle only the folder and the window, so worker processes map the same version instead of copying the prices
+    def __getstate__(self):
+
+        return {'folder': self.folder, 'window': self.window}
+
+    def __setstate__(self, state):
+
+        self._open(state['folder'])
+        self.window = state['window']
+
+    # Days in view
+    @property
+    def dates(self):
+
+        return self.all_dates[self.window[0]:self.window[1]]
+
+    # Function to get a view of the panel on the days start <= date < end
+    def between(self, start=None, end=None):
+
+        first = self.window[0] if start is None else max(self.window[0], self.all_dates.searchsorted(pd.Timestamp(start)))
+        last = self.window[1] if end is None else min(self.window[1], self.all_dates.searchsorted(pd.Timestamp(end)))
+        panel = object.__new__(PricePanel) # same attributes, so the view shares the maps, dates and tickers
+        panel.__dict__.update(self.__dict__)
+        panel.window = [first, max(first, last)]
+
+        return panel
+
+    # Function to get the (days, tickers) table of one field, e.g. panel['Close'], as a view of the mapped array
+    def __getitem__(self, field):
+
+        if field not in self.fields:
+            raise KeyError(field + ' is not a price field of the panel, use one of ' + ', '.join(FIELDS))
+        values = self.fields[field][:, self.window[0]:self.window[1]]
+
+        return pd.DataFrame(values.T, index=self.dates, columns=self.tickers, copy=False)
+
+    # Function to get the prices of one ticker on its trading days, in the layout of yf.download(TICKER), as views where possible
+    def prices(self, ticker):
+
+        if ticker not in self.rows:
+            raise KeyError(ticker + ' is not in the panel')
+        row = self.rows[ticker]
+        first = min(max(self.bounds[row, 0], self.window[0]), self.window[1]) # from the ticker's first day in view
+        last = max(min(self.bounds[row, 1], self.window[1]), first) # to its last day in view
+
+        prices = pd.DataFrame({field: self.fields[field][row, first:last] for field in FIELDS},
+                              index=self.all_dates[first:last], copy=False)
+        traded = ~np.isnan(self.fields['Close'][row, first:last])
+        if not traded.all(): # days other tickers traded on but this one did not, e.g. a trading halt
+            prices = prices[traded]
+
+        return prices
+
+#---------------------------------------Panel Build---------------------------------------
+# Function to read the stored prices of a ticker for the dates start <= date < end, without downloading them again
+def _stored_prices(store, ticker, start, end):
+
+    prices = store.read(ticker)[0]
+
+    return prices[(prices.index >= pd.Timestamp(start)) & (prices.index < pd.Timestamp(end))]
+
+# Function to write a panel of the prices of tickers for the dates start <= date < end, from a price store
+def BuildPanel(root, tickers, start, end, store=None):
+
+    store = PRICE_STORE if store is None else store
+
+    # Shared date axis: every day on which at least one ticker has a price (downloads the missing prices into the store)
+    dates = []
+    kept = {} # prices of each ticker, kept in memory only if the store has no folder to read them back from
+    for ticker in tickers:
+        prices = store.load(ticker, start, end)
+        dates.append(prices.index)
+        if store.root is None:
+            kept[ticker] = prices
+    all_dates = pd.DatetimeIndex(np.unique(np.concatenate([d.to_numpy(dtype='datetime64[ns]') for d in dates])) if dates else [])
+
+    version = uuid.uuid4().hex
+    folder = os.path.join(root, version)
+    os.makedirs(folder)
+    arrays = {field: np.lib.format.open_memmap(os.path.join(folder, field + '.npy'), mode='w+', dtype=float,
+                                               shape=(len(tickers), len(all_dates))) for field in FIELDS}
+    bounds = np.zeros((len(tickers), 2), dtype=np.int64)
+    for row, ticker in enumerate(tickers): # one ticker in memory at a time
+        prices = kept[ticker] if store.root is None else _stored_prices(store, ticker, start, end)
+        positions = all_dates.get_indexer(prices.index)
+        for field in FIELDS:
+            arrays[field][row] = np.nan
+            arrays[field][row, positions] = prices[field].to_numpy(dtype=float)
+        if len(positions):
+            bounds[row] = [positions[0], positions[-1] + 1]
+    for values in arrays.values():
+        values.flush()
+    del arrays
+
+    np.save(os.path.join(folder, 'Date.npy'), all_dates.to_numpy(dtype='datetime64[ns]'))
+    np.save(os.path.join(folder, 'Tickers.npy'), np.array(list(tickers), dtype=str))
+    np.save(os.path.join(folder, 'Bounds.npy'), bounds)
+
+    old_version = None
+    if os.path.exists(os.path.join(root, 'panel.json')):
+        with open(os.path.join(root, 'panel.json')) as f:
+            old_version = json.load(f)['version']
+    with open(os.path.join(root, 'panel.tmp'), 'w') as f:
+        json.dump({'version': version}, f)
+    os.replace(os.path.join(root, 'panel.tmp'), os.path.join(root, 'panel.json')) # readers never see a partial file
+
+    if old_version is not None: # processes that still map it keep their pages until they close it
+        shutil.rmtree(os.path.join(root, old_version), ignore_errors=True)
+
+    return PricePanel(root)
\ No newline at end of file
@@ -0,0 +1,238 @@
+'''
+This script contains a local store of daily OHLCV prices, so the EXE programs read prices from disk instead of downloading them on every run.
+* Each ticker is kept as one .npy file per price field, plus the date ranges already downloaded for it (its coverage).
+* load(tickers, start, end) downloads only the date ranges that are not covered yet, appends them, and reads the rest from disk.
+* The result has the same layout as yf.download: OHLCV columns for one ticker, or (field, ticker) columns for many.
+'''
+
+import json
+import os
+import shutil
+import uuid
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume'] # price fields kept for every ticker
+
+#---------------------------------------Price Source---------------------------------------
+# Function to download the daily prices of one ticker from Yahoo Finance, for the dates start <= date < end
+def YahooSource(ticker, start, end):
+
+    import yfinance as yf # only needed when prices are missing from the store
+
+    data = yf.download(ticker, start, end, auto_adjust=False, progress=False)
+    if isinstance(data.columns, pd.MultiIndex): # newer yfinance versions label the columns with the ticker too
+        data = data.xs(ticker, axis=1, level=-1) if ticker in data.columns.get_level_values(-1) else data.droplevel(-1, axis=1)
+
+    return data
+
+# Function to put downloaded prices into the store layout: FIELDS as float columns, sorted unique dates without time zone
+def _prices(data):
+
+    data = pd.DataFrame(data)
+    index = pd.DatetimeIndex(data.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    prices = pd.DataFrame({field: pd.to_numeric(data[field], errors='coerce').to_numpy(dtype=float) if field in data.columns
+                           else np.full(len(data), np.nan) for field in FIELDS}, index=index)
+    prices = prices[~prices.index.duplicated(keep='last')].sort_index()
+    prices.index.name = 'Date'
+
+    return prices
+
+#---------------------------------------Coverage---------------------------------------
+'''
+Coverage = list of [start, end) date ranges already downloaded, merged where they overlap or touch
+
+* Ranges reaching today or later are only covered up to today, so today's (unfinished) bar is downloaded again next time.
+* A download that returned bars covers its whole range, including the weekends, holidays or days after a delisting
+  at its end, which have no bars to download, e.g. an end date of 2023-01-01 (a Sunday) is not requested again.
+* A download that returned no bars covers nothing, so a failed or empty download (e.g. a rate limit) is tried again
+  next time instead of being stored as a gap.
+'''
+
+# Function to merge a date range into the coverage
+def _cover(coverage, start, end):
+
+    if start >= end: # nothing to cover, e.g. a range from today on
+        return coverage
+
+    ranges = sorted(coverage + [[start, end]])
+    merged = [ranges[0]]
+    for range_start, range_end in ranges[1:]:
+        if range_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], range_end)
+        else:
+            merged.append([range_start, range_end])
+
+    return merged
+
+# Function to list the parts of [start, end) that the coverage does not include
+def _missing(coverage, start, end):
+
+    missing = []
+    for range_start, range_end in coverage:
+        if range_start > start:
+            missing.append([start, min(range_start, end)])
+        start = max(start, range_end)
+        if start >= end:
+            break
+    if start < end:
+        missing.append([start, end])
+
+    return [[a, b] for a, b in missing if a < b]
+
+#---------------------------------------Price Store---------------------------------------
+'''
+<root>/<ticker>/partition.json : version and coverage of the ticker
+<root>/<ticker>/<version>/Date.npy, Open.npy, ... : one array per field
+
+* A new version is written next to the current one, then partition.json is replaced to point at it,
+  so an interrupted run leaves the previous version readable.
+'''
+
+# Class to keep daily prices on disk and download only the missing date ranges
+class PriceStore:
+
+    def __init__(self, root=None, source=YahooSource):
+        self.root = root # folder of the store, or None to download every time
+        self.source = source # function (ticker, start, end) -> price table, e.g. YahooSource
+        self.downloads = 0 # number of date ranges downloaded
+
+    # Function to get the prices of one ticker (as a table of fields) or many (as a table of (field, ticker) columns)
+    def load(self, tickers, start, end):
+
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if isinstance(tickers, str):
+            return self._load(tickers, start, end)
+
+        prices = {ticker: self._load(ticker, start, end) for ticker in tickers}
+
+        return pd.concat({field: pd.DataFrame({ticker: prices[ticker][field] for ticker in tickers}) for field in FIELDS}, axis=1)
+
+    # Function to add prices of a ticker to the store, e.g. from a bulk download, with the date range they cover
+    def append(self, ticker, data, start, end):
+
+        new_prices = _prices(data)
+        if len(new_prices) == 0: # nothing downloaded, so nothing to store or cover
+            return
+
+        prices, coverage = self.read(ticker)
+        self._write(ticker, self._merge(prices, new_prices), _cover(coverage, *self._coverable(start, end, new_prices)))
+
+    # Function to read the stored prices and coverage of a ticker
+    def read(self, ticker):
+
+        path = self._path(ticker)
+        if path is None or not os.path.exists(os.path.join(path, 'partition.json')):
+            return [_prices(pd.DataFrame(columns=FIELDS)), []]
+
+        with open(os.path.join(path, 'partition.json')) as f:
+            partition = json.load(f)
+
+        folder = os.path.join(path, partition['version'])
+        dates = pd.DatetimeIndex(np.load(os.path.join(folder, 'Date.npy')), name='Date')
+        prices = pd.DataFrame({field: np.load(os.path.join(folder, field + '.npy')) for field in FIELDS}, index=dates)
+        coverage = [[pd.Timestamp(a), pd.Timestamp(b)] for a, b in partition['coverage']]
+
+        return [prices, coverage]
+
+    # Function to list the parts of [start, end) not stored yet for a ticker, reading only its partition
+    def missing(self, ticker, start, end):
+
+        path = self._path(ticker)
+        coverage = []
+        if path is not None and os.path.exists(os.path.join(path, 'partition.json')):
+            with open(os.path.join(path, 'partition.json')) as f:
+                coverage = [[pd.Timestamp(a), pd.Timestamp(b)] for a, b in json.load(f)['coverage']]
+
+        return _missing(coverage, pd.Timestamp(start), pd.Timestamp(end))
+
+    # Function to get the prices of one ticker, downloading the missing date ranges first
+    def _load(self, ticker, start, end):
+
+        if self.root is None:
+            self.downloads += 1
+            return _prices(self.source(ticker, start, end))
+
+        prices, coverage = self.read(ticker)
+        missing = _missing(coverage, start, end)
+        if missing:
+            for range_start, range_end in missing:
+                self.downloads += 1
+                new_prices = _prices(self.source(ticker, range_start, range_end))
+                prices = self._merge(prices, new_prices)
+                coverage = _cover(coverage, *self._coverable(range_start, range_end, new_prices))
+            if len(prices): # nothing to store if every download came back empty
+                self._write(ticker, prices, coverage)
+
+        return prices[(prices.index >= start) & (prices.index < end)]
+
+    # Function to limit a downloaded range to the dates before today, whose bars are final, if it returned any bars
+    def _coverable(self, start, end, new_prices):
+
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        dates = new_prices.index[(new_prices.index >= start) & (new_prices.index < end)]
+        if len(dates) == 0: # nothing downloaded, so nothing is known about the range
+            return [start, start]
+
+        today = pd.Timestamp.today().normalize()
+
+        return [start, min(end, today)]
+
+    # Function to combine stored and downloaded prices, the downloaded ones replacing stored bars of the same date
+    def _merge(self, prices, new_prices):
+
+        if len(prices) == 0:
+            return new_prices
+        if len(new_prices) == 0:
+            return prices
+
+        prices = pd.concat([prices, new_prices])
+
+        return prices[~prices.index.duplicated(keep='last')].sort_index()
+
+    # Function to write a new version of a ticker's prices, then point the partition at it
+    def _write(self, ticker, prices, coverage):
+
+        path = self._path(ticker)
+        if path is None:
+            return
+
+        old_version = None
+        if os.path.exists(os.path.join(path, 'partition.json')):
+            with open(os.path.join(path, 'partition.json')) as f:
+                old_version = json.load(f)['version']
+
+        version = uuid.uuid4().hex
+        folder = os.path.join(path, version)
+        os.makedirs(folder) # creates the ticker folder too on its first write
+        np.save(os.path.join(folder, 'Date.npy'), prices.index.to_numpy(dtype='datetime64[ns]'))
+        for field in FIELDS:
+            np.save(os.path.join(folder, field + '.npy'), prices[field].to_numpy(dtype=float))
+
+        partition = {'version': version, 'coverage': [[str(a.date()), str(b.date())] for a, b in coverage]}
+        with open(os.path.join(path, 'partition.tmp'), 'w') as f:
+            json.dump(partition, f)
+        os.replace(os.path.join(path, 'partition.tmp'), os.path.join(path, 'partition.json')) # readers never see a partial file
+
+        if old_version is not None:
+            shutil.rmtree(os.path.join(path, old_version), ignore_errors=True)
+
+    # Function to get the folder of a ticker
+    def _path(self, ticker):
+
+        if self.root is None:
+            return None
+
+        return os.path.join(self.root, quote(ticker, safe='^-.=')) # e.g. ^GSPC or BRK-B, but no path separators
+
+# Shared store used by LoadPrices(); set PRICE_STORE.root to a folder to keep prices between runs
+PRICE_STORE = PriceStore()
+
+# Function to get prices through the shared store, e.g. LoadPrices(TICKER, START_DATE, END_DATE) instead of yf.download(...)
+def LoadPrices(tickers, start, end):
+
+    return PRICE_STORE.load(tickers, start, end)
\ No newline at end of file
@@ -0,0 +1,123 @@
+'''
+This script contains a trading calendar to line up the price series of many tickers on the same trading days.
+* The calendar is built once from the trading days of all series, and each ticker's days are located in it once.
+* Joins, ratios and returns are then gathered by integer position, instead of aligning the dates again on every operation.
+* Missing days (gaps) are handled by an explicit policy, rather than dropping every day on which any ticker is missing.
+'''
+
+import numpy as np
+import pandas as pd
+
+#---------------------------------------Gap Policies---------------------------------------
+'''
+'nan'  : a ticker has no value on the days it did not trade
+'ffill': a ticker keeps its last value on the days it did not trade (none before its first day)
+'drop' : only the days on which all the tickers of the join traded are kept
+
+* Returns are taken between consecutive days of the joined table, so with 'nan' the returns on and after a missing day
+  are NaN, with 'ffill' the return is 0 on the missing day and catches up on the next, and with 'drop' they span the gap.
+'''
+
+GAP_POLICIES = ['nan', 'ffill', 'drop']
+
+#---------------------------------------Trading Calendar---------------------------------------
+# Class to line up the price series of many tickers on a shared trading calendar
+class TradingCalendar:
+
+    def __init__(self, dates):
+        self.dates = pd.DatetimeIndex(dates).unique().sort_values() # trading days
+        self.positions = {} # positions of each ticker's trading days in the calendar
+        self.values = {} # values of each ticker on its trading days
+        self.last_positions = {} # position of each ticker's last value on or before every calendar day, -1 if none
+
+    # Function to add a ticker's price series; the values on dates outside the calendar are ignored
+    def add(self, ticker, series):
+
+        series = series.dropna().sort_index()
+        series = series[~series.index.duplicated(keep='last')] # one value per day
+        positions = self.dates.get_indexer(pd.DatetimeIndex(series.index)) # -1 for dates outside the calendar
+        inside = positions >= 0
+
+        self.positions[ticker] = positions[inside]
+        self.values[ticker] = series.to_numpy(dtype=float)[inside]
+        self.last_positions.pop(ticker, None)
+
+    # Function to add every column of a wide price table, e.g. yf.download(TICKERS)['Adj Close']
+    def add_table(self, data):
+
+        for ticker in data.columns:
+            self.add(ticker, data[ticker])
+
+    # Function to get the values of tickers on every calendar day, as a (days, tickers) array
+    def gather(self, tickers, policy='nan'):
+
+        if policy not in GAP_POLICIES:
+            raise ValueError('Unknown gap policy ' + str(policy) + ', use one of ' + ', '.join(GAP_POLICIES))
+
+        values = np.full((len(self.dates), len(tickers)), np.nan)
+        for column, ticker in enumerate(tickers):
+            if policy == 'ffill':
+                last = self._last_positions(ticker)
+                values[last >= 0, column] = self.values[ticker][last[last >= 0]]
+            else:
+                values[self.positions[ticker], column] = self.values[ticker]
+
+        return values
+
+    # Function to join tickers into one table on the calendar days
+    def join(self, tickers, policy='nan'):
+
+        values = self.gather(tickers, 'nan' if policy == 'drop' else policy)
+        table = pd.DataFrame(values, index=self.dates, columns=list(tickers))
+
+        if policy == 'drop': # only the days on which every ticker traded
+            table = table[~np.isnan(values).any(axis=1)]
+
+        return table
+
+    # Function to divide the values of one ticker by another's on the calendar days, e.g. stock prices by sector ETF prices
+    def ratio(self, numerator, denominator, policy='nan'):
+
+        table = self.join([numerator, denominator], policy)
+
+        return table[numerator] / table[denominator]
+
+    # Function to get the (log) returns of tickers between consecutive calendar days
+    def returns(self, tickers, log=False, policy='nan'):
+
+        table = self.join(tickers, policy)
+        prices = table.to_numpy()
+        returns = np.full(prices.shape, np.nan)
+        if log:
+            returns[1:] = np.log(prices[1:] / prices[:-1])
+        else:
+            returns[1:] = prices[1:] / prices[:-1] - 1
+
+        return pd.DataFrame(returns, index=table.index, columns=table.columns)
+
+    # Function to get, for every calendar day, the position of the ticker's last value on or before it
+    def _last_positions(self, ticker):
+
+        if ticker not in self.last_positions:
+            index = np.full(len(self.dates), -1)
+            index[self.positions[ticker]] = np.arange(len(self.positions[ticker]))
+            self.last_positions[ticker] = np.maximum.accumulate(index) if len(index) else index
+
+        return self.last_positions[ticker]
+
+# Function to build a calendar from the trading days of all the columns of a wide price table, and add the columns
+def TableCalendar(data):
+
+    calendar = TradingCalendar(data.index[data.notna().any(axis=1)]) # days on which at least one ticker traded
+    calendar.add_table(data)
+
+    return calendar
+
+# Function to build a calendar from the trading days of several price series, e.g. {ticker: prices}, and add the series
+def SeriesCalendar(series):
+
+    calendar = TradingCalendar(pd.DatetimeIndex(np.concatenate([s.dropna().index.to_numpy() for s in series.values()])))
+    for ticker, values in series.items():
+        calendar.add(ticker, values)
+
+    return calendar
\ No newline at end of file
@@ -22,40 +22,52 @@ import matplotlib.pyplot as plt
 from datetime import datetime
 from CandlestickPatterns import *
 from TechnicalIndicators import *
+from IndicatorCache import *
+from FeatureSet import *
 from AverageTrueRangeMeasure import *
 
+# Technical indicators used by the strategy
+MEAN_REVERSION_FEATURES = ['EMA20', 'SMA50', 'BBANDS(20,2)', 'MACD(12,26,9)', 'STOCH(5,3)', 'RSI10', 'WR10', 'WR260', 'ATR14']
+
 # Function to implement the mean reversion strategy
-def MeanReversionStrategy(data, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS):
+# Set WARM_UP_WINDOW to compute the indicators only on the lookback plus the warm-up they need, see WarmUpReport
+def MeanReversionStrategy(data, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS, WARM_UP_WINDOW=False):
 
-    df = data.copy() # make a copy of the data
+    # Computing the technical indicators together, so the steps they share are computed once
+    if WARM_UP_WINDOW:
+        df = data.tail(LOOKBACK_PERIOD_DAYS + CANDLESTICK_LOOKBACK).copy() # the candlestick patterns look back on earlier bars
+        features = ComputeFeatures(data, MEAN_REVERSION_FEATURES, INDICATOR_CACHE, len(df))
+    else:
+        df = data.copy() # make a copy of the data
+        features = ComputeFeatures(df, MEAN_REVERSION_FEATURES, INDICATOR_CACHE)
 
     # Adding indicator columns in the technical indicators table
-    df['EMA20'] = EMA(df, 20)
+    df['EMA20'] = features['EMA20']
 
-    df['SMA50'] = SMA(df, 50)
+    df['SMA50'] = features['SMA50']
 
-    bbands_columns = BBANDS(df, 20, 2)
+    bbands_columns = features['BBANDS(20,2)']
     df['UpperBBAND'] = bbands_columns[0]
     df['MiddleBBAND'] = bbands_columns[1]
     df['LowerBBAND'] = bbands_columns[2]
 
-    macd_columns = MACD(df, 12, 26, 9)
+    macd_columns = features['MACD(12,26,9)']
     df['MACD'] = macd_columns[0]
     df['MACDSignal'] = macd_columns[1]
     df['MACDHistogram'] = macd_columns[2]
 
-    so_columns = StochasticOscillator(df, 5, 3)
+    so_columns = features['STOCH(5,3)']
     df['%K'] = so_columns[0]
     df['%D'] = so_columns[1]
 
-    df['RSI10'] = RSI(df, 10)
+    df['RSI10'] = features['RSI10']
 
-    df['WR10'] = WilliamsR(df, 10)
-    df['WR260'] = WilliamsR(df, 260)
+    df['WR10'] = features['WR10']
+    df['WR260'] = features['WR260']
 
-    df['ATR'] = ATR(df, 14)
+    df['ATR'] = features['ATR14']
 
-    df = CandlestickPatterns(df)
+    df = CandlestickPatterns(df, bitmask=True) # one uint16 bitmask of the patterns per bar
 
     # Subset to include the most recent data
     df = df.tail(LOOKBACK_PERIOD_DAYS)
@@ -81,6 +93,9 @@ def MeanReversionStrategy(data, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS):
     # Minimum price change since last trade before considering trading again, this is to prevent over-trading at/around same prices
     MIN_PRICE_MOVE_FROM_LAST_TRADE = 0
 
+    trailing_atr = TrailingATR(df['ATR'], 90) # average ATR of the 90 days before each day, computed once for all days
+    patterns = df['Patterns'].to_numpy() # candlestick pattern bits, read as integers rather than through the float rows of df.iloc
+
     # Loop through prices, technical indicators, and candlestick patterns day by day
     for i in range(1,len(df)):
         high_c = df.iloc[i]['High']
@@ -104,16 +119,9 @@ def MeanReversionStrategy(data, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS):
         wr10 = df.iloc[i]['WR10']
         wr260 = df.iloc[i]['WR260']
 
-        bullish_pin_bar = df.iloc[i]['BullishPinBar']
-        bearish_pin_bar = df.iloc[i]['BearishPinBar']
-        bullish_engulfing = df.iloc[i]['BullishEngulfing']
-        bearish_engulfing = df.iloc[i]['BearishEngulfing']
-        one_white_soldier = df.iloc[i]['OneWhiteSoldier']
-        one_black_crow = df.iloc[i]['OneBlackCrow']
-        morning_star = df.iloc[i]['MorningStar']
-        evening_star = df.iloc[i]['EveningStar']
+        patterns_c = patterns[i]
 
-        atr = df.iloc[:i]['ATR'].tail(90).mean()  # Take the average ATR in the most recent 3 months
+        atr = trailing_atr[i]  # Take the average ATR in the most recent 3 months
 
         # Buy-Entry (all must be met):
         # 1. 20EMA < 50 SMA
@@ -126,7 +134,7 @@ def MeanReversionStrategy(data, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS):
         # 5. Entry price must be at least 1R lower than 20 EMA and at least 2R lower than 50 SMA
 
         if (ema20_c < sma50_c)\
-            and (bullish_pin_bar == 1 or bullish_engulfing == 1 or one_white_soldier == 1 or morning_star == 1)\
+            and HasPattern(patterns_c, BULLISH_REVERSAL)\
             and ((high_c > lbband and low_c < lbband) or (high_c < lbband))\
             and ((so_k < so_d and so_k < 20 and so_d < 20) or (rsi10 < 30) or (wr10 < -80 and wr260 < -80) or (mcad_histo > 0))\
             and (ema20_c - price_c >= atr and sma50_c - price_c >= 2 * atr)\
@@ -175,7 +183,7 @@ def MeanReversionStrategy(data, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS):
         # 5. Entry price must be at least 1R higher than 20 EMA and at least 2R higher than 50 SMA
 
         elif (ema20_c > sma50_c)\
-            and (bearish_pin_bar == 1 or bearish_engulfing == 1 or one_black_crow == 1 or evening_star == 1)\
+            and HasPattern(patterns_c, BEARISH_REVERSAL)\
             and ((high_c > ubband and low_c < ubband) or (low_c > ubband)) \
             and ((so_k > so_d and so_k > 80 and so_d > 80) or (rsi10 > 70) or (wr10 > -20 and wr260 > -20) or (mcad_histo < 0))\
             and (price_c - ema20_c >= atr and price_c - sma50_c >= 2 * atr)\
@@ -245,7 +253,8 @@ def MeanReversionStrategy(data, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS):
         # print("OpenPnL: ", open_pnl, " ClosedPnL: ", closed_pnl, " TotalPnL: ", (open_pnl + closed_pnl))
         pnls.append(closed_pnl + open_pnl)
 
-    # Preparing the dataframe from the trading strategy results
+    # Preparing the dataframe from the trading strategy results, with one True/False column per candlestick pattern
+    df = pd.concat([df.drop(columns='Patterns'), UnpackPatterns(df['Patterns'])], axis=1)
     df['Trades'] = orders
     df['Position'] = positions
     df['Pnl'] = pnls
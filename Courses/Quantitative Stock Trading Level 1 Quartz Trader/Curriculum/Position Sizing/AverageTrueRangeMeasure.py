@@ -7,16 +7,82 @@ import pandas as pd
 import numpy as np
 
 #---------------------------------------Average True Range (ATR) Measure---------------------------------------
+'''
+True Range = max ( H - L, |H - Cp|, |L - Cp| ), skipping the missing ones, e.g. |H - Cp| on the first day
+
+SMA ATR = average of the last n_period True Ranges
+Wilder ATR = ( (n_period - 1) * Previous ATR + True Range ) / n_period, started at the first SMA ATR
+EMA ATR = ( 1 - K ) * Previous ATR + K * True Range, with K = 2 / ( n_period + 1 ), started at the first SMA ATR
+
+* The price data can be for one ticker, or a multi-ticker download with one column per ticker for each price, e.g. yf.download(TICKERS).
+* For one ticker the ATR values are an array, for many a table with one column per ticker.
+'''
+
+# Center of mass C of each smoothing, K = 1 / ( 1 + C ), which is how pandas' ewm derives K
+SMOOTHING_CENTERS = {'Wilder': lambda n_period: n_period - 1, 'EMA': lambda n_period: (n_period - 1) / 2}
+
+# Function to calculate the true range, shaped (time,) for one ticker or (time, tickers) for many
+def TrueRange(data):
+
+    high, low, close = [np.asarray(data[column], dtype=float) for column in ['High', 'Low', 'Close']]
+    close_p = np.concatenate([np.full((1,) + close.shape[1:], np.nan), close[:-1]]) # prior close, none on the first day
+
+    high_low = high - low # H-L
+    high_close = np.abs(high - close_p) # |H-Cp|
+    low_close = np.abs(low - close_p) # |L-Cp|
+
+    return np.fmax(high_low, np.fmax(high_close, low_close)) # find max of the three measures for each day, skipping NaN
+
 # Function to calculate ATR
-def ATR(data, n_period): # input is a two-column price data
+def ATR(data, n_period, smoothing='SMA'): # input is the price data of one or many tickers
+
+    true_range = TrueRange(data)
+    ranges = pd.DataFrame(true_range.reshape(len(true_range), -1)) # one column per ticker
+    atr_values = ranges.rolling(n_period).mean() # average the true range over n_period days
+
+    if smoothing in SMOOTHING_CENTERS:
+        started = np.cumsum(atr_values.notna().to_numpy(), axis=0) > 0 # from the first SMA ATR on
+        first = started & (np.cumsum(started, axis=0) == 1)
+        inputs = np.where(first, atr_values, np.where(started, ranges, np.nan))
+        atr_values = pd.DataFrame(inputs).ewm(com=SMOOTHING_CENTERS[smoothing](n_period), adjust=False, ignore_na=True).mean()
+    elif smoothing != 'SMA':
+        raise ValueError('Unknown ATR smoothing ' + str(smoothing) + ', use SMA, Wilder or EMA')
+
+    atr_values = atr_values.to_numpy()
+    if true_range.ndim == 1:
+        return atr_values[:, 0]
+
+    close = data['Close']
+    if isinstance(close, pd.DataFrame): # label the values like the close price table
+        return pd.DataFrame(atr_values, index=close.index, columns=close.columns)
+
+    return atr_values.reshape(true_range.shape)
+
+#---------------------------------------Trailing ATR Average---------------------------------------
+'''
+Trailing ATR(i) = mean of the ATR of the n_period bars before bar i (fewer at the start), skipping NaN values
+
+* Equals df.iloc[:i]['ATR'].tail(n_period).mean() for every bar i at once, summed the same way, so the values are identical.
+'''
+
+# Function to average the ATR over the n_period bars before each bar, e.g. the average ATR of the most recent 3 months
+def TrailingATR(atr_values, n_period=90):
 
-    high_low = data['High'] - data['Low'] # H-L
-    high_close = np.abs(data['High'] - data['Close'].shift()) # |H-Cp|
-    low_close = np.abs(data['Low'] - data['Close'].shift()) # |L-Cp|
-    ranges = pd.concat([high_low, high_close, low_close], axis=1) # combine the above three measure
-    true_range = np.max(ranges, axis=1) # find max of the three measures for each day
-    atr_values = true_range.rolling(n_period).mean().values # average the true range over n_period days
+    values = np.asarray(atr_values, dtype=float)
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.) # NaN values are skipped, as pandas does
 
-    return atr_values
+    sums = np.full(len(values), np.nan)
+    counts = np.zeros(len(values))
+    for i in range(1, min(n_period, len(values))): # bars with fewer than n_period bars before them
+        sums[i] = filled[:i].sum()
+        counts[i] = valid[:i].sum()
+    if len(values) > n_period:
+        windows = np.lib.stride_tricks.sliding_window_view(filled[:-1], n_period) # the n_period bars before bar n_period on
+        sums[n_period:] = windows.sum(axis=1)
+        counts[n_period:] = np.lib.stride_tricks.sliding_window_view(valid[:-1], n_period).sum(axis=1)
 
+    trailing_atr = np.full(len(values), np.nan)
+    np.divide(sums, counts, out=trailing_atr, where=counts > 0) # no ATR values before the bar give NaN
 
+    return trailing_atr
\ No newline at end of file
@@ -8,21 +8,27 @@ DIR = 'C:/Users/user/Documents/GitHub/leeykjohn/Aries-Profits/Products/On-Demand
       '/Quantitative Stock Trading Level 1 Quartz Trader' \
       '/Curriculum' \
       '/Position Sizing'
+DIR_DATA = 'C:/Users/user/Documents/GitHub/leeykjohn/Aries-Profits/Products/On-Demand Video Courses' \
+           '/Quantitative Stock Trading Level 1 Quartz Trader' \
+           '/Curriculum' \
+           '/Market Data'
 import sys
 sys.path.insert(0, DIR)
+sys.path.insert(0, DIR_DATA)
 
 # Import relevant packages
-import yfinance as yf
 import pandas as pd
 import matplotlib.pyplot as plt
 from AverageTrueRangeMeasure import *
+from PriceStore import PRICE_STORE, LoadPrices
 
 TICKER = 'AXP' # Stock Ticker symbol
 START_DATE = '2020-01-20' # Stock data start date
 END_DATE = '2023-01-20' # Stock data end date
+PRICE_STORE.root = 'PriceStore' # folder to keep downloaded prices between runs
 
 # Store adjusted stock prices into a variable
-stockPx = yf.download(TICKER, START_DATE, END_DATE)
+stockPx = LoadPrices(TICKER, START_DATE, END_DATE)
 
 # Configure options to display data frames
 pd.set_option('display.max_columns', 1000) # to output 1000 columns max
@@ -3,20 +3,33 @@ This script contains code to output correlation heatmap for the selected stocks.
 '''
 
 #---------------------------------------Correlation Heatmap---------------------------------------
+# Setting working directory
+DIR = 'C:/Users/user/Documents/GitHub/leeykjohn/Aries-Profits/Products/On-Demand Video Courses' \
+      '/Quantitative Stock Trading Level 1 Quartz Trader' \
+      '/Curriculum' \
+      '/Market Data'
+import sys
+sys.path.insert(0, DIR)
+
 # Import relevant packages
-import yfinance as yf
 import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
+from TradingCalendar import *
+from PriceStore import PRICE_STORE, LoadPrices
 
 TICKERS = ['CMG', 'JPM', 'HLT', 'GLD','C']  # Stock Ticker symbols
 START_DATE = '2017-01-01'  # Stock data start date
 END_DATE = '2023-01-01'  # Stock data end date
+PRICE_STORE.root = 'PriceStore' # folder to keep downloaded prices between runs
+
 # Store adjusted stock prices into a variable
-stockPx = yf.download(TICKERS, START_DATE, END_DATE)['Adj Close']
+stockPx = LoadPrices(TICKERS, START_DATE, END_DATE)['Adj Close']
 
-# converting prices to log returns and removing NaN values
-stockLogRetList = np.log(stockPx).diff().dropna()
+# converting prices to log returns on a shared trading calendar; a missing day only drops the returns of that ticker,
+# as the correlations are taken over the days on which both tickers of each pair have returns
+calendar = TableCalendar(stockPx)
+stockLogRetList = calendar.returns(TICKERS, log=True, policy='nan')
 # visualizing correlation heatmap
 sns.heatmap(stockLogRetList.corr(), annot=True)
 plt.title("Correlations Coefficients Between Stock Log Returns")
\ No newline at end of file
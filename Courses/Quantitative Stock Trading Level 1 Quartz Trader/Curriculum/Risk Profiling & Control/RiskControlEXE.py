@@ -16,18 +16,22 @@ DIR3 = 'C:/Users/user/Documents/GitHub/leeykjohn/Aries-Profits/Products/On-Deman
        '/Quantitative Stock Trading Level 1 Quartz Trader' \
        '/Curriculum' \
        '/Risk Profiling & Control'
+DIR4 = 'C:/Users/user/Documents/GitHub/leeykjohn/Aries-Profits/Products/On-Demand Video Courses' \
+       '/Quantitative Stock Trading Level 1 Quartz Trader' \
+       '/Curriculum' \
+       '/Market Data'
 
 import sys
-sys.path += [DIR1, DIR2, DIR3]
+sys.path += [DIR1, DIR2, DIR3, DIR4]
 
 # Import relevant packages/modules
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from TrendFollowingStrategy import *
 from MeanReversionStrategy import *
 from RiskControl import *
+from PriceStore import PRICE_STORE, LoadPrices
 
 # Configure options to display data frames
 pd.set_option('display.max_columns', 1000) # to output 1000 columns max
@@ -38,9 +42,11 @@ START_DATE = '2017-01-01' # Stock data start date
 END_DATE = '2023-01-01' # Stock data end date
 TOTAL_CAPITAL = 10000 # Total capital or net liquidation value
 LOOKBACK_PERIOD_DAYS = 504 # Most recent days to view
+INDICATOR_CACHE.cache_dir = 'IndicatorCache' # folder to keep computed indicators between runs
+PRICE_STORE.root = 'PriceStore' # folder to keep downloaded prices between runs
 
 # Store adjusted stock prices into a variable
-stockPx = yf.download(TICKER, START_DATE, END_DATE)
+stockPx = LoadPrices(TICKER, START_DATE, END_DATE)
 
 # Feed price data, capital amount, and lookback period into TrendFollowingStrategy function
 tf_strategy = TrendFollowingStrategy(stockPx, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS)
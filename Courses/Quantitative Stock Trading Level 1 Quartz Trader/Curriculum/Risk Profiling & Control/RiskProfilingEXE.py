@@ -3,20 +3,29 @@ This script contains procedures to derive risk metrics such as Value-at-Risk (Va
 '''
 
 #-------------------------Probability Distribution-------------------------
+# Setting working directory
+DIR = 'C:/Users/user/Documents/GitHub/leeykjohn/Aries-Profits/Products/On-Demand Video Courses' \
+      '/Quantitative Stock Trading Level 1 Quartz Trader' \
+      '/Curriculum' \
+      '/Market Data'
+import sys
+sys.path.insert(0, DIR)
+
 # Import relevant packages
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import scipy.stats as stats
 import statsmodels.api as sm
 import matplotlib.pyplot as plt
+from PriceStore import PRICE_STORE, LoadPrices
 
 TICKER = 'SPY' # Stock Ticker symbol
 START_DATE = '2017-01-01' # Stock data start date
 END_DATE = '2022-01-01' # Stock data end date
+PRICE_STORE.root = 'PriceStore' # folder to keep downloaded prices between runs
 
 # Store adjusted stock prices into a variable
-stockPx = yf.download(TICKER, START_DATE, END_DATE)
+stockPx = LoadPrices(TICKER, START_DATE, END_DATE)
 
 # Configure options to display data frames
 pd.set_option('display.max_columns', 1000) # to output 1000 columns max
@@ -1,42 +1,140 @@
 '''
 This script contains a function to screen for stocks from Finviz.com before implementing our strategy setups.
+* Every market cap and shares outstanding combination is a separate (slow, multi-page) Finviz query,
+  so the queries run concurrently in a bounded thread pool.
+* Query results can be cached on disk for a set time (TTL), and a saved cache can be replayed offline as a snapshot.
+* A query that fails (e.g. a timeout) raises its error rather than counting as no stocks, and is not cached.
 '''
 
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
 # ! pip install finvizfinance
-from finvizfinance.screener.overview import Overview
-
-def FinvizScreener(fsector, fmarket_cap, fprice, fshares_oustanding, faverage_volume):
-
-    # Define small, medium, and large market cap.
-    fmarket_cap_dict = {"Large Cap": ["Mega ($200bln and more)", "Large ($10bln to $200bln)"],
-                        "Medium Cap": ["Mid ($2bln to $10bln)"],
-                        "Samll Cap": ["Small ($300mln to $2bln)", "Micro (over $50mln)", "Nano (under $50mln)"]}
-
-    # Iiterate through definitions that matches the specified market cap.
-    for i in range(len(fmarket_cap_dict[fmarket_cap])):
-        foverview = Overview() # create an overview object to display filtered stocks
-        fset１ = {'Sector': fsector
-                 , 'Market Cap.':fmarket_cap_dict[fmarket_cap][i]
-                 , 'Price':fprice
-                 , 'Shares Outstanding':fshares_oustanding[0]
-                 , 'Average Volume': faverage_volume} # first set of filters with first outstanding shares criterion
-        foverview.set_filter(filters_dict=fset１) # input filter settings into overview object
-        try:
-            ticker_list1 = foverview.screener_view()["Ticker"].to_list() # extract first list of filtered stocks
-        except:
-            ticker_list1 = [] # if there are no filtered stocks, then set an empty list
-
-        fset2 = {'Sector': fsector
-            , 'Market Cap.': fmarket_cap_dict[fmarket_cap][i]
-            , 'Price': fprice
-            , 'Shares Outstanding': fshares_oustanding[1]
-            , 'Average Volume': faverage_volume} # second set of filters with second shares outstanding shares criterion
-        foverview.set_filter(filters_dict=fset2) # input filter settings into overview object
-        try:
-            ticker_list2 = foverview.screener_view()["Ticker"].to_list() # extract second list of filtered stocks
-        except:
-            ticker_list2 = [] # if there are no filtered stocks, then set an empty list
-
-        final_ticker = list(set(ticker_list1) & set(ticker_list2)) # find common stock tickers in both filters lists
-
-    return final_ticker
\ No newline at end of file
+try:
+    from finvizfinance.screener.overview import Overview
+except ImportError: # offline snapshots can be replayed without finvizfinance, e.g. in CI
+    Overview = None
+
+# Define small, medium, and large market cap.
+MARKET_CAP_DICT = {"Large Cap": ["Mega ($200bln and more)", "Large ($10bln to $200bln)"],
+                   "Medium Cap": ["Mid ($2bln to $10bln)"],
+                   "Small Cap": ["Small ($300mln to $2bln)", "Micro ($50mln to $300mln)", "Nano (under $50mln)"]}
+MARKET_CAP_DICT["Samll Cap"] = MARKET_CAP_DICT["Small Cap"] # earlier spelling, kept so existing settings still work
+
+MAX_WORKERS = 6 # most Finviz queries running at the same time
+
+#---------------------------------------Screener Cache---------------------------------------
+'''
+Key = SHA-256 ( filter dictionary, with sorted keys )
+
+* Each query's screener table is kept as a .csv file, and reused until it is older than the TTL.
+* With offline=True the cached tables are replayed whatever their age, and queries that are not cached raise an error
+  instead of reaching Finviz, so a saved cache folder works as a snapshot for CI and offline backtests.
+'''
+
+# Class to cache Finviz screener tables on disk
+class ScreenerCache:
+
+    def __init__(self, cache_dir=None, ttl=24 * 60 * 60, offline=False):
+        self.cache_dir = cache_dir # folder for the .csv files, or None to query Finviz every time
+        self.ttl = ttl # seconds a cached table stays fresh
+        self.offline = offline # replay the cached tables only, with no network access
+
+    # Function to get the screener table of a filter dictionary, from the cache if it is fresh (or offline)
+    def screen(self, overview, fset):
+
+        path = self._path(fset)
+        if path is not None and os.path.exists(path) and (self.offline or time.time() - os.path.getmtime(path) < self.ttl):
+            return pd.read_csv(path, dtype={'Ticker': str}, keep_default_na=False, na_values=['']) # tickers such as NA stay text
+
+        if self.offline:
+            raise LookupError('No screener snapshot for ' + json.dumps(fset, sort_keys=True) + ' in ' + str(self.cache_dir))
+
+        table = _query(overview, fset) # a failed query raises here, so only successful results are cached
+        if path is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            handle, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+            with os.fdopen(handle, 'w', newline='') as f:
+                table.to_csv(f, index=False)
+            os.replace(tmp_path, path) # readers never see a partial file
+
+        return table
+
+    # Function to get the .csv file path of a filter dictionary
+    def _path(self, fset):
+
+        if self.cache_dir is None:
+            return None
+
+        key = hashlib.sha256(json.dumps(fset, sort_keys=True).encode()).hexdigest()
+
+        return os.path.join(self.cache_dir, key + '.csv')
+
+# Shared cache used by FinvizScreener; set SCREENER_CACHE.cache_dir to a folder to keep results between runs
+SCREENER_CACHE = ScreenerCache()
+
+# Function to run one Finviz query and return the screener table
+def _query(overview, fset):
+
+    if overview is None:
+        raise ImportError('finvizfinance is needed to query Finviz; install it or replay a snapshot with offline=True')
+
+    foverview = overview() # create an overview object per query, as the queries run in parallel
+    foverview.set_filter(filters_dict=fset) # input filter settings into overview object
+    table = foverview.screener_view() # errors, e.g. timeouts or HTTP errors, are raised so they are never cached as no stocks
+    if table is None or "Ticker" not in table.columns:
+        table = pd.DataFrame({"Ticker": []}) # if there are no filtered stocks, then set an empty table
+
+    return table
+
+# Function to run one (cached) Finviz query and extract the filtered stock tickers
+def _screen(overview, fset, cache):
+
+    return cache.screen(overview, fset)["Ticker"].to_list() # extract list of filtered stocks
+
+#---------------------------------------Finviz Screener---------------------------------------
+'''
+Result = stocks in every outstanding shares list of a market cap, for any of the market caps, in the order Finviz lists them
+
+* No outstanding shares criteria means no filter on the shares outstanding, i.e. ['Any'].
+* The same filters and merge are used by the local screener in FundamentalsScreener.py, so both give the same stocks.
+'''
+
+# Function to make one filter dictionary for every market cap (outer list) and outstanding shares criterion (inner list)
+def ScreenerFilters(fsector, fmarket_cap, fprice, fshares_outstanding, faverage_volume):
+
+    return [[{'Sector': fsector
+              , 'Market Cap.': fmarket_cap_i
+              , 'Price': fprice
+              , 'Shares Outstanding': fshares_outstanding_j
+              , 'Average Volume': faverage_volume} for fshares_outstanding_j in (list(fshares_outstanding) or ['Any'])]
+            for fmarket_cap_i in MARKET_CAP_DICT[fmarket_cap]]
+
+# Function to merge the ticker lists of the filters of ScreenerFilters into the final list of stocks
+def MergeTickerLists(ticker_lists):
+
+    final_ticker = []
+    for ticker_lists_i in ticker_lists:
+        common = set.intersection(*[set(ticker_list) for ticker_list in ticker_lists_i]) # find common stock tickers in all filters lists
+        final_ticker += [t for t in ticker_lists_i[0] if t in common and t not in final_ticker]
+
+    return final_ticker
+
+def FinvizScreener(fsector, fmarket_cap, fprice, fshares_outstanding, faverage_volume, overview=Overview, max_workers=MAX_WORKERS,
+                   cache=None):
+
+    cache = SCREENER_CACHE if cache is None else cache
+    fsets = ScreenerFilters(fsector, fmarket_cap, fprice, fshares_outstanding, faverage_volume)
+
+    # Run all the queries at once, at most max_workers at a time
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        ticker_lists = [[executor.submit(_screen, overview, fset, cache) for fset in fsets_i] for fsets_i in fsets]
+        ticker_lists = [[future.result() for future in futures] for futures in ticker_lists]
+
+    return MergeTickerLists(ticker_lists)
\ No newline at end of file
@@ -11,16 +11,19 @@ sys.path.insert(0, DIR)
 # Import relevant packages
 # ! pip install pyperclip
 import pyperclip
-from FinvizScreener import FinvizScreener
+from FinvizScreener import FinvizScreener, SCREENER_CACHE
 
 # Setting filter criteria into variables
 fsector = "Consumer Cyclical" # stock sector
-fmarket_cap = "Medium Cap" # market size
+fmarket_cap = "Medium Cap" # market size: "Large Cap", "Medium Cap" or "Small Cap"
 fprice = "Over $10" # stock price
-fshares_oustanding = ("Over 5M", "Under 20M") # # of shares outstanding
+fshares_outstanding = ("Over 5M", "Under 20M") # # of shares outstanding
 faverage_volume = "Over 200K" # stock average volume
+SCREENER_CACHE.cache_dir = 'FinvizCache' # folder to keep screener results between runs
+SCREENER_CACHE.ttl = 24 * 60 * 60 # seconds before screener results are queried again
+SCREENER_CACHE.offline = False # True to replay the saved screener results without querying Finviz
 
 # Return the list of stocks that meet the specified criteria
-final_ticker = FinvizScreener(fsector, fmarket_cap, fprice, fshares_oustanding, faverage_volume)
+final_ticker = FinvizScreener(fsector, fmarket_cap, fprice, fshares_outstanding, faverage_volume)
 final_ticker_text = ', '.join([t for t in final_ticker]) # convert list to string
 pyperclip.copy(final_ticker_text) # copy the string of filtered stock symbols (equivalent to CTRL + C)
\ No newline at end of file
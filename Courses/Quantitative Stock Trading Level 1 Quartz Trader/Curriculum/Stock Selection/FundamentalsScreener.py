@@ -0,0 +1,205 @@
+'''
+This script contains a local stock screener that applies the Finviz filters to a saved table of fundamentals.
+* A snapshot (sector, market cap, price, shares outstanding, average volume per stock) is loaded into columns once,
+  with a bitmap per sector and a sorted index per number, so every filter is an array lookup instead of a web query.
+* The filters are the same dictionaries FinvizScreener sends to Finviz, e.g. {'Price': 'Over $10', 'Market Cap.': 'Mid ($2bln to $10bln)'}.
+* Snapshots are kept by date, so a backtest can screen with the fundamentals known at the time (point in time).
+'''
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from FinvizScreener import MergeTickerLists, ScreenerFilters
+
+#---------------------------------------Fundamentals Snapshot---------------------------------------
+'''
+The columns of Finviz exports and saved screener tables are renamed to the filter names, e.g. 'Last' -> 'Price',
+and the numbers are read with their units, e.g. '4,080 M' -> 4,080,000,000 or '22,133,057' -> 22,133,057.
+Market caps without a unit are in millions, as in Finviz exports, whether they are read as text or as numbers,
+so a .csv file path and the same file read with pd.read_csv give the same snapshot.
+Sector names are mapped to Finviz's, e.g. 'Consumer Discretionary' -> 'Consumer Cyclical'.
+'''
+
+COLUMN_ALIASES = {'Ticker': ['Ticker', 'Symbol'],
+                  'Sector': ['Sector'],
+                  'Market Cap.': ['Market Cap.', 'Market Cap', 'MarketCap'],
+                  'Price': ['Price', 'Last', 'Close'],
+                  'Shares Outstanding': ['Shares Outstanding', 'Shs Outstand', 'Shares'],
+                  'Average Volume': ['Average Volume', 'Avg Volume', 'VolumeAvg']} # snapshot column names of each filter
+NUMBER_FIELDS = ['Market Cap.', 'Price', 'Shares Outstanding', 'Average Volume'] # filters on numbers
+SECTOR_ALIASES = {'Consumer Discretionary': 'Consumer Cyclical', 'Consumer Staples': 'Consumer Defensive',
+                  'Materials': 'Basic Materials', 'Health Care': 'Healthcare', 'Information Technology': 'Technology',
+                  'Financials': 'Financial'} # GICS sector names to Finviz's
+UNITS = {'': 1, 'K': 1e3, 'M': 1e6, 'MLN': 1e6, 'B': 1e9, 'BLN': 1e9, 'T': 1e12}
+
+# Function to read a number with an optional unit, e.g. '4,080 M', '$2bln', '22,133,057' or 4080.0, NaN if there is none
+def _number(text, unit=1):
+
+    if isinstance(text, (int, float, np.number)): # numbers have no unit written, as text without a unit
+        return float(text) * unit
+
+    match = re.fullmatch(r'\$?\s*([-+]?[\d,]*\.?\d+)\s*([a-zA-Z]*)', str(text).strip())
+    if match is None or match.group(2).upper() not in UNITS:
+        return np.nan
+
+    return float(match.group(1).replace(',', '')) * (UNITS[match.group(2).upper()] if match.group(2) else unit)
+
+# Function to read a fundamentals table, e.g. a Finviz export or a saved screener table, into the filter columns
+def ReadFundamentals(data):
+
+    table = pd.read_csv(data, dtype=str, keep_default_na=False, encoding='utf-8-sig') if isinstance(data, str) else data
+    fundamentals = pd.DataFrame(index=range(len(table)))
+    for field, aliases in COLUMN_ALIASES.items():
+        column = next((c for c in aliases if c in table.columns), None)
+        if column is None:
+            raise KeyError('The fundamentals table needs a ' + ' or '.join(aliases) + ' column')
+        values = table[column].to_list()
+        if field in NUMBER_FIELDS:
+            unit = 1e6 if field == 'Market Cap.' else 1 # market caps are in millions unless a unit is given
+            fundamentals[field] = [_number(value, unit) for value in values]
+        else:
+            fundamentals[field] = [SECTOR_ALIASES.get(value, value) if field == 'Sector' else value for value in values]
+
+    return fundamentals
+
+#---------------------------------------Filter Predicates---------------------------------------
+'''
+'Over X'         : X < value
+'Under X'        : value < X
+'X to Y'         : X <= value < Y
+'X and more'     : X <= value
+'Any' or ''      : every value, unknown (NaN) ones included
+
+* A label in front of a range is ignored, e.g. 'Mid ($2bln to $10bln)' is '$2bln to $10bln'.
+'''
+
+# Function to turn a Finviz number filter, e.g. 'Over $10' or 'Mid ($2bln to $10bln)', into [low, high, low included]
+def _number_range(text):
+
+    condition = text.strip()
+    inner = re.search(r'\(([^)]*)\)', condition)
+    if inner is not None: # a labelled range
+        condition = inner.group(1).strip()
+    condition = condition.lower()
+
+    if condition in ['any', '']:
+        return [-np.inf, np.inf, True]
+    if condition.startswith('over '):
+        return [_number(condition[5:]), np.inf, False]
+    if condition.startswith('under '):
+        return [-np.inf, _number(condition[6:]), True]
+    if condition.endswith(' and more'):
+        return [_number(condition[:-9]), np.inf, True]
+    if ' to ' in condition:
+        low, high = condition.split(' to ')
+        return [_number(low), _number(high), True]
+
+    raise ValueError('Unknown filter ' + text)
+
+#---------------------------------------Indexed Snapshot---------------------------------------
+# Class to screen one fundamentals snapshot with indexes
+class FundamentalsIndex:
+
+    def __init__(self, fundamentals):
+        fundamentals = ReadFundamentals(fundamentals)
+        self.tickers = fundamentals['Ticker'].to_numpy(dtype=object)
+
+        # Bitmap of the stocks in each sector
+        sectors = fundamentals['Sector'].to_numpy(dtype=object)
+        self.sectors = {sector: sectors == sector for sector in set(sectors)}
+
+        # Stocks sorted by each number, with NaN (unknown) values last so they only pass 'Any'
+        self.order = {}
+        self.sorted_values = {}
+        for field in NUMBER_FIELDS:
+            values = fundamentals[field].to_numpy(dtype=float)
+            self.order[field] = np.argsort(values, kind='stable')
+            self.sorted_values[field] = values[self.order[field]]
+        self.cache = {} # mask of each (field, filter) evaluated so far
+
+    # Function to get the mask of the stocks that pass one filter
+    def mask(self, field, condition):
+
+        key = (field, condition)
+        if key in self.cache:
+            return self.cache[key]
+
+        if field not in ['Sector'] + NUMBER_FIELDS:
+            raise ValueError('Filter ' + field + ' is not in the fundamentals snapshot')
+
+        if condition.strip() in ['Any', '']: # every stock, unknown values included, as on Finviz
+            mask = np.ones(len(self.tickers), dtype=bool)
+        elif field == 'Sector':
+            mask = self.sectors.get(condition, np.zeros(len(self.tickers), dtype=bool))
+        else:
+            low, high, low_included = _number_range(condition)
+            values = self.sorted_values[field]
+            start = np.searchsorted(values, low, side='left' if low_included else 'right')
+            end = np.searchsorted(values, high, side='left')
+            if high == np.inf: # NaN values sort after inf and never pass
+                end = np.searchsorted(values, np.inf, side='right')
+            mask = np.zeros(len(self.tickers), dtype=bool)
+            mask[self.order[field][start:end]] = True
+
+        mask.flags.writeable = False
+        self.cache[key] = mask
+
+        return mask
+
+    # Function to list the stocks that pass every filter of a filter dictionary, as FinvizScreener sends to Finviz
+    def screen(self, fset):
+
+        mask = np.ones(len(self.tickers), dtype=bool)
+        for field, condition in fset.items():
+            mask = mask & self.mask(field, condition)
+
+        return self.tickers[mask].tolist()
+
+#---------------------------------------Point-in-Time Screener---------------------------------------
+# Class to screen with the fundamentals snapshot that was current on a given date
+class FundamentalsScreener:
+
+    def __init__(self):
+        self.snapshots = {} # indexed snapshot of each date
+
+    # Function to add a snapshot of the fundamentals on a date, e.g. a Finviz export
+    def add(self, fundamentals, date):
+
+        self.snapshots[pd.Timestamp(date)] = FundamentalsIndex(fundamentals)
+
+    # Function to get the latest snapshot on or before a date, or the latest one if no date is given
+    def snapshot(self, date=None):
+
+        dates = sorted(self.snapshots)
+        if date is not None:
+            dates = [d for d in dates if d <= pd.Timestamp(date)]
+        if not dates:
+            raise LookupError('No fundamentals snapshot on or before ' + str(date))
+
+        return self.snapshots[dates[-1]]
+
+    # Function to list the stocks that pass every filter of a filter dictionary on a date
+    def screen(self, fset, date=None):
+
+        return self.snapshot(date).screen(fset)
+
+# Function to load every dated snapshot in a folder, e.g. 20230118StocksToShortFinal.csv is the snapshot of 2023-01-18
+def LoadFundamentals(folder):
+
+    screener = FundamentalsScreener()
+    for name in sorted(os.listdir(folder)):
+        match = re.match(r'(\d{8})', name)
+        if match is not None and name.endswith('.csv'):
+            screener.add(os.path.join(folder, name), pd.to_datetime(match.group(1), format='%Y%m%d'))
+
+    return screener
+
+# Function to screen locally with the same inputs and result as FinvizScreener, on the snapshot current on a date
+def LocalScreener(screener, fsector, fmarket_cap, fprice, fshares_outstanding, faverage_volume, date=None):
+
+    snapshot = screener.snapshot(date)
+    fsets = ScreenerFilters(fsector, fmarket_cap, fprice, fshares_outstanding, faverage_volume)
+
+    return MergeTickerLists([[snapshot.screen(fset) for fset in fsets_i] for fsets_i in fsets])
\ No newline at end of file
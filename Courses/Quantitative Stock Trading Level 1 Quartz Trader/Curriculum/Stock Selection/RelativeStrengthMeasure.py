@@ -1,8 +1,10 @@
 '''
 This script contains functions to derive Relative Strength measure for the screened stocks relative to their sectors.
+* RSMatrix derives the RS, RS SMAs and RS ranks of a whole universe of stocks at once, from one wide price table.
 '''
 
 import statistics as stats
+import numpy as np
 import pandas as pd
 
 #---------------------------------------Relative Strength (RS) Measure---------------------------------------
@@ -32,8 +34,47 @@ def RSSMA(rs_df, n_period):
 
     return rs_sma_values
 
+#---------------------------------------Relative Strength (RS) Matrix---------------------------------------
+'''
+RS ( t, stock ) = Price ( t, stock ) / Price ( t, sector ETF of the stock )
+RS SMA ( t ) = ( Cumulative RS ( t ) - Cumulative RS ( t - n ) ) / n, averaging fewer RS values at the start as RSSMA does
+RS Rank ( t, stock ) = percentile of RS ( t, stock ) / RS SMA ( t, stock ) among all stocks on day t, from 0 to 1
+
+* The RS of stocks in different sectors are ratios to different ETFs, so the stocks are ranked on how far their RS is
+  above or below its own SMA, which is comparable across sectors.
+* Windows with a missing price (NaN) have no RS SMA, as in RSSMA.
+'''
+
+SECTOR_ETFS = ['XLB', 'XLC', 'XLE', 'XLF', 'XLI', 'XLK', 'XLP', 'XLRE', 'XLU', 'XLV', 'XLY'] # SPDR sector ETFs
+
+# Function to average the last n_period RS values of every stock from cumulative sums
+def _rs_sma(rs_values, n_period):
+
+    valid = ~np.isnan(rs_values)
+    reference = rs_values[np.argmax(valid, axis=0), np.arange(rs_values.shape[1])] # first RS of each stock, to keep the sums small
+    deviations = np.where(valid, rs_values - reference, 0.)
+
+    sums = np.concatenate([np.zeros((1, rs_values.shape[1])), np.cumsum(deviations, axis=0)])
+    missing = np.concatenate([np.zeros((1, rs_values.shape[1])), np.cumsum(~valid, axis=0)])
+    end = np.arange(1, len(rs_values) + 1)
+    start = np.maximum(end - n_period, 0)
+    counts = (end - start)[:, None] # RS values in each window
+
+    rs_sma_values = (sums[end] - sums[start]) / counts + reference
 
+    return np.where(missing[end] - missing[start] > 0, np.nan, rs_sma_values)
 
+# Function to calculate the RS, RS SMAs and RS percentile ranks of many stocks relative to their sector ETFs
+def RSMatrix(data, sectors, periods=(50, 150, 200), rank_period=50): # input is a wide price table with stocks and sector ETFs, e.g. yf.download(...)['Adj Close']
 
+    stocks = list(sectors)
+    prices = np.asarray(data[stocks], dtype=float)
+    etf_prices = np.asarray(data[[sectors[stock] for stock in stocks]], dtype=float)
+    rs_values = prices / etf_prices # divide stock prices with Sector ETF prices to get RS
 
+    rs_df = pd.DataFrame(rs_values, index=data.index, columns=stocks)
+    rs_sma = {n_period: pd.DataFrame(_rs_sma(rs_values, n_period), index=data.index, columns=stocks)
+              for n_period in sorted(set(periods) | {rank_period})}
+    rs_rank = (rs_df / rs_sma[rank_period]).rank(axis=1, pct=True) # percentile of each stock on each day
 
+    return [rs_df, {n_period: rs_sma[n_period] for n_period in periods}, rs_rank]
@@ -4,14 +4,20 @@ This program guides users to visualize stock prices with the Relative Strength m
 
 # Setting working directory
 DIR = 'C:/Users/user/Documents/GitHub/leeykjohn/Aries-Profits/Products/On-Demand Video Courses/Quantitative Stock Trading Level 1 Quartz Trader/Curriculum/Stock Selection'
+DIR_DATA = 'C:/Users/user/Documents/GitHub/leeykjohn/Aries-Profits/Products/On-Demand Video Courses' \
+           '/Quantitative Stock Trading Level 1 Quartz Trader' \
+           '/Curriculum' \
+           '/Market Data'
 import sys
 sys.path.insert(0, DIR)
+sys.path.insert(0, DIR_DATA)
 
 # Import relevant packages
-import yfinance as yf
 import pandas as pd
 import matplotlib.pyplot as plt
-from RelativeStrengthMeasure import RS, RSSMA
+from RelativeStrengthMeasure import RS, RSSMA, RSMatrix
+from PriceStore import PRICE_STORE, LoadPrices
+from BulkDownloader import BulkDownload
 
 df = pd.read_csv('C:/Users/user/Documents/GitHub/leeykjohn/Aries-Profits/Products/On-Demand Video Courses/Quantitative Stock Trading Level 1 Quartz Trader/Curriculum'
                  '/Stock Selection/20230118StocksToShortFinal.csv')
@@ -19,9 +25,16 @@ TICKERS = df['Symbol'].to_list()
 BENCHMARK = 'XLY'
 START_DATE = '2022-01-18' # Stock data start date
 END_DATE = '2023-01-18' # Stock data end date
+PRICE_STORE.root = 'PriceStore' # folder to keep downloaded prices between runs
+
+# Download the prices of the whole list in concurrent batches, then leave out the stocks that could not be downloaded
+failed = BulkDownload(TICKERS + [BENCHMARK], START_DATE, END_DATE)
+if failed:
+    print('No prices for: ' + ', '.join(failed))
+TICKERS = [t for t in TICKERS if t not in failed]
 
 # Store adjusted stock prices into a variable
-stockPx = yf.download(TICKERS + [BENCHMARK], START_DATE, END_DATE)
+stockPx = LoadPrices(TICKERS + [BENCHMARK], START_DATE, END_DATE)
 
 # Configure options to display data frames
 pd.set_option('display.max_columns', 1000) # to output 1000 columns max
@@ -31,13 +44,17 @@ pd.set_option('display.width', 1000) # adjust console size to display data frame
 stockRS = stockPx['Adj Close'].copy()
 
 #---------------------------------------Relative Strength (RS)---------------------------------------
+# Calculate RS, RS SMA and RS rank values for all stocks vs sector at once
+rs_all, rs_sma_all, rs_rank = RSMatrix(stockRS, {t: BENCHMARK for t in TICKERS}, periods=(50, 150, 200))
+print(rs_rank.tail(1).T.sort_values(rs_rank.index[-1], ascending=False)) # stocks ranked by RS vs its 50-day SMA on the last day
+
 for t in TICKERS:
-    # Calculate RS values for each stock vs sector
-    rs_df = RS(stockRS[[t, BENCHMARK]])
-    # Calculate RS SMA values for each stock vs sector
-    rs_df['RSSMA50'] = RSSMA(rs_df, 50)
-    rs_df['RSSMA150'] = RSSMA(rs_df, 150)
-    rs_df['RSSMA200'] = RSSMA(rs_df, 200)
+    # RS values for each stock vs sector
+    rs_df = pd.DataFrame({'RS': rs_all[t]})
+    # RS SMA values for each stock vs sector
+    rs_df['RSSMA50'] = rs_sma_all[50][t]
+    rs_df['RSSMA150'] = rs_sma_all[150][t]
+    rs_df['RSSMA200'] = rs_sma_all[200][t]
 
     # Visualizing recent 200-day adjusted close price, RS, and RS SMA values
     fig = plt.figure()
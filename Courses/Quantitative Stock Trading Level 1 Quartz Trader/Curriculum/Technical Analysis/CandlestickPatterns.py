@@ -1,87 +1,396 @@
 '''
 This script contains function to identify candlestick patterns in the stock market.
 * In practice, candlestick patterns MUST be used with technical indicators to generate trading signals.
+* Every pattern is declared as rules in PATTERNS, and all patterns are compiled into one vectorized evaluation over all bars.
+* More patterns can be added with RegisterPattern, e.g. the ones in MORE_PATTERNS.
+* ScanPatterns finds the patterns of many tickers at once and lists only the hits, one (Date, Ticker, Pattern) row each.
+* With bitmask=True, all the patterns of a bar are packed into one uint16 'Patterns' column, one bit per pattern.
 '''
 
 # Import relevant packages
+import ast
+
+import numpy as np
 import pandas as pd
 
-# Function to generate candlestick pattern logics
-def CandlestickPatterns(data):
+CANDLESTICK_LOOKBACK = 2 # bars before the current one that the patterns look at
+
+#---------------------------------------Pattern Bits---------------------------------------
+'''
+Patterns = sum of 2^Bit for every pattern found on the bar, e.g. Bullish Pin Bar + Morning Star = 2^0 + 2^6 = 65
+
+* A bar has a pattern if Patterns & PATTERN_BITS[pattern] != 0, and any of several patterns if Patterns & (their bits OR-ed) != 0.
+'''
+
+PATTERN_NAMES = ['BullishPinBar', 'BearishPinBar', 'BullishEngulfing', 'BearishEngulfing',
+                 'OneWhiteSoldier', 'OneBlackCrow', 'MorningStar', 'EveningStar'] # in bit order, registered patterns are appended
+PATTERN_BITS = {name: 1 << bit for bit, name in enumerate(PATTERN_NAMES)} # bit of each pattern
+MAX_PATTERNS = 16 # bits in the uint16 bitmask
+
+# Function to combine patterns into one mask, e.g. PatternMask('BullishPinBar', 'MorningStar')
+def PatternMask(*names):
+
+    mask = 0
+    for name in names:
+        mask |= PATTERN_BITS[name]
+
+    return np.uint16(mask)
+
+BULLISH_REVERSAL = PatternMask('BullishPinBar', 'BullishEngulfing', 'OneWhiteSoldier', 'MorningStar') # any bullish pattern
+BEARISH_REVERSAL = PatternMask('BearishPinBar', 'BearishEngulfing', 'OneBlackCrow', 'EveningStar') # any bearish pattern
+
+# Function to test a bar (or an array/column of bars) for any of the patterns in a mask
+def HasPattern(patterns, mask):
+
+    return (patterns & mask) != 0
+
+# Function to pack pattern columns (True/False/NaN) into one uint16 bitmask per bar
+def PackPatterns(df):
+
+    patterns = np.zeros(len(df), dtype=np.uint16)
+    for name in PATTERN_NAMES:
+        if name in df.columns:
+            patterns[df[name].to_numpy() == True] |= PATTERN_BITS[name] # NaN counts as no pattern
+
+    return patterns
+
+# Function to unpack a bitmask column back into one True/False column per pattern
+def UnpackPatterns(patterns, names=PATTERN_NAMES):
+
+    index = patterns.index if isinstance(patterns, pd.Series) else None
+    patterns = np.asarray(patterns, dtype=np.uint16)
+
+    return pd.DataFrame({name: (patterns & PATTERN_BITS[name]) != 0 for name in names}, index=index)
+
+# Function to take the smaller of two price arrays like Python's min(a, b), which returns a unless b < a (also for NaN)
+def _min(a, b):
+
+    return np.where(b < a, b, a)
+
+# Function to take the larger of two price arrays like Python's max(a, b), which returns a unless b > a (also for NaN)
+def _max(a, b):
+
+    return np.where(b > a, b, a)
+
+#---------------------------------------Pattern Rules---------------------------------------
+'''
+Each pattern is a list of rules that must all hold, written as comparisons of bar fields, e.g. 'Body <= Range / 3'.
+Field[k] refers to the bar k bars before the current one, e.g. 'Low < Low[1]' is a low below the previous low.
+
+Body = |Open - Close|
+Range = High - Low
+Body Top = max(Open, Close)
+Body Bottom = min(Open, Close)
+Upper Shadow = High - Body Top
+Lower Shadow = Body Bottom - Low
+'''
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Body', 'Range', 'BodyTop', 'BodyBottom', 'UpperShadow', 'LowerShadow']
+
+PATTERNS = {
+    # Bullish Pin Bar
+    'BullishPinBar': ['Body <= Range / 3',
+                      'BodyBottom > (High + Low) / 2',
+                      'Low < Low[1]'],
+    # Bearish Pin Bar
+    'BearishPinBar': ['Body <= Range / 3',
+                      'BodyTop < (High + Low) / 2',
+                      'High > High[1]'],
+    # Bullish Engulfing
+    'BullishEngulfing': ['Close[1] < Open[1]',
+                         'Close > Open',
+                         'High > High[1]',
+                         'Low < Low[1]',
+                         'Close > Open[1]',
+                         'Open < Close[1]',
+                         'Body >= 0.8 * Range'],
+    # Bearish Engulfing
+    'BearishEngulfing': ['Close[1] > Open[1]',
+                         'Close < Open',
+                         'High > High[1]',
+                         'Low < Low[1]',
+                         'Close < Open[1]',
+                         'Open > Close[1]',
+                         'Body >= 0.8 * Range'],
+    # One White Soldier (OWS)
+    'OneWhiteSoldier': ['Close[1] < Open[1]',
+                        'Close > Open',
+                        'Body[1] >= 0.8 * Range[1]',
+                        'Body >= 0.8 * Range',
+                        'Open > Close[1]',
+                        'Close > High[1]'],
+    # One Black Crow (OBC)
+    'OneBlackCrow': ['Close[1] > Open[1]',
+                     'Close < Open',
+                     'Body[1] >= 0.8 * Range[1]',
+                     'Body >= 0.8 * Range',
+                     'Open < Close[1]',
+                     'Close < Low[1]'],
+    # Morning Star
+    'MorningStar': ['Close[2] < Open[2]',
+                    'Body[2] >= 0.6 * Range[2]',
+                    'Body[1] <= 0.2 * Range[1]',
+                    'BodyTop[1] < Close[2]',
+                    'BodyTop[1] < Open',
+                    'Close > Open',
+                    'Close > (Open[2] + Close[2]) / 2'],
+    # Evening Star
+    'EveningStar': ['Close[2] > Open[2]',
+                    'Body[2] >= 0.6 * Range[2]',
+                    'Body[1] <= 0.2 * Range[1]',
+                    'BodyBottom[1] > Close[2]',
+                    'BodyTop[1] > Open',
+                    'Close < Open',
+                    'Close < (Open[2] + Close[2]) / 2'],
+}
+
+# Further patterns that can be added with RegisterPattern(name, MORE_PATTERNS[name])
+MORE_PATTERNS = {
+    # Hammer: small body at the top of the range after a lower low
+    'Hammer': ['LowerShadow >= 2 * Body',
+               'UpperShadow <= 0.1 * Range',
+               'Low < Low[1]'],
+    # Doji: open and close (almost) equal
+    'Doji': ['Body <= 0.1 * Range'],
+    # Three White Soldiers: three strong up days, each opening in the body of the previous one
+    'ThreeWhiteSoldiers': ['Close[2] > Open[2]', 'Close[1] > Open[1]', 'Close > Open',
+                           'Close[1] > Close[2]', 'Close > Close[1]',
+                           'Open[1] > Open[2]', 'Open[1] < Close[2]',
+                           'Open > Open[1]', 'Open < Close[1]',
+                           'Body[2] >= 0.6 * Range[2]', 'Body[1] >= 0.6 * Range[1]', 'Body >= 0.6 * Range'],
+    # Bullish Harami: small up day inside the body of a long down day
+    'BullishHarami': ['Close[1] < Open[1]',
+                      'Body[1] >= 0.6 * Range[1]',
+                      'Close > Open',
+                      'BodyTop < Open[1]',
+                      'BodyBottom > Close[1]'],
+    # Bearish Harami: small down day inside the body of a long up day
+    'BearishHarami': ['Close[1] > Open[1]',
+                      'Body[1] >= 0.6 * Range[1]',
+                      'Close < Open',
+                      'BodyTop < Close[1]',
+                      'BodyBottom > Open[1]'],
+}
+
+# Function to add a pattern to PATTERNS, e.g. RegisterPattern('Doji', ['Body <= 0.1 * Range'])
+def RegisterPattern(name, rules):
+
+    global _compiled_patterns
+
+    if name in PATTERNS:
+        raise ValueError(name + ' is already registered')
+    if not rules:
+        raise ValueError(name + ' needs at least one rule')
+    if len(PATTERNS) >= MAX_PATTERNS:
+        raise ValueError('At most ' + str(MAX_PATTERNS) + ' patterns fit in the bitmask')
+    for rule in rules:
+        _parse_rule(rule) # check the rule before registering it
+
+    PATTERNS[name] = list(rules)
+    PATTERN_NAMES.append(name)
+    PATTERN_BITS[name] = 1 << (len(PATTERN_NAMES) - 1)
+    _compiled_patterns = None # compile again with the new pattern
+
+#---------------------------------------Pattern Compiler---------------------------------------
+'''
+All rules of all patterns are compiled into a single function, in which
+* every field of every bar (e.g. Body[1]) is computed once, as an array over all bars,
+* every distinct rule is evaluated once, even if several patterns use it,
+* every pattern is the AND of its rules.
+
+The single-bar version reads Open, High, Low and Close straight from a ring buffer of bars, and computes the other fields
+inline with the same arithmetic as the arrays (e.g. max(Open, Close) as Close if Close > Open else Open), without function calls.
+'''
+
+_compiled_patterns = None # compiled evaluation of PATTERNS, or None if it has to be compiled again
+
+# Single-bar expression of each field that is derived from Open, High, Low and Close, as computed by _field
+_SCALAR_FIELDS = {'Body': 'Open_{0} - Close_{0} if Open_{0} > Close_{0} else Close_{0} - Open_{0}', # abs(Open - Close)
+                  'Range': 'High_{0} - Low_{0}',
+                  'BodyTop': 'Close_{0} if Close_{0} > Open_{0} else Open_{0}',
+                  'BodyBottom': 'Close_{0} if Close_{0} < Open_{0} else Open_{0}',
+                  'UpperShadow': 'High_{0} - BodyTop_{0}',
+                  'LowerShadow': 'BodyBottom_{0} - Low_{0}'}
+
+_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.USub, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+
+# Class to rewrite the fields of a rule, e.g. Body[1], into variable names, e.g. Body_1, checking the rule on the way
+class _RuleRewriter(ast.NodeTransformer):
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.terms = set() # (field, bars back) used by the rule
+
+    def _term(self, field, back, node):
+        if field not in FIELDS:
+            raise ValueError('Unknown field ' + field + ' in rule: ' + self.rule)
+        if not 0 <= back <= CANDLESTICK_LOOKBACK:
+            raise ValueError('Rules can look back 0 to ' + str(CANDLESTICK_LOOKBACK) + ' bars: ' + self.rule)
+        self.terms.add((field, back))
+        return ast.copy_location(ast.Name(id=field + '_' + str(back), ctx=ast.Load()), node)
+
+    def visit_Name(self, node):
+        return self._term(node.id, 0, node)
+
+    def visit_Subscript(self, node):
+        if not (isinstance(node.value, ast.Name) and isinstance(node.slice, ast.Constant) and type(node.slice.value) is int):
+            raise ValueError('Fields are referenced as Field or Field[bars back]: ' + self.rule)
+        return self._term(node.value.id, node.slice.value, node)
+
+    def generic_visit(self, node):
+        if not isinstance(node, (ast.Expression, ast.Compare, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Load) + _OPERATORS):
+            raise ValueError('Rules can only compare sums and products of fields and numbers: ' + self.rule)
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError('Rules can only contain numbers: ' + self.rule)
+        return super().generic_visit(node)
+
+# Function to parse a rule into [Python expression over the field variables, (field, bars back) it uses]
+def _parse_rule(rule):
+
+    tree = ast.parse(rule.strip(), mode='eval')
+    if not (isinstance(tree.body, ast.Compare) and len(tree.body.ops) == 1):
+        raise ValueError('A rule is a single comparison: ' + rule)
+
+    rewriter = _RuleRewriter(rule)
+    tree = rewriter.visit(tree)
+
+    return [ast.unparse(tree), rewriter.terms]
+
+# Function to compile the rules of all patterns into one function of the field arrays, returning {pattern: flags},
+# or with scalar=True, of a ring buffer of [Open, High, Low, Close] bars and the slot of the latest bar,
+# writing the flags of that bar into a given list in PATTERN_NAMES order
+def _compile_patterns(scalar=False):
+
+    terms = set()
+    conditions = {} # variable name of every distinct rule
+    lines = []
+    for name, rules in PATTERNS.items():
+        for rule in rules:
+            expression, rule_terms = _parse_rule(rule)
+            terms |= rule_terms
+            if expression not in conditions:
+                conditions[expression] = 'c' + str(len(conditions))
+                lines.append('    ' + conditions[expression] + ' = ' + expression)
+
+    if scalar:
+        terms |= {('BodyTop', back) for field, back in terms if field == 'UpperShadow'} # fields the shadows are computed from
+        terms |= {('BodyBottom', back) for field, back in terms if field == 'LowerShadow'}
+        fields = []
+        for back in sorted({back for field, back in terms}):
+            fields.append('    Open_{0}, High_{0}, Low_{0}, Close_{0} = bars[position{1}]'.format(back, ' - ' + str(back) if back else ''))
+            fields += ['    {0}_{1} = {2}'.format(field, back, _SCALAR_FIELDS[field].format(back))
+                       for field in FIELDS if field in _SCALAR_FIELDS and (field, back) in terms]
+    else:
+        fields = ['    {0}_{1} = field({0!r}, {1})'.format(field, back) for field, back in sorted(terms, key=lambda t: (t[1], FIELDS.index(t[0])))]
+    patterns = []
+    for i, (name, rules) in enumerate(PATTERNS.items()):
+        flags = ' & '.join(conditions[_parse_rule(rule)[0]] for rule in rules)
+        patterns.append('    flags[{0}] = {1}'.format(i, flags) if scalar else '        {0!r}: {1},'.format(name, flags))
+
+    if scalar:
+        source = '\n'.join(['def _evaluate_patterns(bars, position, flags):'] + fields + lines + patterns + ['    return flags'])
+    else:
+        source = '\n'.join(['def _evaluate_patterns(field):'] + fields + lines + ['    return {'] + patterns + ['    }'])
+    namespace = {}
+    exec(compile(source, '<candlestick patterns>', 'exec'), namespace)
+
+    return namespace['_evaluate_patterns']
+
+# Function to get a field of the bars some bars back, aligned on the bars from the third one on
+def _field(prices, field, back):
+
+    key = (field, back)
+    if key not in prices:
+        if field in ['Open', 'High', 'Low', 'Close']:
+            values = prices[field]
+            prices[key] = values[CANDLESTICK_LOOKBACK - back:len(values) - back]
+        elif field == 'Body':
+            prices[key] = np.abs(_field(prices, 'Open', back) - _field(prices, 'Close', back))
+        elif field == 'Range':
+            prices[key] = _field(prices, 'High', back) - _field(prices, 'Low', back)
+        elif field == 'BodyTop':
+            prices[key] = _max(_field(prices, 'Open', back), _field(prices, 'Close', back))
+        elif field == 'BodyBottom':
+            prices[key] = _min(_field(prices, 'Open', back), _field(prices, 'Close', back))
+        elif field == 'UpperShadow':
+            prices[key] = _field(prices, 'High', back) - _field(prices, 'BodyTop', back)
+        else: # LowerShadow
+            prices[key] = _field(prices, 'BodyBottom', back) - _field(prices, 'Low', back)
+
+    return prices[key]
+
+# Function to evaluate all patterns on price arrays, as {pattern: flags of the bars from the third one on}
+def EvaluatePatterns(open_, high, low, close):
+
+    global _compiled_patterns
+
+    if _compiled_patterns is None:
+        _compiled_patterns = _compile_patterns()
+
+    prices = {'Open': np.asarray(open_), 'High': np.asarray(high), 'Low': np.asarray(low), 'Close': np.asarray(close)}
+
+    return _compiled_patterns(lambda field, back: _field(prices, field, back))
+
+#---------------------------------------Candlestick Patterns---------------------------------------
+# Function to generate candlestick pattern logics, as one column per pattern or, with bitmask=True, one uint16 'Patterns' column
+def CandlestickPatterns(data, bitmask=False):
 
     df = data.copy() # make a copy of the data
 
-    # Use a for loop to calculate to identify candlestick patterns
-    for i in range(2, len(df)):
-        current = df.iloc[i,:]
-        prev = df.iloc[i-1,:]
-        prev2 = df.iloc[i-2,:]
-        body_c = abs(current['Open'] - current['Close'])
-        body_prev = abs(prev['Open'] - prev['Close'])
-        body_prev2 = abs(prev2['Open'] - prev2['Close'])
-        range_c = current['High'] - current['Low']
-        range_prev = prev['High'] - prev['Low']
-        range_prev2 = prev2['High'] - prev2['Low']
-        idx = df.index[i]
-
-        # ... Code Candlestick Patterns Here ...
-
-        # Bullish Pin Bar
-        df.loc[idx,'BullishPinBar'] = (body_c <= range_c / 3) \
-                                              and (min(current['Open'], current['Close']) > (current['High'] + current['Low'])/2) \
-                                              and (current['Low'] < prev['Low'])
-        # Bearish Pin Bar
-        df.loc[idx, 'BearishPinBar'] = (body_c <= range_c / 3) \
-                                               and (max(current['Open'], current['Close']) < (current['High'] + current['Low']) / 2) \
-                                               and (current['High'] > prev['High'])
-        # Bullish Engulfing
-        df.loc[idx, 'BullishEngulfing'] = (prev['Close'] < prev['Open']) \
-                                                 and (current['Close'] > current['Open']) \
-                                                 and (current['High'] > prev['High']) \
-                                                 and (current['Low'] < prev['Low']) \
-                                                 and (current['Close'] > prev['Open']) \
-                                                 and (current['Open'] < prev['Close']) \
-                                                 and (body_c >= 0.8 * range_c)
-        # Bearish Engulfing
-        df.loc[idx,'BearishEngulfing'] = (prev['Close'] > prev['Open']) \
-                                                 and (current['Close'] < current['Open']) \
-                                                 and (current['High'] > prev['High']) \
-                                                 and (current['Low'] < prev['Low']) \
-                                                 and (current['Close'] < prev['Open']) \
-                                                 and (current['Open'] > prev['Close']) \
-                                                 and (body_c >= 0.8 * range_c)
-        # One White Soldier (OWS)
-        df.loc[idx, 'OneWhiteSoldier'] = (prev['Close'] < prev['Open']) \
-                                                 and (current['Close'] > current['Open']) \
-                                                 and (body_prev >= 0.8 * range_prev) \
-                                                 and (body_c >= 0.8 * range_c) \
-                                                 and (current['Open'] > prev['Close']) \
-                                                 and (current['Close'] > prev['High'])
-        # One Black Crow (OBC)
-        df.loc[idx,'OneBlackCrow'] = (prev['Close'] > prev['Open']) \
-                                             and (current['Close'] < current['Open']) \
-                                             and (body_prev >= 0.8 * range_prev) \
-                                             and (body_c >= 0.8 * range_c) \
-                                             and (current['Open'] < prev['Close']) \
-                                             and (current['Close'] < prev['Low'])
-        # Morning Star
-        df.loc[idx, 'MorningStar'] = (prev2['Close'] < prev2['Open']) \
-                                            and (body_prev2 >= 0.6 * range_prev2) \
-                                            and (body_prev <= 0.2 * range_prev) \
-                                            and (max(prev['Open'], prev['Close']) < prev2['Close']) \
-                                            and (max(prev['Open'], prev['Close']) < current['Open']) \
-                                            and (current['Close'] > current['Open']) \
-                                            and (current['Close'] > (prev2['Open'] + prev2['Close']) / 2)
-        # Evening Star
-        df.loc[idx,'EveningStar'] = (prev2['Close'] > prev2['Open']) \
-                                           and (body_prev2 >= 0.6 * range_prev2) \
-                                           and (body_prev <= 0.2 * range_prev) \
-                                           and (min(prev['Open'], prev['Close']) > prev2['Close']) \
-                                           and (max(prev['Open'], prev['Close']) > current['Open']) \
-                                           and (current['Close'] < current['Open']) \
-                                           and (current['Close'] < (prev2['Open'] + prev2['Close']) / 2)
+    if bitmask:
+        df['Patterns'] = np.zeros(len(df), dtype=np.uint16) # the first two bars have no patterns
+
+    if len(df) > CANDLESTICK_LOOKBACK: # the first two bars have no prior bars to compare with
+        patterns = EvaluatePatterns(*[df[column].to_numpy() for column in ['Open', 'High', 'Low', 'Close']])
+
+        if bitmask:
+            packed = df['Patterns'].to_numpy(copy=True)
+            for name, flags in patterns.items():
+                packed[2:][flags] |= PATTERN_BITS[name]
+            df['Patterns'] = packed
+            patterns = {} # no separate columns
+
+        # Write the flags from the third bar on; the first two bars stay NaN (or keep earlier values) as in a row by row fill
+        for name, flags in patterns.items():
+            if name in df.columns:
+                df.iloc[2:, df.columns.get_loc(name)] = flags
+            else:
+                column = np.full(len(df), np.nan, dtype=object)
+                column[2:] = flags
+                df[name] = column
 
     # NaN rows will not have a signal, so False
     df.fillna(False, inplace=True)
 
-    return df
\ No newline at end of file
+    return df
+
+#---------------------------------------Universe Scan---------------------------------------
+# Function to list the candlestick patterns found in a multi-ticker price panel, e.g. yf.download(TICKERS), as one row per hit
+def ScanPatterns(data, last_bars=None, patterns=None):
+
+    close = data['Close'] # one column per ticker
+    tickers = close.columns
+    dates = close.index
+    prices = [np.asarray(data[column], dtype=float) for column in ['Open', 'High', 'Low', 'Close']]
+
+    if last_bars is not None: # only the last bars, plus the bars they look back on
+        first = max(len(dates) - last_bars - CANDLESTICK_LOOKBACK, 0)
+        prices = [values[first:] for values in prices]
+        dates = dates[first:]
+
+    names = PATTERN_NAMES if patterns is None else list(patterns)
+    rows, columns, codes = [], [], []
+    if len(dates) > CANDLESTICK_LOOKBACK:
+        flags = EvaluatePatterns(*prices) # (bars from the third one on, tickers) for every pattern
+        for code, name in enumerate(names):
+            row, column = np.nonzero(flags[name])
+            rows.append(row + CANDLESTICK_LOOKBACK)
+            columns.append(column)
+            codes.append(np.full(len(row), code, dtype=np.int8))
+
+    rows, columns, codes = [np.concatenate(values) if values else np.zeros(0, dtype=int) for values in [rows, columns, codes]]
+    order = np.lexsort((codes, columns, rows)) # by date, then ticker, then pattern
+
+    return pd.DataFrame({'Date': dates[rows[order]],
+                         'Ticker': tickers[columns[order]],
+                         'Pattern': pd.Categorical.from_codes(codes[order], categories=names)})
\ No newline at end of file
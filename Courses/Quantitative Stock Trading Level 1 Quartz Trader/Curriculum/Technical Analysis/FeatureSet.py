@@ -0,0 +1,327 @@
+'''
+This script contains functions to compute a whole set of technical indicators at once, e.g. the indicators a strategy needs.
+* A feature set is a list of names such as ['EMA20', 'EMA40', 'MACD(12,26,9)', 'WR14', 'ATR14'].
+* The set is planned as a graph of shared steps, so an EMA, SMA or rolling high/low that several indicators use is computed once.
+* Each feature gets exactly the values its indicator function returns, e.g. features['MACD(12,26,9)'] == MACD(data, 12, 26, 9).
+* With a lookback, each feature is computed only on the last bars plus the warm-up it needs (see Warm-Up Window).
+'''
+
+# Import relevant packages
+import math
+import re
+import numpy as np
+import pandas as pd
+from TechnicalIndicators import *
+from TechnicalIndicators import _prices, _output, _ema, _rolling_mean, _rolling_variance, _bands, _force_index1, \
+                                _stochastic_k, _williams_r, _gains_losses, _rsi
+from AverageTrueRangeMeasure import * # from Position Sizing, which the calling program puts on the path
+from IndicatorCache import CacheKey
+
+# Indicator function for each feature name, e.g. 'WR14' or 'WR(14)' is WilliamsR(data, 14)
+INDICATORS = {'SMA': SMA, 'EMA': EMA, 'MACD': MACD, 'BBANDS': BBANDS, 'FI': ForceIndex, 'FORCEINDEX': ForceIndex,
+              'STOCH': StochasticOscillator, 'WR': WilliamsR, 'RSI': RSI, 'ATR': ATR}
+
+FEATURE_PATTERN = re.compile(r'^\s*([A-Za-z]+)\s*\(?([0-9.,\s]*)\)?\s*$') # name followed by parameters, e.g. MACD(12,26,9)
+
+WARM_UP_TOLERANCE = 1e-10 # EMA-based features may start this far (as a fraction of the price range) from a full-history run
+
+#---------------------------------------Planner---------------------------------------
+'''
+Every step of an indicator is a node of the graph, written as a tuple of its kernel and its inputs:
+
+('Price', 'Close') = close prices
+('EMA', ('Price', 'Close'), 12) = 12-period EMA of the close prices
+('Sub', fast EMA node, slow EMA node) = MACD line
+
+Identical steps are identical tuples, so a node that several features need is planned, and evaluated, once.
+Nodes are planned inputs first, so they can be evaluated in order.
+'''
+
+# Kernels of the nodes, which take the values of their input nodes and the parameters
+KERNELS = {'EMA': _ema, 'Mean': _rolling_mean, 'Variance': _rolling_variance, 'Max': RollingMax, 'Min': RollingMin,
+           'Sub': np.subtract, 'Bands': _bands, 'Item': lambda values, i: values[i], 'ForceIndex1': _force_index1,
+           '%K': _stochastic_k, '%R': _williams_r, 'GainsLosses': _gains_losses, 'RSI': _rsi}
+
+# Kernels of the nodes that read the price data itself
+DATA_KERNELS = {'Price': _prices, 'ATR': ATR}
+
+# Function to split a feature name into its indicator function and parameters
+def ParseFeature(feature):
+
+    match = FEATURE_PATTERN.match(feature)
+    if match is None or match.group(1).upper() not in INDICATORS:
+        raise ValueError('Unknown feature ' + repr(feature) + ', use one of ' + ', '.join(INDICATORS))
+
+    params = [float(p) if '.' in p else int(p) for p in re.split(r'[,\s]+', match.group(2).strip()) if p]
+
+    return [INDICATORS[match.group(1).upper()], params]
+
+# Function to get the output nodes of an indicator, in the order the indicator function returns them
+def _indicator_nodes(func, params):
+
+    close = ('Price', 'Close')
+    high = ('Price', 'High')
+    low = ('Price', 'Low')
+
+    try:
+        if func is SMA:
+            n_period, = params
+            return [('Mean', close, n_period)]
+
+        if func is EMA:
+            n_period, = params
+            return [('EMA', close, n_period)]
+
+        if func is MACD:
+            fast_period, slow_period, macd_period = params
+            macd = ('Sub', ('EMA', close, fast_period), ('EMA', close, slow_period))
+            signal = ('EMA', macd, macd_period)
+            return [macd, signal, ('Sub', macd, signal)]
+
+        if func is BBANDS:
+            n_period, stdev_factor = params
+            sma = ('Mean', close, n_period)
+            bands = ('Bands', sma, ('Variance', close, n_period), stdev_factor)
+            return [('Item', bands, 0), sma, ('Item', bands, 1)]
+
+        if func is ForceIndex:
+            n_period, = params
+            return [('EMA', ('ForceIndex1', close, ('Price', 'Volume')), n_period)]
+
+        if func is StochasticOscillator:
+            k_period, d_period = params
+            k = ('%K', close, ('Max', high, k_period), ('Min', low, k_period))
+            return [k, ('Mean', k, d_period)]
+
+        if func is WilliamsR:
+            n_period, = params
+            return [('%R', close, ('Max', high, n_period), ('Min', low, n_period))]
+
+        if func is RSI:
+            n_period, = params
+            gains_losses = ('GainsLosses', close)
+            return [('RSI', ('Mean', ('Item', gains_losses, 0), n_period), ('Mean', ('Item', gains_losses, 1), n_period))]
+
+        if func is ATR:
+            n_period, = params
+            return [('ATR', n_period)]
+
+    except ValueError:
+        raise ValueError(func.__name__ + ' does not take the parameters ' + repr(params))
+
+# Function to add a node, after its input nodes, to the planned nodes
+def _add_node(node, nodes):
+
+    if node in nodes:
+        return
+
+    for item in node[1:]:
+        if isinstance(item, tuple):
+            _add_node(item, nodes)
+
+    nodes[node] = len(nodes) # dicts keep insertion order, so nodes stay in evaluation order
+
+# Function to plan a feature set as [nodes in evaluation order, {feature: output nodes}]
+def PlanFeatures(features):
+
+    nodes = {}
+    outputs = {}
+
+    for feature in features:
+        func, params = ParseFeature(feature)
+        outputs[feature] = _indicator_nodes(func, params)
+        for node in outputs[feature]:
+            _add_node(node, nodes)
+
+    return [list(nodes), outputs]
+
+#---------------------------------------Feature Set---------------------------------------
+# Function to evaluate the planned nodes on the price data, each exactly once
+def _evaluate(nodes, data):
+
+    values = {}
+    for node in nodes:
+        kernel = node[0]
+        args = [values[item] if isinstance(item, tuple) else item for item in node[1:]]
+        if kernel in DATA_KERNELS:
+            values[node] = DATA_KERNELS[kernel](data, *args)
+        else:
+            values[node] = KERNELS[kernel](*args)
+
+    return values
+
+# Function to get the last rows of an indicator result
+def _tail(result, rows):
+
+    if isinstance(result, pd.DataFrame):
+        return result.iloc[len(result) - rows:]
+
+    if isinstance(result, list) and result and not np.isscalar(result[0]): # list of results, e.g. MACD
+        return [_tail(item, rows) for item in result]
+
+    return result[len(result) - rows:]
+
+# Function to compute a feature set as {feature: indicator values}, reusing results of the cache when one is given
+# With a lookback, only the last lookback rows are returned, each computed from the bars its warm-up needs
+def ComputeFeatures(data, features, cache=None, lookback=None):
+
+    # Group the features by the first bar they are computed from, as features computed together must share their bars
+    starts = {feature: 0 if lookback is None else WindowStart(len(data), feature, lookback) for feature in features}
+    results = {}
+
+    for start in sorted(set(starts.values())):
+        group = [feature for feature in features if starts[feature] == start]
+        window = data if start == 0 else data.iloc[start:]
+        results.update(_compute_features(window, group, cache))
+
+    if lookback is None:
+        return {feature: results[feature] for feature in features}
+
+    return {feature: _tail(results[feature], min(lookback, len(data))) for feature in features}
+
+# Function to compute a feature set on all the bars of the data
+def _compute_features(data, features, cache):
+
+    results = {}
+    keys = {}
+
+    # Look every feature up in the cache, with the same key as Cached(indicator, data, *params)
+    if cache is not None:
+        for feature in features:
+            func, params = ParseFeature(feature)
+            keys[feature] = CacheKey(func, data, *params)
+            result = cache.lookup(keys[feature])
+            if result is not None:
+                results[feature] = result
+
+    # Plan and evaluate the features that are not cached yet
+    missing = [feature for feature in features if feature not in results]
+    nodes, outputs = PlanFeatures(missing)
+    values = _evaluate(nodes, data)
+
+    for feature in missing:
+        result = [values[node] if node[0] in DATA_KERNELS else _output(values[node], data) for node in outputs[feature]]
+        results[feature] = result[0] if len(result) == 1 else result
+        if cache is not None:
+            cache.store(keys[feature], results[feature])
+
+    return {feature: results[feature] for feature in features}
+
+#---------------------------------------Warm-Up Window---------------------------------------
+'''
+Start = Last Bars - Lookback - Warm-Up, rounded down to a multiple of the Block
+
+Where:
+
+Warm-Up = bars before the first lookback bar that the feature needs
+Block = the n of the rolling sums, as their rounding only repeats a full-history run when the blocks line up (see Array Helpers)
+
+Exact features are identical to a full-history run once they have their warm-up:
+SMA (n - 1), BBANDS (2n - 2, the variance also uses the first price of each block), RSI (n, plus 1 bar for the first gain),
+Stochastic Oscillator (k - 1 + d - 1), Williams % R (n - 1).
+
+EMA-based features never forget their start entirely. After w bars, the gap to a full-history run is at most
+
+Error = ( 1 - 2 / (n + 1) ) ^ w * Price Range before the start
+
+so they get the w bars (convergence horizon) that bring it below WARM_UP_TOLERANCE of the price range.
+MACD adds the horizons of the slow EMA and of the signal line, Force Index adds 1 bar for the first 1-period Force Index.
+An EMA only starts at its first non-zero input, so a flat run at the start (1-period Force Index and MACD line of 0)
+starts it later, and the error bound counts w from there.
+ATR is averaged with pandas' running sums, whose rounding can differ from a full-history run in the last bits.
+'''
+
+# Function to get the number of bars for an n-period EMA to forget its start, to within tolerance
+def _horizon(n_period, tolerance):
+
+    return math.ceil(math.log(tolerance) / math.log(1 - 2 / (n_period + 1)))
+
+# Function to get the warm-up of a feature as [bars, block, exact], see Warm-Up Window
+def WarmUp(feature, tolerance=WARM_UP_TOLERANCE):
+
+    func, params = ParseFeature(feature)
+
+    if func is SMA:
+        return [params[0] - 1, params[0], True]
+    if func is BBANDS:
+        return [2 * params[0] - 2, params[0], True]
+    if func is RSI:
+        return [params[0], params[0], True]
+    if func is StochasticOscillator:
+        return [params[0] - 1 + params[1] - 1, params[1], True]
+    if func is WilliamsR:
+        return [params[0] - 1, 1, True]
+    if func is EMA:
+        return [_horizon(params[0], tolerance), 1, False]
+    if func is MACD:
+        return [_horizon(max(params[0], params[1]), tolerance) + _horizon(params[2], tolerance), 1, False]
+    if func is ForceIndex:
+        return [_horizon(params[0], tolerance) + 1, 1, False]
+    if func is ATR:
+        return [params[0], 1, False] # the true range needs the prior close
+
+# Function to get the first bar a feature is computed from, to get its last lookback values
+def WindowStart(n_bars, feature, lookback, tolerance=WARM_UP_TOLERANCE):
+
+    bars, block, exact = WarmUp(feature, tolerance)
+    start = n_bars - lookback - bars
+
+    if start <= 0: # the whole history is needed
+        return 0
+
+    return start - start % block
+
+# Function to get the bars from the first row to the first non-zero value of every column, where an EMA of the values starts
+def _ema_delay(values):
+
+    nonzero = (values != 0) & ~np.isnan(values)
+    first = np.where(nonzero.any(axis=0), np.argmax(nonzero, axis=0), len(values))
+
+    return int(np.max(first))
+
+# Function to bound the gap between a feature computed from start and from the first bar, over the lookback
+def _error_bound(data, feature, start, n_bars, lookback):
+
+    func, params = ParseFeature(feature)
+    close = _prices(data, 'Close')
+    bars = np.arange(n_bars - min(lookback, n_bars), n_bars) - start # bars since the start, over the lookback
+
+    if func is ATR: # rounding of the running sums of n true ranges
+        prior_close = np.concatenate([close[:1], close[:-1]])
+        true_range = np.fmax(_prices(data, 'High'), prior_close) - np.fmin(_prices(data, 'Low'), prior_close)
+        return params[0] * np.finfo(float).eps * np.nanmax(true_range)
+
+    decay = [1 - 2 / (n_period + 1) for n_period in params]
+
+    if func is EMA:
+        return np.ptp(close[:start + 1], axis=0).max() * decay[0] ** bars[0]
+
+    if func is ForceIndex:
+        fi1_values = _force_index1(close, _prices(data, 'Volume'))
+        delay = _ema_delay(_force_index1(close[start:], _prices(data, 'Volume')[start:])) # the EMA from start begins here
+        return np.ptp(fi1_values[:start + delay + 1], axis=0).max() * decay[0] ** (bars[0] - delay)
+
+    # MACD: the line has the gaps of both EMAs, and the signal line averages them on top of its own start
+    delay = _ema_delay(_ema(close[start:], params[0]) - _ema(close[start:], params[1])) # the signal line from start begins here
+    price_range = np.ptp(close[:start + delay + 1], axis=0).max()
+    steps = np.arange(bars[-1] + 1)
+    line = price_range * (decay[0] ** steps + decay[1] ** steps)
+    signal = np.empty_like(line)
+    signal[:delay + 1] = 2 * price_range # both signal lines lie within the range of the MACD line
+    for k in range(delay + 1, len(steps)):
+        signal[k] = decay[2] * signal[k - 1] + (1 - decay[2]) * line[k]
+
+    return (line + signal)[bars].max() # the histogram has both gaps
+
+# Function to report, for each feature, the bars its warm-up window starts from and how close it is to a full-history run
+def WarmUpReport(data, features, lookback, tolerance=WARM_UP_TOLERANCE):
+
+    n_bars = len(data)
+    report = []
+    for feature in features:
+        bars, block, exact = WarmUp(feature, tolerance)
+        start = WindowStart(n_bars, feature, lookback, tolerance)
+        exact = exact or start == 0 # without a warm-up window, the feature is the full-history run
+        report.append([feature, bars, start, exact, 0.0 if exact else _error_bound(data, feature, start, n_bars, lookback)])
+
+    return pd.DataFrame(report, columns=['Feature', 'WarmUp', 'Start', 'Exact', 'ErrorBound'])
\ No newline at end of file
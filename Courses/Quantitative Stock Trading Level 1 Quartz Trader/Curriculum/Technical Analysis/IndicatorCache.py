@@ -0,0 +1,261 @@
+'''
+This script contains a cache for the technical indicators, so the same indicator is never computed twice on the same prices.
+* Results are keyed by a hash of the input OHLCV prices plus the indicator function and its parameters.
+* Recent results are kept in memory (least recently used are dropped first) and, optionally, on disk as .npz files.
+* The disk tier lets repeated or overlapping runs of the EXE programs reuse indicators computed in earlier runs.
+'''
+
+import hashlib
+import inspect
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume'] # columns an indicator can depend on
+
+#---------------------------------------Cache Keys---------------------------------------
+'''
+Key = SHA-256 ( OHLCV prices, dates, column names, indicator source file, indicator name, parameters )
+
+* Only the OHLCV columns of a price table are hashed, so indicator columns added to the table do not change the key.
+* The source file of the indicator is hashed too, so editing an indicator invalidates its cached results.
+'''
+
+_source_hashes = {} # source file hash for each indicator module
+
+# Function to hash the OHLCV prices of single-ticker prices, a multi-ticker download, a wide price table or an array
+def _data_hash(data, digest):
+
+    if isinstance(data, pd.DataFrame):
+        fields = [c for c in data.columns if (c[0] if isinstance(c, tuple) else c) in PRICE_FIELDS]
+        prices = data[fields] if fields else data # a wide price table is all prices
+        digest.update(repr(list(prices.columns)).encode())
+        values = prices.to_numpy()
+        index = prices.index.to_numpy()
+        if values.dtype == object or index.dtype == object: # no raw bytes for python objects, so hash them row by row
+            digest.update(pd.util.hash_pandas_object(prices, index=True).to_numpy().tobytes())
+        else:
+            _data_hash(values, digest)
+            _data_hash(index, digest)
+    else:
+        values = np.ascontiguousarray(data)
+        digest.update(repr((values.shape, values.dtype.str)).encode())
+        digest.update(values.tobytes())
+
+# Function to hash the source file an indicator is defined in
+def _source_hash(func):
+
+    path = inspect.getsourcefile(func)
+    if path not in _source_hashes:
+        with open(path, 'rb') as f:
+            _source_hashes[path] = hashlib.sha256(f.read()).hexdigest()
+
+    return _source_hashes[path]
+
+# Function to derive the cache key for an indicator call
+def CacheKey(func, data, *params, **options):
+
+    digest = hashlib.sha256()
+    _data_hash(data, digest)
+    digest.update(_source_hash(func).encode())
+    digest.update(repr((func.__module__, func.__qualname__, params, sorted(options.items()))).encode())
+
+    return digest.hexdigest()
+
+#---------------------------------------Result Packing---------------------------------------
+'''
+Indicator results are lists, arrays, tables (one column per ticker) or lists of those, e.g. [MACD, Signal, Histogram].
+They are packed into named arrays, which are stored read-only in memory or written to an .npz file,
+and unpacked into fresh objects on every hit, so callers can never modify a cached result.
+
+* Table labels are packed as plain arrays (dates as datetime64[ns], tickers as str), so .npz files load without pickling;
+  results with other python object labels, e.g. tuples, are kept in memory only.
+'''
+
+# Function to get table labels as a plain array, e.g. dates as datetime64[ns] and tickers as str, or as objects if they are not
+def _labels(labels):
+
+    if isinstance(labels, pd.DatetimeIndex) and labels.tz is None:
+        return labels.to_numpy(dtype='datetime64[ns]')
+
+    values = labels.to_numpy()
+    if values.dtype == object and len(values) and all(isinstance(label, str) for label in values):
+        return values.astype(str)
+
+    return values
+
+# Function to pack an indicator result into a dictionary of named arrays
+def _pack(result, name='r'):
+
+    if isinstance(result, pd.DataFrame):
+        return {name + '.frame': result.to_numpy(),
+                name + '.index': _labels(result.index),
+                name + '.columns': _labels(result.columns)}
+
+    if isinstance(result, np.ndarray):
+        return {name + '.array': result}
+
+    if isinstance(result, list) and result and not np.isscalar(result[0]): # list of results, e.g. MACD
+        packed = {}
+        for i, item in enumerate(result):
+            packed.update(_pack(item, name + '.' + str(i)))
+        return packed
+
+    return {name + '.list': np.asarray(result, dtype=float)}
+
+# Function to unpack a dictionary of named arrays into a fresh indicator result
+def _unpack(packed, name='r'):
+
+    if name + '.frame' in packed:
+        return pd.DataFrame(packed[name + '.frame'], index=pd.Index(packed[name + '.index']),
+                            columns=pd.Index(packed[name + '.columns'].tolist()), copy=True)
+
+    if name + '.array' in packed:
+        return packed[name + '.array'].copy()
+
+    if name + '.list' in packed:
+        return packed[name + '.list'].tolist()
+
+    items = []
+    while any(k.startswith(name + '.' + str(len(items)) + '.') for k in packed):
+        items.append(_unpack(packed, name + '.' + str(len(items))))
+
+    return items
+
+#---------------------------------------Indicator Cache---------------------------------------
+# Class to memoize indicator results in memory, and optionally on disk
+class IndicatorCache:
+
+    def __init__(self, cache_dir=None, max_memory_items=256, max_disk_bytes=512 * 2 ** 20):
+        self.cache_dir = cache_dir # folder for the .npz files, or None to keep results in memory only
+        self.max_memory_items = max_memory_items # most results kept in memory
+        self.max_disk_bytes = max_disk_bytes # most bytes kept on disk
+        self.memory = OrderedDict() # results in least to most recently used order
+        self.hits = 0 # number of calls answered from the cache
+        self.misses = 0 # number of calls computed
+
+    # Function to return func(data, *params, **options), computing it only if it is not cached yet
+    def compute(self, func, data, *params, **options):
+
+        key = CacheKey(func, data, *params, **options)
+
+        result = self.lookup(key)
+        if result is None:
+            result = func(data, *params, **options)
+            self.store(key, result)
+
+        return result
+
+    # Function to get the cached result of a key, or None if it is not cached yet
+    def lookup(self, key):
+
+        packed = self._load(key)
+        if packed is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+
+        return _unpack(packed)
+
+    # Function to cache the result of a key
+    def store(self, key, result):
+
+        packed = {name: np.array(array) for name, array in _pack(result).items()} # copies, so the caller keeps a writeable result
+        self._store(key, packed)
+
+    # Function to drop every cached result, in memory and on disk
+    def clear(self):
+
+        self.memory.clear()
+        for path in self._disk_files():
+            os.remove(path)
+
+    # Function to look a result up in memory first, then on disk
+    def _load(self, key):
+
+        if key in self.memory:
+            self.memory.move_to_end(key) # mark as most recently used
+            return self.memory[key]
+
+        path = self._path(key)
+        if path is None or not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as f:
+                packed = {k: f[k] for k in f.files}
+        except (OSError, ValueError): # unreadable file, e.g. a partial write, so compute again
+            return None
+
+        os.utime(path) # mark as most recently used on disk
+        self._remember(key, packed)
+
+        return packed
+
+    # Function to keep a result in memory and on disk
+    def _store(self, key, packed):
+
+        self._remember(key, packed)
+
+        path = self._path(key)
+        if path is None:
+            return
+
+        if any(array.dtype == object for array in packed.values()): # python objects, e.g. tuple labels, would be pickled
+            return                                                     # and could not be loaded back, so keep them in memory only
+
+        np.savez(path + '.tmp.npz', **packed)
+        os.replace(path + '.tmp.npz', path) # readers never see a partial file
+
+        self._evict_disk()
+
+    # Function to keep a result in memory, dropping the least recently used ones
+    def _remember(self, key, packed):
+
+        for array in packed.values():
+            array.flags.writeable = False
+
+        self.memory[key] = packed
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_items:
+            self.memory.popitem(last=False)
+
+    # Function to drop the least recently used files once the disk tier exceeds its size cap
+    def _evict_disk(self):
+
+        files = sorted(self._disk_files(), key=os.path.getmtime, reverse=True) # most recently used first
+        total = 0
+        for path in files:
+            total += os.path.getsize(path)
+            if total > self.max_disk_bytes:
+                os.remove(path)
+
+    # Function to get the .npz file path of a key
+    def _path(self, key):
+
+        if self.cache_dir is None:
+            return None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        return os.path.join(self.cache_dir, key + '.npz')
+
+    # Function to list the cached .npz files
+    def _disk_files(self):
+
+        if self.cache_dir is None or not os.path.isdir(self.cache_dir):
+            return []
+
+        return [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir)
+                if f.endswith('.npz') and not f.endswith('.tmp.npz')]
+
+# Shared cache used by Cached(); set INDICATOR_CACHE.cache_dir to a folder to keep results between runs
+INDICATOR_CACHE = IndicatorCache()
+
+# Function to compute an indicator through the shared cache, e.g. Cached(EMA, df, 20) instead of EMA(df, 20)
+def Cached(func, data, *params, **options):
+
+    return INDICATOR_CACHE.compute(func, data, *params, **options)
\ No newline at end of file
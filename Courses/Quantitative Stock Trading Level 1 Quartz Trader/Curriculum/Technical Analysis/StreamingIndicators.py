@@ -0,0 +1,511 @@
+'''
+This script contains stateful versions of the technical indicators in TechnicalIndicators.py.
+* Each object is fed one bar at a time with update(bar) and costs O(1) per bar, for live/intraday watchers.
+* A bar is anything with the same columns as the price data, e.g. a row of the price table or a dict.
+* The values are exactly the ones the batch functions produce for the same series.
+* A CandlestickState gives the candlestick pattern flags of each new bar from a ring buffer of the last 3 bars.
+* A FeatureState keeps a whole feature set up to date: it is saved after each run, and only the new bars are computed next time.
+'''
+
+import math as math
+import pickle
+from collections import deque
+
+import pandas as pd
+from CandlestickPatterns import *
+from CandlestickPatterns import _compile_patterns
+from FeatureSet import *
+
+#---------------------------------------Streaming Kernels---------------------------------------
+'''
+These mirror the array helpers of TechnicalIndicators.py operation for operation, so the rounding is identical:
+
+Rolling Sum = Suffix Sum of the previous block + Prefix Sum of the current block (blocks of n values)
+Rolling Max/Min = front of a monotonic deque of the values in the window
+EMA = (1 - K) * EMAp + K * P, with K = 2 / (n + 1), started at the first non-zero value
+Squares are taken as x * x, which is what NumPy does for arrays (Python's x ** 2 can round differently)
+Running Mean = compensated (Kahan) running sum of the values in the window / count, as pandas' rolling(n).mean() does
+'''
+
+# Function to divide like NumPy does, giving inf/NaN instead of raising on a zero denominator
+def _divide(numerator, denominator):
+
+    if denominator == 0:
+        return math.copysign(math.inf, numerator) if numerator != 0 else math.nan
+
+    return numerator / denominator
+
+# Class to track an n-period EMA of a stream of values
+class _EMA:
+
+    def __init__(self, n_period):
+        self.alpha = 2 / (n_period + 1) # EMA smoothing factor
+        self.started = False # the EMA starts at the first non-zero value
+        self.value = 0.0 # EMA for the previous period
+
+    def update(self, value):
+        if not self.started:
+            if value != 0: # check for first observation
+                self.started = True
+                self.value = value
+        elif value != self.value:
+            self.value = (1. - self.alpha) * self.value + self.alpha * value
+        return self.value
+
+# Class to track the mean of the last n values of a stream
+class _RollingMean:
+
+    def __init__(self, n_period):
+        self.n_period = n_period
+        self.count = 0 # number of values seen
+        self.block = [0.0] * n_period # values of the current block, which still hold the oldest values of the window
+        self.suffix = [0.0] * n_period # running sums from each value to the end of the previous block
+        self.prefix = 0.0 # running sum from the start of the current block
+        self.nonzero = 0 # number of non-zero values in the window
+
+    def update(self, value):
+        n = self.n_period
+        position = (self.count + n - 1) % n # position of the value in its block
+
+        if position == 0: # a new block starts
+            self.prefix = 0.0
+
+        leaving = self.block[position] # value that exceeds the n-period lookback
+        self.block[position] = value
+        self.prefix = self.prefix + value
+        self.nonzero += int(value != 0) - int(leaving != 0)
+
+        start = self.count % n # position of the window start in the previous block
+        sums = (0 if start == 0 else self.suffix[start]) + self.prefix
+
+        if position == n - 1: # the block is complete, so sum it from the end for the next windows
+            total = 0.0
+            for q in range(n - 1, -1, -1):
+                total = total + self.block[q]
+                self.suffix[q] = total
+
+        self.count += 1
+
+        if self.nonzero == 0: # windows of zeros average to exactly 0
+            sums = 0
+
+        return sums / min(self.count, n)
+
+# Class to track the max or min of the last n values of a stream with a monotonic deque
+class _RollingExtreme:
+
+    def __init__(self, n_period, is_max):
+        self.n_period = n_period
+        self.is_max = is_max
+        self.count = 0 # number of values seen
+        self.window = deque() # (index, value) pairs, with values that can still become the extreme
+
+    def update(self, value):
+        # drop values that can never be the extreme again, as the new value outlives them
+        if self.is_max:
+            while self.window and self.window[-1][1] <= value:
+                self.window.pop()
+        else:
+            while self.window and self.window[-1][1] >= value:
+                self.window.pop()
+        self.window.append((self.count, value))
+
+        # drop the value that exceeds the n-period lookback
+        if self.window[0][0] <= self.count - self.n_period:
+            self.window.popleft()
+
+        self.count += 1
+
+        return self.window[0][1]
+
+# Class to track the (population) variance of the last n values of a stream
+class _RollingVariance:
+
+    def __init__(self, n_period):
+        self.n_period = n_period
+        self.count = 0 # number of values seen
+        self.deviations = [0.0] * n_period # deviations of the current block from its reference
+        self.weights = [0.0] * n_period # 1 for values of the current block, 0 for padding before the first value
+        self.reference = 0.0 # first price of the current block
+        self.prefix = [0.0, 0.0, 0.0] # running count, sum and sum of squares of deviations in the current block
+        self.suffix = [[0.0] * n_period for _ in range(3)] # same running totals to the end of the previous block
+        self.suffix_reference = 0.0 # first price of the previous block
+        self.high = _RollingExtreme(n_period, True)
+        self.low = _RollingExtreme(n_period, False)
+
+    def update(self, value):
+        n = self.n_period
+        position = (self.count + n - 1) % n # position of the value in its block
+
+        if self.count == 0 or position == 0: # a new block starts, with the first series value as reference for the first block
+            self.reference = value
+            self.prefix = [0.0, 0.0, 0.0]
+
+        deviation = value - self.reference
+        self.deviations[position] = deviation
+        self.weights[position] = 1.0
+        self.prefix = [self.prefix[0] + 1.0, self.prefix[1] + deviation, self.prefix[2] + deviation * deviation]
+
+        # Part b runs from the start of the block to the window end
+        kb, s1b, s2b = self.prefix
+        mean_b = self.reference + s1b / kb
+        m2_b = s2b - s1b * s1b / kb
+
+        # Part a runs from the window start to the end of the previous block, and is empty when the window starts a block
+        start = self.count % n
+        ka = 0.0 if start == 0 else self.suffix[0][start]
+        if ka > 0:
+            s1a = self.suffix[1][start]
+            s2a = self.suffix[2][start]
+            mean_a = s1a / ka + self.suffix_reference
+            m2_a = s2a - s1a * (mean_a - self.suffix_reference)
+        else:
+            mean_a = mean_b
+            m2_a = 0
+
+        k = ka + kb
+        delta = mean_b - mean_a
+        m2 = m2_a + m2_b + delta * delta * ka * kb / k
+
+        variance = max(m2 / k, 0.0) # rounding can leave tiny negative values
+        if self.high.update(value) == self.low.update(value): # flat windows have no variance
+            variance = 0.0
+
+        if position == n - 1: # the block is complete, so total it from the end for the next windows
+            totals = [0.0, 0.0, 0.0]
+            for q in range(n - 1, -1, -1):
+                totals = [totals[0] + self.weights[q], totals[1] + self.deviations[q], totals[2] + self.deviations[q] * self.deviations[q]]
+                self.suffix[0][q], self.suffix[1][q], self.suffix[2][q] = totals
+            self.suffix_reference = self.reference
+
+        self.count += 1
+
+        return variance
+
+# Class to track the mean of the last n values of a stream the way pandas' rolling(n).mean() does, skipping NaN values
+class _RunningMean:
+
+    def __init__(self, n_period):
+        self.n_period = n_period
+        self.window = deque() # values in the window
+        self.count = 0 # number of non-NaN values in the window
+        self.sum = 0.0 # running sum of the window
+        self.add_compensation = 0.0 # rounding error of the additions
+        self.remove_compensation = 0.0 # rounding error of the removals
+        self.negatives = 0 # number of negative values in the window
+        self.same_values = 0 # number of equal values in a row, to return them exactly
+        self.last_value = math.nan # last non-NaN value added
+
+    def update(self, value):
+        if self.n_period == 1: # pandas starts every one-value window afresh
+            self.__init__(1)
+
+        if len(self.window) == self.n_period: # remove the value that exceeds the n-period lookback
+            leaving = self.window.popleft()
+            if leaving == leaving:
+                self.count -= 1
+                y = -leaving - self.remove_compensation
+                t = self.sum + y
+                self.remove_compensation = t - self.sum - y
+                self.sum = t
+                self.negatives -= int(math.copysign(1.0, leaving) < 0)
+
+        self.window.append(value)
+        if value == value:
+            self.count += 1
+            y = value - self.add_compensation
+            t = self.sum + y
+            self.add_compensation = t - self.sum - y
+            self.sum = t
+            self.negatives += int(math.copysign(1.0, value) < 0)
+            self.same_values = self.same_values + 1 if value == self.last_value else 1
+            self.last_value = value
+
+        if self.count < self.n_period: # too few values, as min_periods = n
+            return math.nan
+
+        mean = self.sum / self.count
+        if self.same_values >= self.count:
+            mean = self.last_value
+        elif self.negatives == 0 and mean < 0:
+            mean = 0.0
+        elif self.negatives == self.count and mean > 0:
+            mean = 0.0
+
+        return mean
+
+#---------------------------------------Simple Moving Average (SMA)---------------------------------------
+# Class to generate n-period SMA bar by bar
+class SMAState:
+
+    def __init__(self, n_period):
+        self.sma = _RollingMean(n_period)
+
+    def update(self, bar):
+        return self.sma.update(bar['Close'])
+
+#---------------------------------------Exponential Moving Average (EMA)---------------------------------------
+# Class to generate n-period EMA bar by bar
+class EMAState:
+
+    def __init__(self, n_period):
+        self.ema = _EMA(n_period)
+
+    def update(self, bar):
+        return self.ema.update(bar['Close'])
+
+#---------------------------------------Moving Average Convergence Divergence (MACD)---------------------------------------
+# Class to generate MACD bar by bar, as [MACD, MACD Signal, MACD Histogram]
+class MACDState:
+
+    def __init__(self, fast_period, slow_period, macd_period):
+        self.fast_ema = _EMA(fast_period)
+        self.slow_ema = _EMA(slow_period)
+        self.macd_ema = _EMA(macd_period)
+
+    def update(self, bar):
+        close = bar['Close']
+        macd = self.fast_ema.update(close) - self.slow_ema.update(close) # MACD = fast EMA - slow_EMA
+        macd_ema = self.macd_ema.update(macd) # signal is EMA of MACD values
+        return [macd, macd_ema, macd - macd_ema]
+
+#---------------------------------------Bollinger Bands (BBANDS)---------------------------------------
+# Class to generate BBANDS bar by bar, as [Upper Band, Middle Band, Lower Band]
+class BBANDSState:
+
+    def __init__(self, n_period, stdev_factor):
+        self.stdev_factor = stdev_factor
+        self.sma = _RollingMean(n_period)
+        self.variance = _RollingVariance(n_period)
+
+    def update(self, bar):
+        close = bar['Close']
+        sma = self.sma.update(close)
+        stdev = math.sqrt(self.variance.update(close)) # square root variance to get standard deviation
+        return [sma + self.stdev_factor * stdev, sma, sma - self.stdev_factor * stdev]
+
+#---------------------------------------Force Index---------------------------------------
+# Class to generate n-period Force Index bar by bar
+class ForceIndexState:
+
+    def __init__(self, n_period):
+        self.fin_ema = _EMA(n_period)
+        self.last_close = None # prior close price
+
+    def update(self, bar):
+        close = bar['Close']
+        fi1 = 0.0 if self.last_close is None else (close - self.last_close) * bar['Volume'] # 1-period Force Index
+        self.last_close = close
+        return self.fin_ema.update(fi1)
+
+#---------------------------------------Stochastic Oscillator---------------------------------------
+# Class to generate the Stochastic Oscillator bar by bar, as [%K, %D]
+class StochState:
+
+    def __init__(self, k_period, d_period):
+        self.high = _RollingExtreme(k_period, True)
+        self.low = _RollingExtreme(k_period, False)
+        self.d_sma = _RollingMean(d_period)
+
+    def update(self, bar):
+        high = self.high.update(bar['High']) # max of the k-period highs
+        low = self.low.update(bar['Low']) # min of the k-period lows
+        k = _divide((bar['Close'] - low) * 100, high - low)
+        return [k, self.d_sma.update(k)]
+
+#---------------------------------------Williams % R---------------------------------------
+# Class to generate n-period Williams % R bar by bar
+class WilliamsRState:
+
+    def __init__(self, n_period):
+        self.high = _RollingExtreme(n_period, True)
+        self.low = _RollingExtreme(n_period, False)
+
+    def update(self, bar):
+        high = self.high.update(bar['High']) # max of the n_period highs
+        low = self.low.update(bar['Low']) # min of the n_period lows
+        return _divide(-100 * (high - bar['Close']), high - low)
+
+#---------------------------------------Relative Strength Index (RSI)---------------------------------------
+# Class to generate n-period RSI bar by bar
+class RSIState:
+
+    def __init__(self, n_period):
+        self.avg_gain = _RollingMean(n_period)
+        self.avg_loss = _RollingMean(n_period)
+        self.last_price = 0 # current_price - last_price > 0 ==> gain. current_price - last_price < 0 ==> loss.
+
+    def update(self, bar):
+        close = bar['Close']
+        last_price = close if self.last_price == 0 else self.last_price
+        self.last_price = close
+
+        avg_gain = self.avg_gain.update(max(0.0, close - last_price))
+        avg_loss = self.avg_loss.update(max(0.0, last_price - close))
+
+        rs = 0 # relative strength starts at 0
+        if avg_loss > 0: # to avoid division by 0, which is undefined
+            rs = avg_gain / avg_loss
+
+        return 100 - (100 / (1 + rs))
+
+#---------------------------------------Average True Range (ATR)---------------------------------------
+# Class to generate n-period ATR bar by bar, with SMA, Wilder or EMA smoothing as in AverageTrueRangeMeasure.py
+class ATRState:
+
+    def __init__(self, n_period, smoothing='SMA'):
+        if smoothing != 'SMA' and smoothing not in SMOOTHING_CENTERS:
+            raise ValueError('Unknown ATR smoothing ' + str(smoothing) + ', use SMA, Wilder or EMA')
+        self.smoothing = smoothing
+        self.alpha = 1. / (1. + SMOOTHING_CENTERS[smoothing](n_period)) if smoothing in SMOOTHING_CENTERS else None # smoothing factor K
+        self.sma = _RunningMean(n_period)
+        self.last_close = math.nan # prior close price
+        self.value = math.nan # smoothed ATR, NaN until the first SMA ATR
+
+    def update(self, bar):
+        high, low, close = bar['High'], bar['Low'], bar['Close']
+        true_range = math.nan
+        for measure in [high - low, abs(high - self.last_close), abs(low - self.last_close)]: # max of the three, skipping NaN
+            if measure == measure and not measure <= true_range:
+                true_range = measure
+        self.last_close = close
+
+        sma = self.sma.update(true_range) # average the true range over n_period days
+        if self.alpha is None:
+            return sma
+
+        if self.value != self.value: # smoothing starts at the first SMA ATR
+            self.value = sma
+        elif true_range == true_range and true_range != self.value:
+            decay = 1. - self.alpha
+            self.value = (decay * self.value + self.alpha * true_range) / (decay + self.alpha) # as pandas' ewm, whose weights need not sum to exactly 1
+
+        return self.value
+
+#---------------------------------------Candlestick Patterns---------------------------------------
+'''
+The last 3 bars are kept in a fixed ring buffer: the new bar overwrites the oldest one, so no bars are copied or shifted.
+The pattern rules are compiled for single bars, with the same arithmetic as the batch function, so the flags are identical.
+The compiled rules read the bars straight from the ring buffer: bars[position - k] is the bar k bars back, negative indices wrapping around.
+'''
+
+# Class to generate the candlestick pattern flags bar by bar, as a list in PATTERN_NAMES order (overwritten on every bar)
+class CandlestickState:
+
+    def __init__(self):
+        self.size = CANDLESTICK_LOOKBACK + 1 # bars in the ring buffer
+        self.bars = [[math.nan] * 4 for _ in range(self.size)] # Open, High, Low, Close of the last bars
+        self.position = self.size - 1 # slot of the latest bar
+        self.count = 0 # number of bars seen
+        self.names = list(PATTERN_NAMES) # patterns in flag order
+        self.flags = [False] * len(self.names) # flags of the latest bar
+        self.bits = 0 # flags of the latest bar as a bitmask
+        self._evaluate = _compile_patterns(scalar=True)
+
+    def update(self, bar):
+        self.position = (self.position + 1) % self.size
+        slot = self.bars[self.position]
+        slot[0] = bar['Open']
+        slot[1] = bar['High']
+        slot[2] = bar['Low']
+        slot[3] = bar['Close']
+        self.count += 1
+
+        self.bits = 0
+        if self.count <= CANDLESTICK_LOOKBACK: # the first two bars have no prior bars to compare with
+            for i in range(len(self.flags)):
+                self.flags[i] = False
+            return self.flags
+
+        self._evaluate(self.bars, self.position, self.flags)
+        for i in range(len(self.flags)):
+            if self.flags[i]:
+                self.bits |= PATTERN_BITS[self.names[i]]
+
+        return self.flags
+
+    # Functions to pickle the state without the compiled rules, which are compiled again on loading
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_evaluate']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._evaluate = _compile_patterns(scalar=True)
+
+#---------------------------------------Incremental Recompute---------------------------------------
+'''
+Full History = History + New Bars
+
+FeatureState.update ( New Bars ) = the rows of the New Bars in a full recompute on the Full History
+
+Where:
+
+The terminal state of every indicator (EMA values, rolling window contents, RSI gain/loss windows, MACD signal EMA)
+is kept between runs, together with the last 2 bars the candlestick patterns of the next bar look back on.
+The state is saved with pickle, which stores the floats exactly, so the extended series are identical to a full recompute.
+'''
+
+# State class for the indicator function of each feature
+STATES = {SMA: SMAState, EMA: EMAState, MACD: MACDState, BBANDS: BBANDSState, ForceIndex: ForceIndexState, ATR: ATRState,
+          StochasticOscillator: StochState, WilliamsR: WilliamsRState, RSI: RSIState}
+
+# Class to keep the values of a feature set up to date, computing only the bars added since the last update
+class FeatureState:
+
+    def __init__(self, features, candlestick_patterns=False):
+        self.features = list(features) # feature names, as in FeatureSet.py, e.g. ['EMA20', 'MACD(12,26,9)']
+        self.states = {}
+        for feature in self.features:
+            func, params = ParseFeature(feature)
+            if func not in STATES:
+                raise ValueError(func.__name__ + ' has no streaming state, so ' + feature + ' cannot be updated incrementally')
+            self.states[feature] = STATES[func](*params)
+        self.candlestick_patterns = candlestick_patterns # whether to update the candlestick patterns too
+        self.last_bars = None # last bars of the prices seen so far, for the candlestick patterns
+        self.n_bars = 0 # number of bars seen so far
+
+    # Function to compute the features for the new bars, as {feature: values}, plus 'CandlestickPatterns' if enabled
+    def update(self, data):
+
+        values = {feature: [] for feature in self.features}
+        for bar in data.to_dict('records'):
+            for feature in self.features:
+                values[feature].append(self.states[feature].update(bar))
+
+        # Indicators with several outputs return one list per output, as the batch functions do
+        for feature in self.features:
+            if values[feature] and isinstance(values[feature][0], list):
+                values[feature] = [list(output) for output in zip(*values[feature])]
+
+        if self.candlestick_patterns:
+            values['CandlestickPatterns'] = self._update_patterns(data)
+
+        self.n_bars += len(data)
+
+        return values
+
+    # Function to get the candlestick patterns of the new bars, with the last bars seen before them as lookback
+    def _update_patterns(self, data):
+
+        prices = data[['Open', 'High', 'Low', 'Close']]
+        history = prices if self.last_bars is None else pd.concat([self.last_bars, prices])
+        self.last_bars = history.tail(CANDLESTICK_LOOKBACK)
+
+        patterns = CandlestickPatterns(history).drop(columns=prices.columns)
+        patterns = patterns.reindex(columns=PATTERN_NAMES, fill_value=False) # fewer than 3 bars so far have no pattern columns yet
+
+        return patterns.iloc[len(history) - len(prices):]
+
+    # Function to save the state, to continue from it in the next run
+    def save(self, path):
+
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+# Function to load a state saved with FeatureState.save
+def LoadFeatureState(path):
+
+    with open(path, 'rb') as f:
+        return pickle.load(f)
\ No newline at end of file
@@ -5,21 +5,27 @@ This program guides users to visualize stock prices with the technical indicator
 
 # Setting working directory
 DIR = 'C:/Users/user/Documents/GitHub/leeykjohn/Aries-Profits/Products/On-Demand Video Courses/Quantitative Stock Trading Level 1 Quartz Trader/Curriculum/Technical Analysis'
+DIR_DATA = 'C:/Users/user/Documents/GitHub/leeykjohn/Aries-Profits/Products/On-Demand Video Courses' \
+           '/Quantitative Stock Trading Level 1 Quartz Trader' \
+           '/Curriculum' \
+           '/Market Data'
 import sys
 sys.path.insert(0, DIR)
+sys.path.insert(0, DIR_DATA)
 
 # Import relevant packages
-import yfinance as yf
 import pandas as pd
 import matplotlib.pyplot as plt
 from TechnicalIndicators import *
+from PriceStore import PRICE_STORE, LoadPrices
 
 TICKER = 'SPY' # Stock Ticker symbol
 START_DATE = '2017-12-01' # Stock data start date
 END_DATE = '2022-12-01' # Stock data end date
+PRICE_STORE.root = 'PriceStore' # folder to keep downloaded prices between runs
 
 # Store adjusted stock prices into a variable
-stockPx = yf.download(TICKER, START_DATE, END_DATE)
+stockPx = LoadPrices(TICKER, START_DATE, END_DATE)
 
 # Configure options to display data frames
 pd.set_option('display.max_columns', 1000) # to output 1000 columns max
@@ -22,33 +22,45 @@ import matplotlib.pyplot as plt
 from datetime import datetime
 from CandlestickPatterns import *
 from TechnicalIndicators import *
+from IndicatorCache import *
+from FeatureSet import *
 from AverageTrueRangeMeasure import *
 
+# Technical indicators used by the strategy
+TREND_FOLLOWING_FEATURES = ['EMA20', 'EMA40', 'SMA50', 'SMA150', 'SMA200', 'MACD(12,26,9)', 'FI13', 'WR14', 'ATR14']
+
 # Function to implement the trend following strategy
-def TrendFollowingStrategy(data, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS):
+# Set WARM_UP_WINDOW to compute the indicators only on the lookback plus the warm-up they need, see WarmUpReport
+def TrendFollowingStrategy(data, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS, WARM_UP_WINDOW=False):
 
-    df = data.copy() # make a copy of the data
+    # Computing the technical indicators together, so the steps they share are computed once
+    if WARM_UP_WINDOW:
+        df = data.tail(LOOKBACK_PERIOD_DAYS + CANDLESTICK_LOOKBACK).copy() # the candlestick patterns look back on earlier bars
+        features = ComputeFeatures(data, TREND_FOLLOWING_FEATURES, INDICATOR_CACHE, len(df))
+    else:
+        df = data.copy() # make a copy of the data
+        features = ComputeFeatures(df, TREND_FOLLOWING_FEATURES, INDICATOR_CACHE)
 
     # Adding indicator columns in the technical indicators table
-    df['EMA20'] = EMA(df, 20)
-    df['EMA40'] = EMA(df, 40)
+    df['EMA20'] = features['EMA20']
+    df['EMA40'] = features['EMA40']
 
-    df['SMA50'] = SMA(df, 50)
-    df['SMA150'] = SMA(df, 150)
-    df['SMA200'] = SMA(df, 200)
+    df['SMA50'] = features['SMA50']
+    df['SMA150'] = features['SMA150']
+    df['SMA200'] = features['SMA200']
 
-    macd_columns = MACD(df, 12, 26, 9)
+    macd_columns = features['MACD(12,26,9)']
     df['MACD'] = macd_columns[0]
     df['MACDSignal'] = macd_columns[1]
     df['MACDHistogram'] = macd_columns[2]
 
-    df['ForceIndex13'] = ForceIndex(df, 13)
+    df['ForceIndex13'] = features['FI13']
 
-    df['WR14'] = WilliamsR(df, 14)
+    df['WR14'] = features['WR14']
 
-    df['ATR'] = ATR(df, 14)
+    df['ATR'] = features['ATR14']
 
-    df = CandlestickPatterns(df)
+    df = CandlestickPatterns(df, bitmask=True) # one uint16 bitmask of the patterns per bar
 
     # Subset to include the most recent data
     df = df.tail(LOOKBACK_PERIOD_DAYS)
@@ -74,6 +86,10 @@ def TrendFollowingStrategy(data, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS):
     # Minimum price change since last trade before considering trading again, this is to prevent over-trading at/around same prices
     MIN_PRICE_MOVE_FROM_LAST_TRADE = 0
 
+    trailing_atr = TrailingATR(df['ATR'], 90) # average ATR of the 90 days before each day, computed once for all days
+    patterns = df['Patterns'].to_numpy() # candlestick pattern bits, read as integers rather than through the float rows of df.iloc
+    sma_slopes = {column: Slope(df[column]) for column in ['SMA50', 'SMA150', 'SMA200']} # 0 where an SMA is flat up to rounding
+
     # Loop through prices, technical indicators, and candlestick patterns day by day
     for i in range(1,len(df)):
         price_c = df.iloc[i]['Close']
@@ -84,9 +100,9 @@ def TrendFollowingStrategy(data, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS):
         sma50_c = df.iloc[i]['SMA50']
         sma150_c = df.iloc[i]['SMA150']
         sma200_c = df.iloc[i]['SMA200']
-        sma50_p = df.iloc[i-1]['SMA50']
-        sma150_p = df.iloc[i-1]['SMA150']
-        sma200_p = df.iloc[i-1]['SMA200']
+        sma50_slope = sma_slopes['SMA50'][i]
+        sma150_slope = sma_slopes['SMA150'][i]
+        sma200_slope = sma_slopes['SMA200'][i]
 
         mcad_histo = df.iloc[i]['MACDHistogram']
 
@@ -94,16 +110,9 @@ def TrendFollowingStrategy(data, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS):
 
         wr14 = df.iloc[i]['WR14']
 
-        bullish_pin_bar = df.iloc[i]['BullishPinBar']
-        bearish_pin_bar = df.iloc[i]['BearishPinBar']
-        bullish_engulfing = df.iloc[i]['BullishEngulfing']
-        bearish_engulfing = df.iloc[i]['BearishEngulfing']
-        one_white_soldier = df.iloc[i]['OneWhiteSoldier']
-        one_black_crow = df.iloc[i]['OneBlackCrow']
-        morning_star = df.iloc[i]['MorningStar']
-        evening_star = df.iloc[i]['EveningStar']
+        patterns_c = patterns[i]
 
-        atr = df.iloc[:i]['ATR'].tail(90).mean()  # Take the average ATR in the most recent 3 months
+        atr = trailing_atr[i]  # Take the average ATR in the most recent 3 months
 
         # Buy-Entry (all must be met):
         # 1. 20EMA > 40 EMA
@@ -112,10 +121,10 @@ def TrendFollowingStrategy(data, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS):
         # 4. Bullish pin bar, or bullish engulfing, or one white soldier, or morning star candlestick pattern
 
         if ((ema20_c > ema40_c)
-              and ((sma50_c > sma150_c and sma50_c - sma50_p >= 0 and sma150_c - sma150_p >= 0) or (
-                            price_c > sma200_c and sma200_c - sma200_p > 0))
+              and ((sma50_c > sma150_c and sma50_slope >= 0 and sma150_slope >= 0) or (
+                            price_c > sma200_c and sma200_slope > 0))
               and (mcad_histo > 0 or fi13 > 0 or wr14 < -80)
-              and (bullish_pin_bar == 1 or bullish_engulfing == 1 or one_white_soldier == 1 or morning_star == 1)
+              and HasPattern(patterns_c, BULLISH_REVERSAL)
               and abs(price_c - max(last_buy_entry_price, last_buy_exit_price)) > MIN_PRICE_MOVE_FROM_LAST_TRADE):
 
             NUM_SHARES_PER_TRADE = int(np.round((TOTAL_CAPITAL * 0.02) / atr))  # Number of shares to buy/sell on every trade
@@ -156,9 +165,9 @@ def TrendFollowingStrategy(data, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS):
         # 4. Bearish pin bar, or bearish engulfing, or one black crow, or evening star candlestick pattern
 
         elif ((ema20_c < ema40_c)
-                and ((sma50_c < sma150_c and sma50_c - sma50_p <= 0 and sma150_c - sma150_p <= 0) or (price_c < sma200_c and sma200_c - sma200_p < 0))
+                and ((sma50_c < sma150_c and sma50_slope <= 0 and sma150_slope <= 0) or (price_c < sma200_c and sma200_slope < 0))
                 and (mcad_histo < 0 or fi13 < 0 or wr14 > -20)
-                and (bearish_pin_bar == 1 or bearish_engulfing == 1 or one_black_crow == 1 or evening_star == 1)
+                and HasPattern(patterns_c, BEARISH_REVERSAL)
                 and abs(price_c - max(last_sell_entry_price, last_sell_exit_price)) > MIN_PRICE_MOVE_FROM_LAST_TRADE):
 
             NUM_SHARES_PER_TRADE = int(np.round((TOTAL_CAPITAL * 0.02) / atr))  # Number of shares to buy/sell on every trade
@@ -225,7 +234,8 @@ def TrendFollowingStrategy(data, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS):
         # print("OpenPnL: ", open_pnl, " ClosedPnL: ", closed_pnl, " TotalPnL: ", (open_pnl + closed_pnl))
         pnls.append(closed_pnl + open_pnl)
 
-    # Preparing the dataframe from the trading strategy results
+    # Preparing the dataframe from the trading strategy results, with one True/False column per candlestick pattern
+    df = pd.concat([df.drop(columns='Patterns'), UnpackPatterns(df['Patterns'])], axis=1)
     df['Trades'] = orders
     df['Position'] = positions
     df['Pnl'] = pnls
@@ -4,26 +4,36 @@ This program guides user to visualize trade opportunities, position sizes, and p
 
 # Setting working directory
 DIR = 'C:/Users/user/Documents/GitHub/leeykjohn/Aries-Profits/Products/On-Demand Video Courses/Quantitative Stock Trading Level 1 Quartz Trader/Curriculum/Trend Following Strategy'
+DIR_DATA = 'C:/Users/user/Documents/GitHub/leeykjohn/Aries-Profits/Products/On-Demand Video Courses' \
+           '/Quantitative Stock Trading Level 1 Quartz Trader' \
+           '/Curriculum' \
+           '/Market Data'
 import sys
 sys.path.insert(0, DIR)
+sys.path.insert(0, DIR_DATA)
 
 # Import relevant packages
-import yfinance as yf
 import pandas as pd
 import matplotlib.pyplot as plt
 from TrendFollowingStrategy import *
+from PriceStore import PRICE_STORE, LoadPrices
 
 TICKER = 'SPY' # Stock Ticker symbol
 START_DATE = '2017-01-01' # Stock data start date
 END_DATE = '2023-01-01' # Stock data end date
 TOTAL_CAPITAL = 10000 # Total capital or net liquidation value
 LOOKBACK_PERIOD_DAYS = 504 # Most recent days to view
+INDICATOR_CACHE.cache_dir = 'IndicatorCache' # folder to keep computed indicators between runs
+WARM_UP_WINDOW = False # compute the indicators only on the lookback plus the warm-up they need
+PRICE_STORE.root = 'PriceStore' # folder to keep downloaded prices between runs
 
 # Store adjusted stock prices into a variable
-stockPx = yf.download(TICKER, START_DATE, END_DATE)
+stockPx = LoadPrices(TICKER, START_DATE, END_DATE)
 
 # Feed price data, capital amount, and lookback period into TrendFollowingStrategy function
-tradingSx = TrendFollowingStrategy(stockPx, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS)
+tradingSx = TrendFollowingStrategy(stockPx, TOTAL_CAPITAL, LOOKBACK_PERIOD_DAYS, WARM_UP_WINDOW)
+if WARM_UP_WINDOW: # report how close the indicators are to a full-history run
+    print(WarmUpReport(stockPx, TREND_FOLLOWING_FEATURES, LOOKBACK_PERIOD_DAYS + CANDLESTICK_LOOKBACK))
 
 # Visualizing graph with technical indicators
 fig = plt.figure(figsize = (10, 8))
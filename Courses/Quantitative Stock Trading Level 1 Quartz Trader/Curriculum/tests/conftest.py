@@ -0,0 +1,14 @@
+'''
+This script sets up the tests of the curriculum scripts.
+* The scripts import each other by folder, as the EXE programs do with their DIR settings,
+  so every script folder is put on the import path here.
+'''
+
+import os
+import sys
+
+CURRICULUM = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FOLDERS = ['Technical Analysis', 'Position Sizing', 'Stock Selection', 'Market Data',
+           'Trend Following Strategy', 'Mean Reversion Strategy', 'Risk Profiling & Control']
+
+sys.path[:0] = [os.path.join(CURRICULUM, folder) for folder in FOLDERS]
\ No newline at end of file
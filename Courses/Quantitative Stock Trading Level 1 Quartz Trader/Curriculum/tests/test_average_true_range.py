@@ -0,0 +1,96 @@
+'''
+Tests of the ATR functions in AverageTrueRangeMeasure.py against the pandas computations the scripts used before.
+'''
+
+import numpy as np
+import pandas as pd
+import pytest
+from AverageTrueRangeMeasure import ATR, TrailingATR
+
+# Original ATR, the rolling mean of the true range from the three pandas measures
+def pandas_atr(data, n_period):
+
+    high_low = data['High'] - data['Low'] # H-L
+    high_close = np.abs(data['High'] - data['Close'].shift()) # |H-Cp|
+    low_close = np.abs(data['Low'] - data['Close'].shift()) # |L-Cp|
+    true_range = np.max(pd.concat([high_low, high_close, low_close], axis=1), axis=1)
+
+    return true_range, true_range.rolling(n_period).mean().values
+
+# Function to smooth the true range bar by bar from the first SMA ATR on, with weight k on the new true range
+def loop_atr(data, n_period, k):
+
+    true_range, sma_atr = pandas_atr(data, n_period)
+    atr_values = np.full(len(data), np.nan)
+    atr_values[n_period - 1] = sma_atr[n_period - 1]
+    for i in range(n_period, len(data)):
+        atr_values[i] = (1 - k) * atr_values[i - 1] + k * true_range.iloc[i]
+
+    return atr_values
+
+# Function to make OHLC prices of a few tickers as a multi-ticker download, the last one listed later
+def ohlc_prices(tickers=('AAA', 'BBB', 'CCC'), n_bars=300, seed=0):
+
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for ticker in tickers:
+        close = 100 + np.cumsum(rng.normal(0, 1, n_bars))
+        open_ = close + rng.normal(0, 0.5, n_bars)
+        columns[('Open', ticker)] = open_
+        columns[('High', ticker)] = np.maximum(open_, close) + np.abs(rng.normal(0, 0.5, n_bars))
+        columns[('Low', ticker)] = np.minimum(open_, close) - np.abs(rng.normal(0, 0.5, n_bars))
+        columns[('Close', ticker)] = close
+    data = pd.DataFrame(columns, index=pd.bdate_range('2020-01-01', periods=n_bars))
+    data.loc[data.index[:40], (slice(None), tickers[-1])] = np.nan # listed later
+
+    return data
+
+# Function to make ATR-like values with the NaN warm-up of a 14-day ATR and a few missing days
+def atr_values(n_bars=400, seed=0):
+
+    rng = np.random.default_rng(seed)
+    values = pd.Series(np.abs(2 + np.cumsum(rng.normal(0, 0.1, n_bars))), index=pd.bdate_range('2020-01-01', periods=n_bars))
+    values.iloc[:13] = np.nan # ATR warm-up
+    values.iloc[[150, 151, 300]] = np.nan # missing days
+
+    return values
+
+def test_trailing_atr_matches_the_slice_of_each_day():
+
+    values = atr_values()
+    df = pd.DataFrame({'ATR': values})
+    for n_period in [90, 20, 1, 500]: # 500 bars is longer than the history
+        expected = [df.iloc[:i]['ATR'].tail(n_period).mean() for i in range(len(df))] # as the strategy loops computed it
+        np.testing.assert_array_equal(TrailingATR(df['ATR'], n_period), expected, str(n_period))
+
+def test_sma_atr_matches_the_original_pandas_atr():
+
+    data = ohlc_prices().xs('AAA', axis=1, level=1)
+    for n_period in [1, 14, 20]:
+        np.testing.assert_array_equal(ATR(data, n_period), pandas_atr(data, n_period)[1])
+        np.testing.assert_array_equal(ATR(data, n_period, 'SMA'), pandas_atr(data, n_period)[1])
+
+def test_wilder_and_ema_atr_smooth_from_the_first_sma_atr():
+
+    data = ohlc_prices().xs('AAA', axis=1, level=1)
+    for n_period in [5, 14]:
+        for smoothing, k in [('Wilder', 1 / n_period), ('EMA', 2 / (n_period + 1))]:
+            atr_values = ATR(data, n_period, smoothing)
+            assert np.isnan(atr_values[:n_period - 1]).all()
+            np.testing.assert_allclose(atr_values, loop_atr(data, n_period, k), rtol=1e-12, err_msg=smoothing)
+
+def test_panel_atr_matches_each_ticker_on_its_own():
+
+    data = ohlc_prices()
+    for smoothing in ['SMA', 'Wilder', 'EMA']:
+        panel = ATR(data, 14, smoothing)
+        assert list(panel.columns) == ['AAA', 'BBB', 'CCC'] and panel.index.equals(data.index)
+        for ticker in panel.columns:
+            np.testing.assert_array_equal(panel[ticker].to_numpy(), ATR(data.xs(ticker, axis=1, level=1), 14, smoothing))
+        assert np.isnan(panel['CCC'].iloc[:40 + 13]).all() # the late listing starts its own warm-up
+        assert not np.isnan(panel['CCC'].iloc[40 + 13:]).any()
+
+def test_atr_rejects_unknown_smoothing():
+
+    with pytest.raises(ValueError):
+        ATR(ohlc_prices().xs('AAA', axis=1, level=1), 14, 'WMA')
@@ -0,0 +1,118 @@
+'''
+Tests of BulkDownloader.py against a local HTTP server that rate-limits and fails the first attempts of every batch.
+'''
+
+import threading
+import time
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+from BulkDownloader import BulkDownloader, HttpCsvSource, TokenBucket
+from PriceStore import PriceStore
+
+START, END = '2023-01-02', '2023-02-01'
+TICKERS = ['A0', 'A1', 'A2', 'A3', 'A4', 'BAD', 'DOWN'] # BAD is never in the CSV, DOWN always fails
+
+# Class to answer batch requests: 429 on the first attempt of a batch, 503 on the second, then the CSV of its known tickers
+class PriceHandler(BaseHTTPRequestHandler):
+
+    attempts = {} # requests of each batch
+    lock = threading.Lock()
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        tickers = query['symbols'][0].split(',')
+        with self.lock:
+            attempt = self.attempts[tuple(tickers)] = self.attempts.get(tuple(tickers), 0) + 1
+
+        if 'DOWN' in tickers or attempt == 2:
+            return self.send_error(503)
+        if attempt == 1:
+            return self.send_error(429)
+
+        dates = pd.bdate_range(query['from'][0], pd.Timestamp(query['to'][0]) - pd.Timedelta(days=1))
+        rows = ['Date,Ticker,Open,High,Low,Close,Adj Close,Volume']
+        for ticker in tickers:
+            if ticker != 'BAD':
+                rows += [str(d.date()) + ',' + ticker + ',1.5,2.5,0.5,' + str(i + 1.25) + ',' + str(i + 1.25) + ',100'
+                         for i, d in enumerate(dates)]
+        body = '\n'.join(rows).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args): # keep the test output quiet
+        pass
+
+@pytest.fixture
+def server():
+
+    PriceHandler.attempts = {}
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), PriceHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:' + str(httpd.server_address[1]) + '/prices?symbols={tickers}&from={start}&to={end}'
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_retries_checkpoints_and_failed_tickers(server, tmp_path):
+
+    store = PriceStore(str(tmp_path))
+    downloader = BulkDownloader(store, HttpCsvSource(server, timeout=5), batch_size=2, max_workers=3,
+                                rate=100, burst=10, retries=5, backoff=0.01, max_backoff=0.05)
+    failed = downloader.download(TICKERS, START, END)
+
+    assert failed == ['BAD', 'DOWN']
+    assert isinstance(downloader.errors['BAD'], LookupError)
+    assert isinstance(downloader.errors['DOWN'], urllib.error.HTTPError) and downloader.errors['DOWN'].code == 503
+
+    # 429, 503, then the batch; [A4, BAD] is saved without BAD, which is retried on its own until the retries run out
+    assert PriceHandler.attempts == {('A0', 'A1'): 3, ('A2', 'A3'): 3, ('A4', 'BAD'): 3, ('BAD',): 3, ('DOWN',): 6}
+
+    dates = pd.bdate_range(START, '2023-01-31')
+    for ticker in ['A0', 'A1', 'A2', 'A3', 'A4']: # checkpointed, A4 from the partial batch
+        prices, coverage = store.read(ticker)
+        assert prices.index.equals(dates.rename('Date'))
+        assert prices['Close'].tolist() == [i + 1.25 for i in range(len(dates))]
+        assert store.missing(ticker, START, END) == []
+    assert store.missing('BAD', START, END) != [] and store.missing('DOWN', START, END) != []
+
+    # A second run resumes with the failed tickers only
+    PriceHandler.attempts = {}
+    assert downloader.download(TICKERS, START, END) == ['BAD', 'DOWN']
+    assert PriceHandler.attempts == {('BAD', 'DOWN'): 6}
+
+def test_weekend_end_date_is_not_downloaded_again(server, tmp_path):
+
+    store = PriceStore(str(tmp_path))
+    downloader = BulkDownloader(store, HttpCsvSource(server, timeout=5), batch_size=2, max_workers=2,
+                                rate=100, burst=10, retries=5, backoff=0.01, max_backoff=0.05)
+    tickers = ['A0', 'A1', 'A2']
+    assert downloader.download(tickers, '2022-12-01', '2023-01-01') == [] # ends on a Sunday, the last bar is on Friday
+
+    PriceHandler.attempts = {}
+    assert downloader.download(tickers, '2022-12-01', '2023-01-01') == []
+    assert PriceHandler.attempts == {} # every ticker is covered up to the end date, so nothing is requested
+    for ticker in tickers:
+        assert store.missing(ticker, '2022-12-01', '2023-01-01') == []
+        assert store.read(ticker)[0].index[-1] == pd.Timestamp('2022-12-30')
+
+def test_token_bucket_limits_the_request_rate():
+
+    bucket = TokenBucket(rate=20, capacity=1)
+    started = []
+    threads = [threading.Thread(target=lambda: [bucket.acquire() or started.append(time.monotonic()) for _ in range(4)])
+               for _ in range(3)]
+    begin = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(started) == 12
+    assert max(started) - begin >= 11 / 20 * 0.9 # one token at once, then 20 per second across the threads
@@ -0,0 +1,172 @@
+'''
+Tests of the vectorized candlestick patterns in CandlestickPatterns.py against the original per-bar rules.
+'''
+
+import CandlestickPatterns as candlesticks
+import numpy as np
+import pandas as pd
+import pickle
+import pytest
+from CandlestickPatterns import BEARISH_REVERSAL, BULLISH_REVERSAL, PATTERN_BITS, PATTERN_NAMES, CandlestickPatterns, \
+                                MORE_PATTERNS, HasPattern, PackPatterns, PatternMask, RegisterPattern, \
+                                ScanPatterns, UnpackPatterns
+from StreamingIndicators import CandlestickState
+
+# Original per-bar rules, written with Python's min/max on the bar and the 2 bars before it
+def loop_patterns(prev2, prev, current):
+
+    body_c, body_prev, body_prev2 = [abs(bar['Open'] - bar['Close']) for bar in [current, prev, prev2]]
+    range_c, range_prev, range_prev2 = [bar['High'] - bar['Low'] for bar in [current, prev, prev2]]
+
+    return {'BullishPinBar': (body_c <= range_c / 3) and (min(current['Open'], current['Close']) > (current['High'] + current['Low']) / 2)
+                             and (current['Low'] < prev['Low']),
+            'BearishPinBar': (body_c <= range_c / 3) and (max(current['Open'], current['Close']) < (current['High'] + current['Low']) / 2)
+                             and (current['High'] > prev['High']),
+            'BullishEngulfing': (prev['Close'] < prev['Open']) and (current['Close'] > current['Open']) and (current['High'] > prev['High'])
+                                and (current['Low'] < prev['Low']) and (current['Close'] > prev['Open'])
+                                and (current['Open'] < prev['Close']) and (body_c >= 0.8 * range_c),
+            'BearishEngulfing': (prev['Close'] > prev['Open']) and (current['Close'] < current['Open']) and (current['High'] > prev['High'])
+                                and (current['Low'] < prev['Low']) and (current['Close'] < prev['Open'])
+                                and (current['Open'] > prev['Close']) and (body_c >= 0.8 * range_c),
+            'OneWhiteSoldier': (prev['Close'] < prev['Open']) and (current['Close'] > current['Open']) and (body_prev >= 0.8 * range_prev)
+                               and (body_c >= 0.8 * range_c) and (current['Open'] > prev['Close']) and (current['Close'] > prev['High']),
+            'OneBlackCrow': (prev['Close'] > prev['Open']) and (current['Close'] < current['Open']) and (body_prev >= 0.8 * range_prev)
+                            and (body_c >= 0.8 * range_c) and (current['Open'] < prev['Close']) and (current['Close'] < prev['Low']),
+            'MorningStar': (prev2['Close'] < prev2['Open']) and (body_prev2 >= 0.6 * range_prev2) and (body_prev <= 0.2 * range_prev)
+                           and (max(prev['Open'], prev['Close']) < prev2['Close']) and (max(prev['Open'], prev['Close']) < current['Open'])
+                           and (current['Close'] > current['Open']) and (current['Close'] > (prev2['Open'] + prev2['Close']) / 2),
+            'EveningStar': (prev2['Close'] > prev2['Open']) and (body_prev2 >= 0.6 * range_prev2) and (body_prev <= 0.2 * range_prev)
+                           and (min(prev['Open'], prev['Close']) > prev2['Close']) and (max(prev['Open'], prev['Close']) > current['Open'])
+                           and (current['Close'] < current['Open']) and (current['Close'] < (prev2['Open'] + prev2['Close']) / 2)}
+
+# Function to make OHLC bars with many patterns: long and short bodies, gaps, dojis and a few NaN bars
+def pattern_prices(n_bars=3000, seed=0):
+
+    rng = np.random.default_rng(seed)
+    open_ = np.round(100 + np.cumsum(rng.normal(0, 1, n_bars)), 1) # coarse prices, so ties happen too
+    close = np.round(open_ + rng.choice([-3, -1, -0.2, 0, 0.2, 1, 3], n_bars), 1)
+    high = np.maximum(open_, close) + rng.choice([0, 0.1, 0.5, 2], n_bars)
+    low = np.minimum(open_, close) - rng.choice([0, 0.1, 0.5, 2], n_bars)
+    data = pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close},
+                        index=pd.bdate_range('2015-01-01', periods=n_bars))
+    data.iloc[[n_bars // 6, 2 * n_bars // 5, 2 * n_bars // 5 + 1]] = np.nan # missing bars
+
+    return data
+
+def test_patterns_match_the_per_bar_rules():
+
+    data = pattern_prices()
+    patterns = CandlestickPatterns(data)
+    bars = data.to_dict('records')
+    expected = pd.DataFrame([loop_patterns(*bars[i - 2:i + 1]) for i in range(2, len(bars))], index=data.index[2:])
+
+    pd.testing.assert_frame_equal(patterns.iloc[2:][expected.columns].astype(bool), expected)
+    assert (patterns.iloc[:2][expected.columns] == False).all().all() # the first two bars have no prior bars
+    assert (expected.sum() > 0).all() # every pattern is found somewhere
+
+def test_candlestick_state_matches_the_batch_patterns():
+
+    data = pattern_prices(n_bars=1500)
+    patterns = CandlestickPatterns(data)
+    bits = CandlestickPatterns(data, bitmask=True)['Patterns']
+    bars = data.to_dict('records')
+
+    state = CandlestickState()
+    flags, packed = [], []
+    for i, bar in enumerate(bars):
+        if i == len(bars) // 2:
+            state = pickle.loads(pickle.dumps(state)) # the compiled rules are compiled again on loading
+        flags.append(list(state.update(bar)))
+        packed.append(state.bits)
+
+    pd.testing.assert_frame_equal(pd.DataFrame(flags, index=data.index, columns=state.names),
+                                  patterns[state.names].astype(bool))
+    np.testing.assert_array_equal(packed, bits.to_numpy())
+
+def test_bitmask_packs_and_unpacks_the_pattern_columns():
+
+    data = pattern_prices()
+    columns = CandlestickPatterns(data)[PATTERN_NAMES]
+    packed = CandlestickPatterns(data, bitmask=True)
+
+    assert packed['Patterns'].dtype == np.uint16 and not set(PATTERN_NAMES) & set(packed.columns)
+    np.testing.assert_array_equal(packed['Patterns'].to_numpy(), PackPatterns(columns))
+    pd.testing.assert_frame_equal(UnpackPatterns(packed['Patterns']), columns.astype(bool))
+    np.testing.assert_array_equal(PackPatterns(UnpackPatterns(packed['Patterns'])), packed['Patterns'].to_numpy())
+
+    bullish = columns[['BullishPinBar', 'BullishEngulfing', 'OneWhiteSoldier', 'MorningStar']].any(axis=1).to_numpy()
+    bearish = columns[['BearishPinBar', 'BearishEngulfing', 'OneBlackCrow', 'EveningStar']].any(axis=1).to_numpy()
+    np.testing.assert_array_equal(HasPattern(packed['Patterns'].to_numpy(), BULLISH_REVERSAL), bullish)
+    np.testing.assert_array_equal(HasPattern(packed['Patterns'].to_numpy(), BEARISH_REVERSAL), bearish)
+
+def test_pack_patterns_reads_nan_as_no_pattern():
+
+    columns = pd.DataFrame({'BullishPinBar': [np.nan, True, False], 'MorningStar': [True, np.nan, True]}, dtype=object)
+
+    np.testing.assert_array_equal(PackPatterns(columns), [PATTERN_BITS['MorningStar'], PATTERN_BITS['BullishPinBar'],
+                                                          PATTERN_BITS['MorningStar']])
+    assert PatternMask('BullishPinBar', 'MorningStar') == 65
+
+def test_registered_patterns_are_compiled_with_the_others(monkeypatch):
+
+    # Register into copies of the registry, so the other tests keep the 8 built-in patterns
+    for name in ['PATTERNS', 'PATTERN_NAMES', 'PATTERN_BITS']:
+        monkeypatch.setattr(candlesticks, name, type(getattr(candlesticks, name))(getattr(candlesticks, name)))
+    monkeypatch.setattr(candlesticks, '_compiled_patterns', None)
+
+    data = pattern_prices()
+    before = candlesticks.CandlestickPatterns(data)
+    for name, rules in MORE_PATTERNS.items():
+        candlesticks.RegisterPattern(name, rules)
+    after = candlesticks.CandlestickPatterns(data)
+
+    pd.testing.assert_frame_equal(after[before.columns], before) # the built-in patterns are unchanged
+    open_, high, low, close = [data[column].to_numpy() for column in ['Open', 'High', 'Low', 'Close']]
+    body, bar_range = np.abs(open_ - close), high - low
+    hammer = (np.minimum(open_, close) - low >= 2 * body) & (high - np.maximum(open_, close) <= 0.1 * bar_range)
+    hammer[1:] &= low[1:] < low[:-1]
+    np.testing.assert_array_equal(after['Doji'].to_numpy()[2:].astype(bool), (body <= 0.1 * bar_range)[2:])
+    np.testing.assert_array_equal(after['Hammer'].to_numpy()[2:].astype(bool), hammer[2:])
+    assert candlesticks.PATTERN_BITS['BearishHarami'] == 1 << 12
+    assert after['Doji'].sum() > 0 and after['Hammer'].sum() > 0
+
+    packed = candlesticks.CandlestickPatterns(data, bitmask=True)['Patterns']
+    np.testing.assert_array_equal(HasPattern(packed.to_numpy(), candlesticks.PatternMask('Doji')), after['Doji'].astype(bool))
+
+def test_register_pattern_rejects_bad_rules():
+
+    for rule in ['Body <= Wick', 'Close[3] > Open', 'Close > Open and Open > 0', 'Close > abs(Open)', 'Close > Open > Low',
+                 'Close + Open', "Close > 'Open'"]:
+        with pytest.raises(ValueError):
+            RegisterPattern('Bad', [rule])
+    with pytest.raises(ValueError):
+        RegisterPattern('BullishPinBar', ['Close > Open']) # already registered
+    assert 'Bad' not in PATTERN_NAMES
+
+# Function to list the hits of each ticker's own CandlestickPatterns, as ScanPatterns lists them
+def hits_per_ticker(data, names=PATTERN_NAMES, first_date=None):
+
+    rows = []
+    for ticker in data['Close'].columns:
+        patterns = CandlestickPatterns(data.xs(ticker, axis=1, level=1))
+        for date, flags in patterns[names].astype(bool).iterrows():
+            if first_date is None or date >= first_date:
+                rows += [(date, ticker, name) for name in names if flags[name]]
+
+    return sorted(rows, key=lambda row: (row[0], row[1], names.index(row[2])))
+
+def test_scan_matches_each_tickers_patterns():
+
+    data = pd.concat({ticker: pattern_prices(600, seed) for seed, ticker in enumerate(['AAA', 'BBB', 'CCC'])}, axis=1).swaplevel(axis=1)
+    data.iloc[:50, data.columns.get_level_values(1) == 'CCC'] = np.nan # listed later
+
+    scan = ScanPatterns(data)
+    assert list(scan.itertuples(index=False, name=None)) == hits_per_ticker(data)
+    assert list(scan['Pattern'].cat.categories) == PATTERN_NAMES
+
+    subset = ['MorningStar', 'BullishPinBar']
+    scan = ScanPatterns(data, last_bars=100, patterns=subset) # the last 100 bars still look back on the 2 bars before them
+    assert list(scan.itertuples(index=False, name=None)) == hits_per_ticker(data, subset, data.index[-100])
+    assert len(scan) > 0
+
+    assert ScanPatterns(data, last_bars=0).empty and ScanPatterns(data.iloc[:2]).empty
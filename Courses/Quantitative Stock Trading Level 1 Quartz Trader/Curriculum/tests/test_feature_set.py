@@ -0,0 +1,71 @@
+'''
+Tests of the feature-set planner and the warm-up window in FeatureSet.py.
+'''
+
+import numpy as np
+import pandas as pd
+from AverageTrueRangeMeasure import ATR
+from FeatureSet import ComputeFeatures, PlanFeatures, WarmUpReport
+from TechnicalIndicators import BBANDS, EMA, MACD, RSI, SMA, ForceIndex, StochasticOscillator, WilliamsR
+
+FEATURES = ['EMA20', 'EMA40', 'SMA50', 'SMA150', 'MACD(12,26,9)', 'BBANDS(20,2)', 'FI13', 'STOCH(5,3)', 'WR14', 'RSI10', 'ATR14']
+
+# Function to make OHLCV prices with a flat run, where every price of the bars is the same
+def make_prices(n_bars=700, seed=1):
+
+    rng = np.random.default_rng(seed)
+    close = np.round(100 + np.cumsum(rng.normal(0, 0.5, n_bars)), 2)
+    open_ = np.round(close + rng.normal(0, 0.2, n_bars), 2)
+    data = pd.DataFrame({'Open': open_, 'High': np.maximum(open_, close) + 0.25, 'Low': np.minimum(open_, close) - 0.25,
+                         'Close': close, 'Adj Close': close, 'Volume': rng.integers(100000, 1000000, n_bars).astype(float)},
+                        index=pd.bdate_range('2020-01-01', periods=n_bars))
+    data.iloc[300:330, :5] = close[300]
+
+    return data
+
+# Function to compute each feature with its own indicator function
+def separately(data):
+
+    return {'EMA20': EMA(data, 20), 'EMA40': EMA(data, 40), 'SMA50': SMA(data, 50), 'SMA150': SMA(data, 150),
+            'MACD(12,26,9)': MACD(data, 12, 26, 9), 'BBANDS(20,2)': BBANDS(data, 20, 2), 'FI13': ForceIndex(data, 13),
+            'STOCH(5,3)': StochasticOscillator(data, 5, 3), 'WR14': WilliamsR(data, 14), 'RSI10': RSI(data, 10),
+            'ATR14': ATR(data, 14)}
+
+def test_features_match_their_indicator_functions():
+
+    for data in [make_prices(), pd.concat({'A': make_prices(seed=1), 'B': make_prices(seed=2)}, axis=1).swaplevel(axis=1)]:
+        with np.errstate(invalid='ignore'): # the flat run has no range, so %K and %R are NaN there
+            features = ComputeFeatures(data, FEATURES)
+            expected = separately(data)
+        for feature in FEATURES:
+            np.testing.assert_array_equal(np.asarray(features[feature], dtype=float), np.asarray(expected[feature], dtype=float), feature)
+
+def test_shared_steps_are_planned_once():
+
+    nodes, outputs = PlanFeatures(['EMA20', 'MACD(20,26,9)', 'BBANDS(20,2)', 'SMA20', 'STOCH(5,3)', 'WR5'])
+
+    assert len(nodes) == len(set(nodes))
+    assert outputs['EMA20'][0] in nodes and outputs['MACD(20,26,9)'][0][1] == outputs['EMA20'][0] # EMA20 is shared
+    assert outputs['BBANDS(20,2)'][1] == outputs['SMA20'][0] # the middle band is SMA20
+    assert sum(node[0] == 'Max' for node in nodes) == 1 # the 5-period highs of STOCH and WR
+
+def test_warm_up_report_holds_against_the_full_history():
+
+    for seed in [1, 2, 3]:
+        data = make_prices(n_bars=1500, seed=seed)
+        for first, last in [(880, 960), (990, 1010), (1040, 1060), (1240, 1260)]: # flat runs across the warm-up window starts
+            data.iloc[first:last, :5] = data['Close'].iloc[first]
+        for lookback in [200, 450]:
+            with np.errstate(invalid='ignore'): # the flat runs have no range, so %K and %R are NaN there
+                full = ComputeFeatures(data, FEATURES)
+                windowed = ComputeFeatures(data, FEATURES, lookback=lookback)
+            report = WarmUpReport(data, FEATURES, lookback).set_index('Feature')
+
+            for feature in FEATURES:
+                values = np.asarray(windowed[feature], dtype=float)
+                expected = np.asarray(full[feature], dtype=float)[..., -lookback:]
+                assert report.loc[feature, 'Start'] > 0, feature # every feature really starts late
+                if report.loc[feature, 'Exact']:
+                    np.testing.assert_array_equal(values, expected, feature + ' seed ' + str(seed))
+                else:
+                    assert np.nanmax(np.abs(values - expected)) <= report.loc[feature, 'ErrorBound'], feature
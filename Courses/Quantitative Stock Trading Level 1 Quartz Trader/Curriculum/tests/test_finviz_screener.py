@@ -0,0 +1,117 @@
+'''
+Tests of FinvizScreener.py against a local stand-in for finvizfinance's Overview class, with no network access.
+'''
+
+import os
+import threading
+import time
+
+import pandas as pd
+from FinvizScreener import MARKET_CAP_DICT, FinvizScreener, ScreenerCache
+
+SHARES_OUTSTANDING = ('Over 5M', 'Under 20M')
+
+# Class to stand in for finvizfinance's Overview, answering each filter dictionary from a table of ticker lists
+class FakeOverview:
+
+    results = {} # ticker list of each (market cap, shares outstanding) filter, None for no filtered stocks
+    queries = [] # filter dictionaries queried so far
+    active = 0 # queries running now
+    peak = 0 # most queries running at the same time
+    lock = threading.Lock()
+
+    def set_filter(self, filters_dict):
+        self.filters = filters_dict
+
+    def screener_view(self):
+        with FakeOverview.lock:
+            FakeOverview.queries.append(self.filters)
+            FakeOverview.active += 1
+            FakeOverview.peak = max(FakeOverview.peak, FakeOverview.active)
+        time.sleep(0.05) # a slow web query, so the queries overlap
+        with FakeOverview.lock:
+            FakeOverview.active -= 1
+
+        tickers = FakeOverview.results[(self.filters['Market Cap.'], self.filters['Shares Outstanding'])]
+
+        return None if tickers is None else pd.DataFrame({'Ticker': tickers, 'Price': [10.0] * len(tickers)})
+
+# Function to reset the stand-in with small cap results: bucket by bucket, the stocks in both shares outstanding lists
+def small_cap_overview():
+
+    small, micro, nano = MARKET_CAP_DICT['Small Cap']
+    FakeOverview.results = {(small, 'Over 5M'): ['A', 'B', 'C'], (small, 'Under 20M'): ['C', 'B', 'D'],
+                            (micro, 'Over 5M'): ['E', 'B', 'F'], (micro, 'Under 20M'): ['F', 'B'],
+                            (nano, 'Over 5M'): None, (nano, 'Under 20M'): ['G']}
+    FakeOverview.queries = []
+    FakeOverview.peak = 0
+
+    return FakeOverview
+
+def test_every_bucket_and_shares_query_runs_and_merges_in_order():
+
+    overview = small_cap_overview()
+    tickers = FinvizScreener('Technology', 'Small Cap', 'Over $10', SHARES_OUTSTANDING, 'Over 200K',
+                             overview=overview, cache=ScreenerCache())
+
+    assert tickers == ['B', 'C', 'F'] # small cap's B and C in its first list's order, then micro's F; B only once
+    queried = sorted((fset['Market Cap.'], fset['Shares Outstanding']) for fset in overview.queries)
+    assert queried == sorted(overview.results)
+    for fset in overview.queries:
+        assert fset['Sector'] == 'Technology' and fset['Price'] == 'Over $10' and fset['Average Volume'] == 'Over 200K'
+
+def test_queries_run_concurrently_up_to_max_workers():
+
+    for max_workers in [1, 2, 4]:
+        overview = small_cap_overview()
+        tickers = FinvizScreener('Technology', 'Small Cap', 'Over $10', SHARES_OUTSTANDING, 'Over 200K',
+                                 overview=overview, max_workers=max_workers, cache=ScreenerCache())
+
+        assert tickers == ['B', 'C', 'F']
+        assert len(overview.queries) == 6
+        assert 1 <= overview.peak <= max_workers
+    assert overview.peak > 1 # the queries did overlap
+
+def test_earlier_spelling_of_small_cap_still_works():
+
+    overview = small_cap_overview()
+
+    assert FinvizScreener('Technology', 'Samll Cap', 'Over $10', SHARES_OUTSTANDING, 'Over 200K',
+                          overview=overview, cache=ScreenerCache()) == ['B', 'C', 'F']
+
+# Class to stand in for an Overview whose web query fails, e.g. with a timeout
+class FailingOverview(FakeOverview):
+
+    def screener_view(self):
+        raise TimeoutError('Finviz did not answer')
+
+def test_failed_queries_raise_and_are_not_cached(tmp_path):
+
+    cache = ScreenerCache(str(tmp_path))
+    small_cap_overview()
+    try:
+        FinvizScreener('Technology', 'Small Cap', 'Over $10', SHARES_OUTSTANDING, 'Over 200K', overview=FailingOverview, cache=cache)
+    except TimeoutError:
+        pass
+    else:
+        raise AssertionError('a failed query must not count as no stocks')
+    assert [name for name in os.listdir(str(tmp_path)) if name.endswith('.csv')] == []
+
+    # The next run queries again, and its results (including no filtered stocks) are cached and replayed offline
+    overview = small_cap_overview()
+    assert FinvizScreener('Technology', 'Small Cap', 'Over $10', SHARES_OUTSTANDING, 'Over 200K',
+                          overview=overview, cache=cache) == ['B', 'C', 'F']
+    assert len(overview.queries) == 6 and len(os.listdir(str(tmp_path))) == 6
+    assert FinvizScreener('Technology', 'Small Cap', 'Over $10', SHARES_OUTSTANDING, 'Over 200K', overview=FailingOverview,
+                          cache=ScreenerCache(str(tmp_path), offline=True)) == ['B', 'C', 'F']
+
+
+def test_no_shares_outstanding_criteria_means_no_shares_filter():
+
+    overview = small_cap_overview()
+    small, micro, nano = MARKET_CAP_DICT['Small Cap']
+    overview.results.update({(small, 'Any'): ['A', 'B'], (micro, 'Any'): ['B', 'E'], (nano, 'Any'): None})
+
+    assert FinvizScreener('Technology', 'Small Cap', 'Over $10', (), 'Over 200K', overview=overview,
+                          cache=ScreenerCache()) == ['A', 'B', 'E']
+    assert sorted(fset['Market Cap.'] for fset in overview.queries) == sorted([small, micro, nano])
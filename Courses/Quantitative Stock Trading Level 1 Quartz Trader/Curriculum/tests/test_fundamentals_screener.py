@@ -0,0 +1,106 @@
+'''
+Tests of the local screener in FundamentalsScreener.py against brute-force pandas filters.
+'''
+
+import os
+
+import numpy as np
+import pandas as pd
+from FinvizScreener import MARKET_CAP_DICT
+from FundamentalsScreener import FundamentalsIndex, FundamentalsScreener, LocalScreener, ReadFundamentals
+from conftest import CURRICULUM
+
+SAMPLE = os.path.join(CURRICULUM, 'Stock Selection', '20230118StocksToShortFinal.csv')
+SECTORS = ['Technology', 'Healthcare', 'Energy', 'Financial']
+
+# Market cap range of each Finviz label, as [low, high) in dollars
+MARKET_CAPS = {'Mega ($200bln and more)': [200e9, np.inf], 'Large ($10bln to $200bln)': [10e9, 200e9],
+               'Mid ($2bln to $10bln)': [2e9, 10e9], 'Small ($300mln to $2bln)': [300e6, 2e9],
+               'Micro ($50mln to $300mln)': [50e6, 300e6], 'Nano (under $50mln)': [-np.inf, 50e6]}
+
+# Function to make a random snapshot, with values on the filter thresholds and some unknown (NaN) values
+def make_fundamentals(n_stocks=3000, seed=0):
+
+    rng = np.random.default_rng(seed)
+    fundamentals = pd.DataFrame({'Ticker': ['T' + str(i) for i in range(n_stocks)],
+                                 'Sector': rng.choice(SECTORS, n_stocks),
+                                 'Market Cap.': np.exp(rng.uniform(np.log(10), np.log(1e6), n_stocks)).round(2), # in millions
+                                 'Price': rng.uniform(1, 100, n_stocks).round(2),
+                                 'Shares Outstanding': np.exp(rng.uniform(np.log(1e6), np.log(1e9), n_stocks)).round(),
+                                 'Average Volume': rng.integers(10000, 1000000, n_stocks).astype(float)})
+    fundamentals.loc[:9, 'Price'] = 10.0 # on the 'Over $10' threshold
+    fundamentals.loc[10:19, 'Market Cap.'] = 2000 # on the Mid/Small boundary
+    fundamentals.loc[20:29, 'Market Cap.'] = 50 # on the Micro/Nano boundary
+    fundamentals.loc[30:39, 'Shares Outstanding'] = np.nan
+
+    return fundamentals
+
+# Function to filter a snapshot with pandas, stock by stock, with the meaning of each Finviz filter written out
+def brute_force(fundamentals, sector, market_cap, shares_outstanding):
+
+    low, high = MARKET_CAPS[market_cap]
+    market_caps = fundamentals['Market Cap.'] * 1e6 # in dollars
+    shares = {'Over 5M': fundamentals['Shares Outstanding'] > 5e6, 'Under 20M': fundamentals['Shares Outstanding'] < 20e6,
+              'Any': pd.Series(True, index=fundamentals.index)}[shares_outstanding]
+    passed = ((fundamentals['Sector'] == sector)
+              & (market_caps >= low) & (market_caps < high)
+              & (fundamentals['Price'] > 10) & shares & (fundamentals['Average Volume'] > 200e3))
+
+    return fundamentals['Ticker'][passed].to_list()
+
+def test_index_matches_brute_force():
+
+    fundamentals = make_fundamentals()
+    index = FundamentalsIndex(fundamentals)
+    for sector in SECTORS:
+        for market_cap in MARKET_CAPS:
+            for shares_outstanding in ['Over 5M', 'Under 20M', 'Any']:
+                fset = {'Sector': sector, 'Market Cap.': market_cap, 'Price': 'Over $10',
+                        'Shares Outstanding': shares_outstanding, 'Average Volume': 'Over 200K'}
+                assert index.screen(fset) == brute_force(fundamentals, sector, market_cap, shares_outstanding), fset
+
+def test_local_screener_matches_brute_force_for_every_market_cap():
+
+    fundamentals = make_fundamentals()
+    screener = FundamentalsScreener()
+    screener.add(fundamentals, '2023-01-18')
+    for fmarket_cap in ['Large Cap', 'Medium Cap', 'Small Cap']:
+        expected = []
+        for market_cap in MARKET_CAP_DICT[fmarket_cap]: # stocks in both shares outstanding lists, bucket by bucket
+            over, under = [brute_force(fundamentals, 'Technology', market_cap, shares) for shares in ['Over 5M', 'Under 20M']]
+            expected += [t for t in over if t in under and t not in expected]
+
+        assert LocalScreener(screener, 'Technology', fmarket_cap, 'Over $10', ('Over 5M', 'Under 20M'), 'Over 200K') == expected
+
+def test_small_cap_leaves_out_the_mid_caps_of_the_sample():
+
+    fundamentals = ReadFundamentals(SAMPLE)
+    screener = FundamentalsScreener()
+    screener.add(SAMPLE, '2023-01-18')
+
+    small = LocalScreener(screener, 'Consumer Cyclical', 'Small Cap', 'Any', ('Any',), 'Any')
+    medium = LocalScreener(screener, 'Consumer Cyclical', 'Medium Cap', 'Any', ('Any',), 'Any')
+
+    caps = dict(zip(fundamentals['Ticker'], fundamentals['Market Cap.']))
+    assert all(caps[t] < 2e9 for t in small)
+    assert all(2e9 <= caps[t] < 10e9 for t in medium)
+    assert sorted(small + medium) == sorted(t for t, cap in caps.items() if cap < 10e9)
+
+
+def test_local_screener_without_shares_outstanding_criteria_skips_that_filter():
+
+    screener = FundamentalsScreener()
+    screener.add(make_fundamentals(), '2023-01-18')
+    for fmarket_cap in ['Large Cap', 'Medium Cap', 'Small Cap']:
+        assert LocalScreener(screener, 'Technology', fmarket_cap, 'Over $10', (), 'Over 200K') == \
+               LocalScreener(screener, 'Technology', fmarket_cap, 'Over $10', ('Any',), 'Over 200K')
+
+def test_file_path_and_read_csv_table_give_the_same_snapshot(tmp_path):
+
+    export = tmp_path / 'export.csv'
+    make_fundamentals(n_stocks=50).to_csv(export, index=False) # unit-less market caps in millions, read as numbers by pandas
+    for path in [SAMPLE, str(export)]:
+        pd.testing.assert_frame_equal(ReadFundamentals(pd.read_csv(path)), ReadFundamentals(path))
+
+    caps = ReadFundamentals(str(export))['Market Cap.']
+    assert caps.iloc[10] == 2e9 and caps.iloc[20] == 50e6
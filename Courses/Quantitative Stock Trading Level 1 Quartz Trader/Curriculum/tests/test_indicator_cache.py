@@ -0,0 +1,45 @@
+'''
+Tests of the memory and disk tiers of IndicatorCache.py.
+'''
+
+import os
+
+import numpy as np
+import pandas as pd
+from IndicatorCache import IndicatorCache
+from TechnicalIndicators import MACD, SMA
+
+# Close prices of two tickers, one column per ticker, as in yf.download(TICKERS)['Close']
+def close_table():
+
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2020-01-01', periods=300)
+
+    return pd.DataFrame(100 + np.cumsum(rng.normal(0, 1, (300, 2)), axis=0), index=dates, columns=['AAPL', 'MSFT'])
+
+def test_panel_results_are_served_from_disk(tmp_path):
+
+    close = close_table()
+    cache = IndicatorCache(str(tmp_path))
+    sma = cache.compute(SMA, close, 20)
+    macd = cache.compute(MACD, close, 12, 26, 9)
+
+    new_cache = IndicatorCache(str(tmp_path)) # e.g. the next run of an EXE program
+    new_sma = new_cache.compute(SMA, close, 20)
+    new_macd = new_cache.compute(MACD, close, 12, 26, 9)
+
+    assert new_cache.hits == 2 and new_cache.misses == 0
+    pd.testing.assert_frame_equal(new_sma, sma, check_freq=False)
+    assert list(new_sma.columns) == ['AAPL', 'MSFT'] and isinstance(new_sma.index, pd.DatetimeIndex)
+    for new_values, values in zip(new_macd, macd):
+        pd.testing.assert_frame_equal(new_values, values, check_freq=False)
+
+def test_object_labels_are_kept_in_memory_only(tmp_path):
+
+    table = pd.DataFrame(np.ones((3, 2)), columns=pd.MultiIndex.from_tuples([('Close', 'AAPL'), ('Close', 'MSFT')]))
+    cache = IndicatorCache(str(tmp_path))
+    cache.store('key', table)
+
+    assert os.listdir(str(tmp_path)) == [] # nothing that would need pickling is written, or counted against the disk cap
+    pd.testing.assert_frame_equal(cache.lookup('key'), table)
+    assert IndicatorCache(str(tmp_path)).lookup('key') is None
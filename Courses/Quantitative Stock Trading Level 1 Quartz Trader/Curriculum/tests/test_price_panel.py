@@ -0,0 +1,55 @@
+'''
+Tests of the memory-mapped panel in PricePanel.py, built from a price store with a stand-in price source.
+'''
+
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+from PricePanel import BuildPanel, PricePanel
+from PriceStore import PriceStore
+
+FIRST_DAYS = {'AAA': '2023-01-02', 'BBB': '2023-02-01', 'CCC': '2023-01-16'} # e.g. BBB listed later
+
+# Function to serve business-day prices from each ticker's first day, counting the requests per ticker
+def make_source(requests):
+
+    def source(ticker, start, end):
+        requests[ticker] = requests.get(ticker, 0) + 1
+        dates = pd.bdate_range(max(pd.Timestamp(start), pd.Timestamp(FIRST_DAYS[ticker])), pd.Timestamp(end) - pd.Timedelta(days=1))
+        close = np.arange(len(dates), dtype=float) + len(ticker) * 10
+
+        return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close,
+                             'Adj Close': close, 'Volume': 1000.0}, index=dates)
+
+    return source
+
+def test_build_downloads_each_ticker_once(tmp_path):
+
+    for root in [None, os.path.join(str(tmp_path), 'store')]: # without and with a store folder
+        requests = {}
+        store = PriceStore(root, make_source(requests))
+        panel = BuildPanel(os.path.join(str(tmp_path), 'panel' + str(root is None)), list(FIRST_DAYS), '2023-01-02', '2023-03-01', store)
+
+        assert requests == {ticker: 1 for ticker in FIRST_DAYS}
+        for ticker, first_day in FIRST_DAYS.items():
+            expected = make_source({})(ticker, '2023-01-02', '2023-03-01')
+            np.testing.assert_array_equal(panel.prices(ticker)['Close'].to_numpy(), expected['Close'].to_numpy())
+            assert panel.prices(ticker).index[0] == pd.Timestamp(first_day)
+
+def test_views_share_the_maps(tmp_path):
+
+    store = PriceStore(None, make_source({}))
+    panel = BuildPanel(str(tmp_path), list(FIRST_DAYS), '2023-01-02', '2023-03-01', store)
+    view = panel.between('2023-02-01', '2023-02-15')
+
+    assert view.fields['Close'] is panel.fields['Close']
+    assert view.all_dates is panel.all_dates and view.tickers is panel.tickers
+    assert np.shares_memory(view['Close'].to_numpy(), panel.fields['Close'])
+    assert view.dates[0] == pd.Timestamp('2023-02-01') and view.dates[-1] == pd.Timestamp('2023-02-14')
+    assert panel.window == [0, len(panel.all_dates)] # the panel itself is unchanged
+
+    copy = pickle.loads(pickle.dumps(view)) # worker processes map the same version
+    assert isinstance(copy, PricePanel) and copy.window == view.window
+    pd.testing.assert_frame_equal(copy['Close'], view['Close'])
@@ -0,0 +1,97 @@
+'''
+Tests of the coverage kept by PriceStore.py, with a stand-in price source instead of Yahoo Finance.
+'''
+
+import os
+
+import numpy as np
+import pandas as pd
+from PriceStore import PriceStore
+
+# Class to serve business-day prices up to a last date, counting the requests
+class FakeSource:
+
+    def __init__(self, last='2023-12-31'):
+        self.last = pd.Timestamp(last) # no bars after this date, e.g. a ticker that stopped trading
+        self.requests = []
+
+    def __call__(self, ticker, start, end):
+        self.requests.append((ticker, pd.Timestamp(start), pd.Timestamp(end)))
+        dates = pd.bdate_range(start, min(pd.Timestamp(end) - pd.Timedelta(days=1), self.last))
+        close = np.arange(len(dates), dtype=float) + 100
+
+        return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close,
+                             'Adj Close': close, 'Volume': 1000.0}, index=dates)
+
+def test_repeated_load_reads_from_disk(tmp_path):
+
+    source = FakeSource()
+    store = PriceStore(str(tmp_path), source)
+    first = store.load('AAA', '2023-01-02', '2023-03-01')
+    again = store.load('AAA', '2023-01-02', '2023-03-01')
+
+    assert len(source.requests) == 1
+    pd.testing.assert_frame_equal(first, again, check_freq=False)
+    assert store.missing('AAA', '2023-01-02', '2023-03-01') == []
+
+def test_empty_download_leaves_the_range_uncovered(tmp_path):
+
+    source = FakeSource(last='2022-12-31') # e.g. a rate-limited request that came back empty
+    store = PriceStore(str(tmp_path), source)
+
+    assert len(store.load('AAA', '2023-01-02', '2023-03-01')) == 0
+    assert store.missing('AAA', '2023-01-02', '2023-03-01') == [[pd.Timestamp('2023-01-02'), pd.Timestamp('2023-03-01')]]
+
+    source.last = pd.Timestamp('2023-12-31') # the source answers next time
+    assert len(store.load('AAA', '2023-01-02', '2023-03-01')) == len(pd.bdate_range('2023-01-02', '2023-02-28'))
+    assert len(source.requests) == 2
+
+def test_weekend_end_date_is_covered_after_the_first_download(tmp_path):
+
+    source = FakeSource()
+    store = PriceStore(str(tmp_path), source)
+    first = store.load('AAA', '2022-12-01', '2023-01-01') # a Sunday, after the last bar on Friday 2022-12-30
+    again = store.load('AAA', '2022-12-01', '2023-01-01')
+
+    assert len(source.requests) == 1
+    assert store.missing('AAA', '2022-12-01', '2023-01-01') == []
+    assert first.index[-1] == pd.Timestamp('2022-12-30')
+    pd.testing.assert_frame_equal(first, again, check_freq=False)
+
+def test_delisted_ticker_is_not_requested_again(tmp_path):
+
+    source = FakeSource(last='2023-02-10') # no bars after the delisting
+    store = PriceStore(str(tmp_path), source)
+    store.load('AAA', '2023-01-02', '2023-03-01')
+    prices = store.load('AAA', '2023-01-02', '2023-03-01')
+
+    assert len(source.requests) == 1
+    assert store.missing('AAA', '2023-01-02', '2023-03-01') == []
+    assert prices.index.equals(pd.bdate_range('2023-01-02', '2023-02-10').rename('Date'))
+
+def test_coverage_stops_at_today(tmp_path):
+
+    today = pd.Timestamp.today().normalize()
+    store = PriceStore(str(tmp_path), FakeSource(last=today))
+    store.load('AAA', today - pd.Timedelta(days=30), today + pd.Timedelta(days=5))
+
+    assert store.missing('AAA', today - pd.Timedelta(days=30), today + pd.Timedelta(days=5)) == [[today, today + pd.Timedelta(days=5)]]
+
+def test_append_covers_the_range_of_the_prices_it_was_given(tmp_path):
+
+    store = PriceStore(str(tmp_path), FakeSource())
+    store.append('AAA', FakeSource(last='2023-01-31')('AAA', '2023-01-02', '2023-03-01'), '2023-01-02', '2023-03-01')
+    store.append('BBB', FakeSource(last='2022-12-31')('BBB', '2023-01-02', '2023-03-01'), '2023-01-02', '2023-03-01')
+
+    assert store.missing('AAA', '2023-01-02', '2023-03-01') == []
+    assert store.missing('BBB', '2023-01-02', '2023-03-01') == [[pd.Timestamp('2023-01-02'), pd.Timestamp('2023-03-01')]]
+    assert not os.path.exists(os.path.join(str(tmp_path), 'BBB'))
+
+def test_reads_do_not_create_folders(tmp_path):
+
+    root = os.path.join(str(tmp_path), 'store')
+    store = PriceStore(root, FakeSource())
+    store.read('AAA')
+    store.missing('AAA', '2023-01-02', '2023-03-01')
+
+    assert not os.path.exists(root)
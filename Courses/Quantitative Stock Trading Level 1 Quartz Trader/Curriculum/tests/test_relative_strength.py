@@ -0,0 +1,46 @@
+'''
+Tests of the RS matrix in RelativeStrengthMeasure.py against the per-stock RS and RSSMA functions.
+'''
+
+import numpy as np
+import pandas as pd
+from RelativeStrengthMeasure import RS, RSMatrix, RSSMA
+
+SECTORS = {'AAA': 'XLK', 'BBB': 'XLK', 'CCC': 'XLE', 'DDD': 'XLF'}
+
+# Function to make a wide price table of the stocks and their sector ETFs, with a late listing and a missing price
+def wide_prices(n_bars=400, seed=0):
+
+    rng = np.random.default_rng(seed)
+    columns = list(SECTORS) + sorted(set(SECTORS.values()))
+    data = pd.DataFrame(np.exp(np.log(50) + np.cumsum(rng.normal(0, 0.02, (n_bars, len(columns))), axis=0)),
+                        index=pd.bdate_range('2021-01-01', periods=n_bars), columns=columns)
+    data.iloc[:60, data.columns.get_loc('DDD')] = np.nan # listed later
+    data.iloc[250, data.columns.get_loc('XLE')] = np.nan # missing ETF price
+
+    return data
+
+def test_rs_matrix_matches_rs_and_rssma_of_each_stock():
+
+    data = wide_prices()
+    periods = (5, 50, 150)
+    rs_df, rs_sma, rs_rank = RSMatrix(data, SECTORS, periods, rank_period=50)
+
+    ratios = {} # RS over its 50-day RSSMA, which the ranks compare
+    for stock, etf in SECTORS.items():
+        rs_stock = RS(data[[stock, etf]])
+        np.testing.assert_array_equal(rs_df[stock].to_numpy(), rs_stock['RS'].to_numpy())
+        for n_period in periods:
+            np.testing.assert_allclose(rs_sma[n_period][stock].to_numpy(), RSSMA(rs_stock, n_period), rtol=1e-12,
+                                       err_msg=stock + ' ' + str(n_period))
+        ratios[stock] = rs_stock['RS'] / RSSMA(rs_stock, 50)
+
+    assert np.isnan(rs_sma[50]['CCC'].iloc[250:300]).all() # windows with the missing ETF price
+    pd.testing.assert_frame_equal(rs_rank, pd.DataFrame(ratios).rank(axis=1, pct=True))
+    assert rs_rank.iloc[110:250].notna().all().all() and (rs_rank.iloc[110:250].max(axis=1) == 1).all() # all listed, no gaps
+
+def test_rs_matrix_returns_only_the_requested_periods():
+
+    rs_df, rs_sma, rs_rank = RSMatrix(wide_prices(), SECTORS, periods=(20,), rank_period=50)
+
+    assert list(rs_sma) == [20] and list(rs_rank.columns) == list(SECTORS)
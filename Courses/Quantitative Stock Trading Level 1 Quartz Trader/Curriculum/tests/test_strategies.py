@@ -0,0 +1,38 @@
+'''
+Tests of the tables returned by TrendFollowingStrategy and MeanReversionStrategy.
+'''
+
+import matplotlib
+matplotlib.use('Agg') # the strategy scripts import pyplot
+
+import numpy as np
+import pandas as pd
+from CandlestickPatterns import PATTERN_NAMES, CandlestickPatterns
+from MeanReversionStrategy import MeanReversionStrategy
+from TrendFollowingStrategy import TrendFollowingStrategy
+
+# Random daily OHLCV prices, in the layout of yf.download(TICKER)
+def make_prices(n_days=800, seed=0):
+
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, n_days)))
+    open_ = close * np.exp(rng.normal(0, 0.01, n_days))
+    high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0, 0.01, n_days)))
+    low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0, 0.01, n_days)))
+
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Adj Close': close,
+                         'Volume': rng.integers(100000, 10000000, n_days).astype(float)},
+                        index=pd.bdate_range('2019-01-01', periods=n_days))
+
+def test_strategy_tables_keep_one_column_per_pattern():
+
+    prices = make_prices()
+    patterns = CandlestickPatterns(prices).tail(504)
+    for strategy in [TrendFollowingStrategy, MeanReversionStrategy]:
+        table = strategy(prices, 10000, 504)
+
+        assert 'Patterns' not in table.columns
+        assert list(table.columns[-len(PATTERN_NAMES) - 3:]) == PATTERN_NAMES + ['Trades', 'Position', 'Pnl']
+        for name in PATTERN_NAMES:
+            assert table[name].dtype == bool
+            np.testing.assert_array_equal(table[name].to_numpy(), patterns[name].to_numpy(dtype=bool))
@@ -0,0 +1,88 @@
+'''
+Tests of the streaming indicator states in StreamingIndicators.py against the batch functions of TechnicalIndicators.py.
+'''
+
+import numpy as np
+import pandas as pd
+import os
+
+from AverageTrueRangeMeasure import ATR
+from CandlestickPatterns import CandlestickPatterns
+from FeatureSet import ComputeFeatures
+from StreamingIndicators import ATRState, BBANDSState, EMAState, FeatureState, ForceIndexState, LoadFeatureState, MACDState, \
+                                RSIState, SMAState, StochState, WilliamsRState
+from TechnicalIndicators import BBANDS, EMA, MACD, RSI, SMA, ForceIndex, StochasticOscillator, WilliamsR
+
+# Function to make cent OHLCV prices with a flat run, where every price of the bars is the same
+def flat_run_prices(n_bars=700, seed=1):
+
+    rng = np.random.default_rng(seed)
+    close = np.round(100 + np.cumsum(rng.normal(0, 0.5, n_bars)), 2)
+    open_ = np.round(close + rng.normal(0, 0.2, n_bars), 2)
+    high = np.maximum(open_, close) + np.round(np.abs(rng.normal(0, 0.3, n_bars)), 2)
+    low = np.minimum(open_, close) - np.round(np.abs(rng.normal(0, 0.3, n_bars)), 2)
+    data = pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Adj Close': close,
+                         'Volume': rng.integers(100000, 1000000, n_bars).astype(float)},
+                        index=pd.bdate_range('2020-01-01', periods=n_bars))
+    data.iloc[100:130, :5] = close[100] # a 30-bar flat run
+
+    return data
+
+# Function to feed the bars to a state one by one, returning its outputs as one array per output
+def stream(state, data):
+
+    values = np.array([state.update(bar) for bar in data.to_dict('records')], dtype=float)
+
+    return values.T if values.ndim == 2 else values
+
+def test_sma_and_bbands_states_match_batch_on_a_flat_run():
+
+    data = flat_run_prices()
+    for n_period in [5, 20, 50]:
+        np.testing.assert_array_equal(stream(SMAState(n_period), data), SMA(data, n_period))
+        np.testing.assert_array_equal(stream(BBANDSState(n_period, 2), data), BBANDS(data, n_period, 2))
+
+def test_states_match_batch_functions():
+
+    for seed in [1, 2, 3]:
+        data = flat_run_prices(seed=seed)
+        with np.errstate(invalid='ignore'): # windows of the flat run have no range, so %K and %R are NaN there
+            checks = [(SMAState(50), SMA(data, 50)),
+                      (EMAState(20), EMA(data, 20)),
+                      (MACDState(12, 26, 9), MACD(data, 12, 26, 9)),
+                      (BBANDSState(20, 2), BBANDS(data, 20, 2)),
+                      (ForceIndexState(13), ForceIndex(data, 13)),
+                      (StochState(5, 3), StochasticOscillator(data, 5, 3)),
+                      (WilliamsRState(14), WilliamsR(data, 14)),
+                      (RSIState(10), RSI(data, 10))]
+        for state, batch in checks:
+            np.testing.assert_array_equal(stream(state, data), np.asarray(batch, dtype=float), type(state).__name__)
+
+def test_atr_states_match_batch_for_every_smoothing():
+
+    data = flat_run_prices()
+    for smoothing in ['SMA', 'Wilder', 'EMA']:
+        for n_period in [1, 14]:
+            batch = np.asarray(ATR(data, n_period, smoothing), dtype=float)
+            np.testing.assert_array_equal(stream(ATRState(n_period, smoothing), data), batch, smoothing)
+
+def test_feature_state_extended_from_a_saved_state_matches_a_full_recompute(tmp_path):
+
+    features = ['SMA20', 'SMA50', 'EMA20', 'MACD(12,26,9)', 'BBANDS(20,2)', 'FI13', 'STOCH(5,3)', 'WR14', 'RSI10', 'ATR14']
+    data = flat_run_prices() # the split falls inside the flat run, on bar 115
+    with np.errstate(invalid='ignore'): # the flat run has no range, so %K and %R are NaN there
+        full = ComputeFeatures(data, features)
+        patterns = CandlestickPatterns(data[['Open', 'High', 'Low', 'Close']]).drop(columns=['Open', 'High', 'Low', 'Close'])
+
+        for split in [1, 115, 400]:
+            state = FeatureState(features, candlestick_patterns=True)
+            head = state.update(data.iloc[:split])
+            path = os.path.join(str(tmp_path), 'state.pkl')
+            state.save(path)
+            tail = LoadFeatureState(path).update(data.iloc[split:])
+
+            assert tail.keys() == head.keys()
+            for feature in features:
+                values = np.concatenate([np.asarray(head[feature], dtype=float), np.asarray(tail[feature], dtype=float)], axis=-1)
+                np.testing.assert_array_equal(values, np.asarray(full[feature], dtype=float), feature + ' split at ' + str(split))
+            pd.testing.assert_frame_equal(pd.concat([head['CandlestickPatterns'], tail['CandlestickPatterns']]), patterns)
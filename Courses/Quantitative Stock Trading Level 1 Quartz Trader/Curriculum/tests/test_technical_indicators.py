@@ -0,0 +1,151 @@
+'''
+Tests of the vectorized indicators in TechnicalIndicators.py against the original per-bar loops.
+'''
+
+import statistics as stats
+
+import numpy as np
+import pandas as pd
+from TechnicalIndicators import BBANDS, EMA, MACD, RSI, RSI_multi, SMA, SMA_multi, ForceIndex, RollingMax, RollingMin, \
+                                RollingMoments, Slope, StochasticOscillator, WilliamsR
+
+# Original SMA loop, averaging a sliding list of prices with stats.mean
+def loop_sma(close, n_period):
+
+    history = []
+    sma_values = []
+    for c in close:
+        history.append(c)
+        if len(history) > n_period:
+            del (history[0])
+        sma_values.append(stats.mean(history))
+
+    return np.array(sma_values)
+
+# Cent prices with a long flat run, a short one, and a run that only ticks by a cent
+def flat_run_prices():
+
+    rng = np.random.default_rng(1)
+    close = np.round(100 + np.cumsum(rng.normal(0, 0.5, 1500)), 2)
+    close[300:700] = close[300]
+    close[900:1000] = close[900]
+    close[1100:1400] = np.round(close[1100] + rng.choice([-0.01, 0, 0.01], 300).cumsum(), 2)
+
+    return close
+
+def test_sma_matches_loop():
+
+    close = flat_run_prices()
+    for n_period in [5, 50, 150, 200]:
+        np.testing.assert_allclose(SMA(pd.DataFrame({'Close': close}), n_period), loop_sma(close, n_period), rtol=1e-12)
+
+def test_sma_slope_signs_match_loop_on_flat_runs():
+
+    close = flat_run_prices()
+    for n_period in [50, 150, 200]: # the SMA slopes TrendFollowingStrategy tests for >= 0, > 0, <= 0 and < 0
+        slopes = Slope(SMA(pd.DataFrame({'Close': close}), n_period))[1:]
+        loop_slopes = np.diff(loop_sma(close, n_period))
+        np.testing.assert_array_equal(np.sign(slopes), np.sign(loop_slopes))
+        np.testing.assert_array_equal(slopes[500:699] == 0, True) # windows inside the long flat run
+
+def test_sma_slope_signs_match_loop_for_many_tickers():
+
+    close = flat_run_prices()
+    table = pd.DataFrame({'A': close, 'B': close[::-1].copy()})
+    slopes = Slope(SMA(table, 150))[1:]
+    for column, prices in enumerate([close, close[::-1]]):
+        np.testing.assert_array_equal(np.sign(slopes[:, column]), np.sign(np.diff(loop_sma(prices, 150))))
+
+def test_sweeps_keep_nan_to_the_windows_that_hold_it():
+
+    rng = np.random.default_rng(0)
+    close = 100 + np.cumsum(rng.normal(0, 1, (1500, 3)), axis=0)
+    close[:400, 1] = np.nan # listed late
+    close[700, 2] = np.nan # one missing day
+    close[701:705, 0] = np.nan # a few missing days
+    table = pd.DataFrame(close, columns=['A', 'B', 'C'])
+    periods = [5, 20, 50, 200]
+
+    sma_sweep = SMA_multi(table, periods)
+    rsi_sweep = RSI_multi(table, periods)
+    for n_period in periods:
+        for sweep, single in [(sma_sweep, SMA(table, n_period)), (rsi_sweep, RSI(table, n_period))]:
+            values = sweep.xs(n_period, axis=1, level=1)
+            np.testing.assert_array_equal(np.isnan(values.to_numpy()), np.isnan(single.to_numpy()))
+            np.testing.assert_allclose(values.to_numpy(), single.to_numpy(), rtol=1e-10, atol=1e-10)
+        assert not np.isnan(sma_sweep[('A', n_period)].iloc[-1]) # the tail after a gap is not NaN
+
+def test_rolling_max_min_match_pandas():
+
+    rng = np.random.default_rng(2)
+    values = 100 + np.cumsum(rng.normal(0, 1, (1000, 3)), axis=0)
+    for n_period in [1, 2, 3, 14, 64, 999, 1000, 1500]: # including windows longer than the series
+        table = pd.DataFrame(values).rolling(n_period, min_periods=1) # the first n - 1 windows hold fewer values
+        np.testing.assert_array_equal(RollingMax(values, n_period), table.max().to_numpy())
+        np.testing.assert_array_equal(RollingMin(values, n_period), table.min().to_numpy())
+        np.testing.assert_array_equal(RollingMax(values[:, 0], n_period), table.max().to_numpy()[:, 0])
+
+def test_rolling_moments_match_pandas():
+
+    rng = np.random.default_rng(3)
+    values = 1000 + np.cumsum(rng.normal(0, 1, (1200, 2)), axis=0) # prices far from 0, where one-pass sums of squares lose digits
+    values[300:340] = values[300] # a flat run, whose variance is exactly 0
+    for n_period in [2, 5, 20, 50, 200]:
+        table = pd.DataFrame(values).rolling(n_period, min_periods=1)
+        mean_values, variance = RollingMoments(values, n_period)
+        np.testing.assert_allclose(mean_values, table.mean().to_numpy(), rtol=1e-12)
+        np.testing.assert_allclose(variance, table.var(ddof=0).to_numpy(), rtol=1e-7, atol=1e-9)
+        np.testing.assert_allclose(np.sqrt(variance), table.std(ddof=0).to_numpy(), rtol=1e-7, atol=1e-5) # pandas' own rounding
+        if n_period <= 40: # windows inside the flat run
+            np.testing.assert_array_equal(variance[300 + n_period - 1:340], 0)
+
+# Function to make a multi-ticker download where ticker B is listed late and ticker C misses a few days
+def panel_with_gaps(n_bars=600):
+
+    rng = np.random.default_rng(4)
+    close = 100 + np.cumsum(rng.normal(0, 1, (n_bars, 3)), axis=0)
+    fields = {'Open': close + rng.normal(0, 0.3, close.shape), 'Close': close, 'Volume': rng.integers(1000, 9000, close.shape) * 1.}
+    fields['High'] = np.maximum(fields['Open'], close) + 0.5
+    fields['Low'] = np.minimum(fields['Open'], close) - 0.5
+    for values in fields.values():
+        values[:200, 1] = np.nan # B is listed on bar 200
+        values[400:403, 2] = np.nan # C has no prices on bars 400 to 402
+
+    return pd.concat({field: pd.DataFrame(values, columns=['A', 'B', 'C']) for field, values in fields.items()}, axis=1)
+
+def test_panel_nan_prices_give_nan_in_every_indicator():
+
+    data = panel_with_gaps()
+    missing = data['Close'].isna().to_numpy()
+    results = {'SMA': SMA(data, 20), 'EMA': EMA(data, 20), 'ForceIndex': ForceIndex(data, 13), 'RSI': RSI(data, 14),
+               'WilliamsR': WilliamsR(data, 14), 'RSI_multi': RSI_multi(data, [14]).xs(14, axis=1, level=1)}
+    results.update({'MACD ' + str(i): values for i, values in enumerate(MACD(data, 12, 26, 9))})
+    results.update({'BBANDS ' + str(i): values for i, values in enumerate(BBANDS(data, 20, 2))})
+    results.update({'Stoch ' + str(i): values for i, values in enumerate(StochasticOscillator(data, 5, 3))})
+
+    for name, values in results.items():
+        values = values.to_numpy()
+        assert np.isnan(values[missing]).all(), name # no 0 before listing, and no last value carried over the gap
+        assert not np.isnan(values[:, 0]).any(), name # A has every price
+        assert not np.isnan(values[-100:]).any(), name # the windows after the gaps have values again
+        assert (values[~missing] != 0).any(axis=0).all(), name
+
+    # RSI is NaN, not an oversold 0, while its windows hold a change from or to a missing price
+    rsi = results['RSI'].to_numpy()
+    assert np.isnan(rsi[200:214, 1]).all() and not np.isnan(rsi[214:, 1]).any()
+    assert np.isnan(rsi[400:417, 2]).all() and not np.isnan(rsi[417:, 2]).any()
+
+def test_panel_columns_match_each_ticker_on_its_own():
+
+    data = panel_with_gaps()
+    listed = data.xs('B', axis=1, level=1).iloc[200:] # B from its first price
+    for func, params in [(EMA, [20]), (MACD, [12, 26, 9]), (SMA, [20]), (RSI, [14]), (WilliamsR, [14])]:
+        panel = func(data, *params)
+        alone = func(data.xs('A', axis=1, level=1), *params)
+        for panel_values, alone_values in zip(panel if isinstance(panel, list) else [panel],
+                                              alone if isinstance(panel, list) else [alone]):
+            np.testing.assert_array_equal(panel_values['A'].to_numpy(), alone_values) # every column as on its own
+
+        late = func(listed, *params) # once its windows are past the listing, B is as if it had no earlier bars
+        for panel_values, late_values in zip(panel if isinstance(panel, list) else [panel], late if isinstance(panel, list) else [late]):
+            np.testing.assert_allclose(panel_values['B'].to_numpy()[200 + 20:], late_values[20:], rtol=1e-12)
@@ -0,0 +1,80 @@
+'''
+Tests of the gap policies of TradingCalendar.py against the same joins done with pandas alignment.
+'''
+
+import numpy as np
+import pandas as pd
+import pytest
+from TradingCalendar import SeriesCalendar, TableCalendar, TradingCalendar
+
+# Function to make price series with gaps: a late listing, an early delisting and a few missing days
+def gapped_series(n_bars=300, seed=0):
+
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2022-01-03', periods=n_bars)
+    prices = {ticker: pd.Series(np.exp(np.log(50) + np.cumsum(rng.normal(0, 0.02, n_bars))), index=dates)
+              for ticker in ['AAA', 'BBB', 'CCC', 'XLK']}
+    prices['BBB'] = prices['BBB'].iloc[30:] # listed later
+    prices['CCC'] = prices['CCC'].iloc[:250] # delisted
+    prices['AAA'] = prices['AAA'].drop(dates[[50, 51, 120]]) # missing days
+    prices['XLK'].iloc[[80, 200]] = np.nan # missing values
+
+    return prices
+
+# Function to join the series with pandas, on the days on which any of them traded
+def pandas_join(prices):
+
+    return pd.concat({ticker: series.dropna() for ticker, series in prices.items()}, axis=1).sort_index()
+
+def test_join_follows_each_gap_policy():
+
+    prices = gapped_series()
+    calendar = SeriesCalendar(prices)
+    tickers = list(prices)
+    table = pandas_join(prices)
+
+    pd.testing.assert_frame_equal(calendar.join(tickers, 'nan'), table, check_freq=False)
+    pd.testing.assert_frame_equal(calendar.join(tickers, 'ffill'), table.ffill(), check_freq=False)
+    pd.testing.assert_frame_equal(calendar.join(tickers, 'drop'), table.dropna(), check_freq=False)
+    pd.testing.assert_frame_equal(calendar.join(['XLK', 'AAA'], 'drop'), table[['XLK', 'AAA']].dropna(), check_freq=False)
+
+    assert np.isnan(calendar.join(['BBB'], 'ffill')['BBB'].iloc[:30]).all() # no value before the first day
+    assert (calendar.join(['CCC'], 'ffill')['CCC'].iloc[250:] == prices['CCC'].iloc[-1]).all() # last value after delisting
+
+def test_ratio_and_returns_follow_the_gap_policy():
+
+    prices = gapped_series()
+    calendar = SeriesCalendar(prices)
+    table = pandas_join(prices)
+
+    for policy, joined in [('nan', table), ('ffill', table.ffill()), ('drop', table[['AAA', 'XLK']].dropna())]:
+        pd.testing.assert_series_equal(calendar.ratio('AAA', 'XLK', policy), joined['AAA'] / joined['XLK'],
+                                       check_freq=False, check_names=False)
+        returns = calendar.returns(['AAA', 'XLK'], policy=policy)
+        pd.testing.assert_frame_equal(returns, joined[['AAA', 'XLK']].pct_change(fill_method=None), check_freq=False)
+        log_returns = calendar.returns(['AAA', 'XLK'], log=True, policy=policy)
+        np.testing.assert_allclose(log_returns.to_numpy(), np.log1p(returns.to_numpy()), rtol=1e-12)
+
+    returns = calendar.returns(['AAA'], policy='ffill')['AAA']
+    assert returns.iloc[50] == 0 and returns.iloc[51] == 0 # no move on the missing days, caught up on the next one
+
+def test_table_calendar_matches_series_calendar():
+
+    prices = gapped_series()
+    data = pandas_join(prices)
+    for policy in ['nan', 'ffill', 'drop']:
+        pd.testing.assert_frame_equal(TableCalendar(data).join(list(data), policy), SeriesCalendar(prices).join(list(data), policy),
+                                      check_freq=False)
+
+def test_add_keeps_the_last_value_of_a_day_and_ignores_days_outside_the_calendar():
+
+    calendar = TradingCalendar(pd.to_datetime(['2023-01-03', '2023-01-04', '2023-01-05']))
+    calendar.add('AAA', pd.Series([1., 2., 3., 4.], index=pd.to_datetime(['2023-01-04', '2023-01-02', '2023-01-04', '2023-01-05'])))
+
+    np.testing.assert_array_equal(calendar.gather(['AAA']), [[np.nan], [3.], [4.]])
+
+def test_unknown_gap_policy_is_rejected():
+
+    calendar = SeriesCalendar(gapped_series())
+    with pytest.raises(ValueError):
+        calendar.join(['AAA'], 'bfill')